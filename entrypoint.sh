@@ -12,4 +12,18 @@ python manage.py create_user bent 5478
 pytest
 
 # Start Gunicorn server
-gunicorn -b :8000 job_board.wsgi
\ No newline at end of file
+# Each worker thread keeps a persistent database connection (DB_CONN_MAX_AGE),
+# so workers x threads is the number of connections Postgres has to allow.
+# SERVER_MODE=asgi runs uvicorn workers instead, for the async views
+# under /async/
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    gunicorn -b :8000 \
+        --workers "${GUNICORN_WORKERS:-2}" \
+        --worker-class uvicorn.workers.UvicornWorker \
+        job_board.asgi
+else
+    gunicorn -b :8000 \
+        --workers "${GUNICORN_WORKERS:-2}" \
+        --threads "${GUNICORN_THREADS:-4}" \
+        job_board.wsgi
+fi
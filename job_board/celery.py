@@ -17,13 +17,23 @@ app = Celery('job_board', broker=config('REDIS_URL'))
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django app configs.
-app.autodiscover_tasks(['talentpool.application.services'])
+app.autodiscover_tasks(['talentpool.application.services',
+                        'talentpool.application.publishing'])
 
 LOG = logging.getLogger(__name__)
 
 app.conf.beat_schedule = {
     'publish_scheduled_job_adverts': {
-        'task': 'talentpool.application.services.publish_scheduled_job_adverts',
-        'schedule': 60.0,
+        'task': 'talentpool.application.publishing.publish_scheduled_job_adverts',
+        # Scheduled adverts are published by their own ETA task, this sweep
+        # only catches the ones whose task was lost
+        'schedule': config('JOB_ADVERT_PUBLISH_SWEEP_INTERVAL', 900.0, cast=float),
     },
 }
+
+if config('JOB_APPLICATION_INTAKE', 'sync') == 'stream':
+    app.conf.beat_schedule['consume_job_application_intake'] = {
+        'task': 'talentpool.application.services.consume_job_application_intake',
+        # Stores the job applications queued by JOB_APPLICATION_INTAKE=stream
+        'schedule': config('JOB_APPLICATION_INTAKE_INTERVAL', 1.0, cast=float),
+    }
@@ -0,0 +1,158 @@
+"""
+Response compression.
+
+Bodies of at least COMPRESSION_MIN_SIZE bytes are compressed with the best
+encoding the client accepts: brotli when the ``brotli`` package is
+installed, gzip otherwise. Responses that already carry a Content-Encoding,
+such as the pre-compressed listing pages, are passed through untouched.
+"""
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Random bytes the gzip header is padded with, against BREACH (see Django's GZipMiddleware)
+GZIP_MAX_RANDOM_BYTES = 100
+
+_accept_encoding_re = _lazy_re_compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def supported_encodings() -> tuple:
+    """
+    The content codings this server can produce, the preferred one first
+    :return tuple:
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def accepted_encoding(request) -> str | None:
+    """
+    The best encoding of supported_encodings() the request accepts
+    :param request:
+    :return str | None: None when the body must be sent as is
+    """
+    accepted = {}
+    for coding, quality in _accept_encoding_re.findall(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        try:
+            accepted[coding.lower()] = float(quality) if quality else 1.0
+        except ValueError:
+            continue
+    for coding in supported_encodings():
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(content, encoding) -> bytes:
+    """
+    Compress a body with the encoding
+    :param content:
+    :param encoding: one of supported_encodings()
+    :return bytes:
+    """
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compress_string(content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+
+
+def weaken_etag(response) -> None:
+    """
+    Mark the ETag of an encoded body weak: it stands for the content, not
+    for these exact bytes
+    :param response:
+    :return None:
+    """
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = f'W/{etag}'
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress response bodies with brotli or gzip, as negotiated
+    NOTE: bodies under COMPRESSION_MIN_SIZE bytes are sent as is, the
+    compression would cost more than it saves
+    """
+
+    def process_response(self, request, response):
+        """
+        Compress the response when the client accepts it and it is worth it
+        :param request:
+        :param response:
+        :return HttpResponse:
+        """
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.has_header('Content-Encoding'):
+            weaken_etag(response)
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        encoding = accepted_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming and response.is_async:
+            response.streaming_content = self.acompress_sequence(
+                response.streaming_content, encoding)
+            del response['Content-Length']
+        elif response.streaming:
+            if encoding == 'br':
+                response.streaming_content = self.compress_brotli_sequence(
+                    response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+            del response['Content-Length']
+        else:
+            content = compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        weaken_etag(response)
+        response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def compress_brotli_sequence(sequence):
+        """
+        Brotli compress a streamed body chunk by chunk
+        NOTE: every chunk is flushed, so the client gets data as it is produced
+        :param sequence:
+        :return Iterator[bytes]:
+        """
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        for chunk in sequence:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+    @staticmethod
+    async def acompress_sequence(sequence, encoding):
+        """
+        Compress an async streamed body (ASGI) chunk by chunk
+        NOTE: gzip writes a member per chunk, as Django's GZipMiddleware does
+        for async bodies; brotli flushes every chunk of a single stream
+        :param sequence:
+        :param encoding:
+        :return AsyncIterator[bytes]:
+        """
+        if encoding != 'br':
+            async for chunk in sequence:
+                yield compress_string(chunk, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+            return
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        async for chunk in sequence:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
@@ -0,0 +1,205 @@
+"""
+Read replica database routing.
+
+Reads only go to a replica inside ``use_replica()``; everything else,
+including every write and any read-after-write inside a service, stays on
+the primary. A client that just wrote is pinned to the primary for a
+sticky window so it reads its own writes while the replicas catch up.
+"""
+import hashlib
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+LOG = logging.getLogger(__name__)
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+# The replica serving the current request, so all its reads agree
+_request_replica = ContextVar('request_replica', default=None)
+
+
+@contextmanager
+def use_replica():
+    """
+    Send the reads made in this block to a replica, when one is configured
+    Also usable as a decorator.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router sending use_replica() reads to a healthy replica
+    NOTE: a replica lagging more than REPLICA_MAX_LAG seconds is skipped
+    until a later lag check finds it caught up
+    """
+    _lag = {}
+    _lag_checked_at = 0.0
+
+    @classmethod
+    def replica_lag(cls, alias) -> float:
+        """
+        Replication lag of a replica in seconds (0 when it is caught up)
+        :param alias:
+        :return float:
+        """
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+            )
+            lag = cursor.fetchone()[0]
+        return float(lag or 0)
+
+    @classmethod
+    def replica_lags(cls) -> dict:
+        """
+        The last measured lag of every replica, refreshed every
+        REPLICA_LAG_CHECK_INTERVAL seconds
+        :return dict:
+        """
+        now = time.monotonic()
+        if now - cls._lag_checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+            cls._lag_checked_at = now
+            for alias in settings.DATABASE_REPLICAS:
+                try:
+                    cls._lag[alias] = cls.replica_lag(alias)
+                except Exception:  # pylint: disable=W0718
+                    LOG.exception('Could not check the lag of replica %s', alias)
+                    cls._lag[alias] = float('inf')
+        return cls._lag
+
+    @classmethod
+    def healthy_replicas(cls) -> list:
+        """
+        The replicas within REPLICA_MAX_LAG of the primary
+        :return list:
+        """
+        lags = cls.replica_lags()
+        return [alias for alias in settings.DATABASE_REPLICAS
+                if lags.get(alias, 0.0) <= settings.REPLICA_MAX_LAG]
+
+    @classmethod
+    def sticky_window(cls) -> float:
+        """
+        How long a client that wrote stays on the primary: at least
+        REPLICA_STICKY_SECONDS and never less than the worst replica lag seen
+        :return float:
+        """
+        lags = [lag for lag in cls.replica_lags().values() if lag != float('inf')]
+        return max([settings.REPLICA_STICKY_SECONDS, *lags])
+
+    def db_for_read(self, model, **hints):  # pylint: disable=W0613
+        """
+        A replica for use_replica() reads, the primary otherwise
+        """
+        if not settings.DATABASE_REPLICAS or not _replica_reads.get() or _pinned_to_primary.get():
+            return None
+        healthy = self.healthy_replicas()
+        if not healthy:
+            return None
+        alias = _request_replica.get()
+        if alias not in healthy:
+            alias = random.choice(healthy)
+            _request_replica.set(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):  # pylint: disable=W0613
+        """
+        Writes always go to the primary
+        """
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):  # pylint: disable=W0613
+        """
+        Replicas hold the same data as the primary
+        """
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):  # pylint: disable=W0613
+        """
+        Replicas are migrated through replication, never directly
+        """
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Pin a client to the primary for the sticky window after it writes
+    NOTE: the client is identified by its Authorization header (tokens are
+    one per user) and falls back to its address for anonymous requests
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def sticky_key(request) -> str:
+        """
+        The cache key marking a client as pinned to the primary
+        :param request:
+        :return str:
+        """
+        identity = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+        return f"replica:sticky:{hashlib.sha256(identity.encode()).hexdigest()}"
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        key = self.sticky_key(request)
+        pinned = _pinned_to_primary.set(cache.get(key) is not None)
+        replica = _request_replica.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(pinned)
+            _request_replica.reset(replica)
+
+        if request.method not in self.safe_methods and response.status_code < 400:
+            cache.set(key, 1, timeout=ReplicaRouter.sticky_window())
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        key = self.sticky_key(request)
+        pinned = _pinned_to_primary.set(await cache.aget(key) is not None)
+        replica = _request_replica.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(pinned)
+            _request_replica.reset(replica)
+
+        if request.method not in self.safe_methods and response.status_code < 400:
+            # The lag check queries the replicas, keep it off the event loop
+            window = await sync_to_async(ReplicaRouter.sticky_window)()
+            await cache.aset(key, 1, timeout=window)
+        return response
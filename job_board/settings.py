@@ -7,6 +7,7 @@ from pathlib import Path
 
 import dj_database_url
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -31,6 +32,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # third party
     'django_extensions',
     'rest_framework',
@@ -41,12 +43,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'job_board.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'job_board.routers.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'job_board.urls'
@@ -71,13 +75,51 @@ TEMPLATES = [
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Persistent connections: every gunicorn worker thread keeps its connection
+# for DB_CONN_MAX_AGE seconds instead of reconnecting on every request, and
+# checks it is still usable before reusing it
+# Under ASGI (SERVER_MODE=asgi) every request runs its ORM calls on a thread
+# of its own, so a kept connection would never be reused: it defaults to 0
+# there, put pgbouncer in front of Postgres instead
+SERVER_MODE = config('SERVER_MODE', 'wsgi')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', 0 if SERVER_MODE == 'asgi' else 60, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', True, cast=bool)
+
 DATABASES = {
     'default': dj_database_url.config(
         default=config('DATABASE_URL'),
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
     )
 }
+# Views deriving from talentpool.interface.views.NonAtomicAPIView opt out
+# and open their own transactions around writes
 DATABASES['default']['ATOMIC_REQUESTS'] = True
 
+# Optional read replicas, a comma separated list of database URLs.
+# Only reads wrapped in job_board.routers.use_replica() are sent to them;
+# locally any second database (even a copy of the primary) will do.
+REPLICA_DATABASE_URLS = [url for url in config('REPLICA_DATABASE_URLS', '').split(',') if url]
+DATABASE_REPLICAS = []
+for index, url in enumerate(REPLICA_DATABASE_URLS):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(
+        url,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+    )
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['job_board.routers.ReplicaRouter']
+
+# Seconds a client stays on the primary after a write (raised to the
+# measured replication lag when that is longer)
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', 5.0, cast=float)
+# Replicas lagging more than this many seconds are skipped
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', 30.0, cast=float)
+REPLICA_LAG_CHECK_INTERVAL = config('REPLICA_LAG_CHECK_INTERVAL', 10.0, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -141,21 +183,51 @@ AUTH_USER_MODEL = 'talentpool.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'talentpool.interface.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'talentpool.interface.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 
+# Responses of at least COMPRESSION_MIN_SIZE bytes are brotli or gzip
+# compressed, as the client accepts; see job_board.compression
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', 1024, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', 5, cast=int)
+
+# Token -> user resolution caches of CachedTokenAuthentication (seconds).
+# The shared cache entry is dropped on logout; the per-process LRU of other
+# workers is not, so AUTH_TOKEN_LRU_TTL bounds how long a logged out token lives
+AUTH_TOKEN_CACHE_TTL = config('AUTH_TOKEN_CACHE_TTL', 300, cast=int)
+AUTH_TOKEN_LRU_TTL = config('AUTH_TOKEN_LRU_TTL', 10, cast=int)
+AUTH_TOKEN_LRU_SIZE = config('AUTH_TOKEN_LRU_SIZE', 1024, cast=int)
+
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 
-CELERY_BROKER_URL = config('REDIS_URL')
-CELERY_RESULT_BACKEND = config('REDIS_URL')
+REDIS_URL = config('REDIS_URL')
+
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
+# Redis hands a task not acknowledged within the visibility timeout (seconds)
+# to another worker, tasks waiting for their ETA included
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': config('CELERY_VISIBILITY_TIMEOUT', 43200, cast=int),
+}
+# Longest ETA given to a scheduled publish task (seconds). An advert scheduled
+# further out is enqueued again on each hop, so no task waits long enough
+# for the broker to redeliver it
+JOB_ADVERT_PUBLISH_ETA_HORIZON = config('JOB_ADVERT_PUBLISH_ETA_HORIZON', 21600, cast=int)
+if JOB_ADVERT_PUBLISH_ETA_HORIZON >= CELERY_BROKER_TRANSPORT_OPTIONS['visibility_timeout']:
+    raise ImproperlyConfigured(
+        'JOB_ADVERT_PUBLISH_ETA_HORIZON must be under CELERY_VISIBILITY_TIMEOUT')
 
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': config('REDIS_URL'),
+        'LOCATION': REDIS_URL,
     }
 }
 
@@ -170,6 +242,41 @@ CACHES_EXPIRY = 4000
 
 CELERY_ALWAYS_EAGER = False
 
+# Locations listed in the facets of the job advert listing, the most common first
+JOB_ADVERT_LOCATION_FACET_SIZE = config('JOB_ADVERT_LOCATION_FACET_SIZE', 50, cast=int)
+
+# Characters of the description kept in the excerpt of the summary listing
+JOB_ADVERT_EXCERPT_LENGTH = config('JOB_ADVERT_EXCERPT_LENGTH', 200, cast=int)
+
+# Number of due job adverts published per UPDATE by the scheduled publish task
+JOB_ADVERT_PUBLISH_BATCH_SIZE = config('JOB_ADVERT_PUBLISH_BATCH_SIZE', 500, cast=int)
+
+# Job adverts accepted per bulk create request, and inserted per INSERT
+JOB_ADVERT_BULK_MAX_SIZE = config('JOB_ADVERT_BULK_MAX_SIZE', 1000, cast=int)
+JOB_ADVERT_BULK_BATCH_SIZE = config('JOB_ADVERT_BULK_BATCH_SIZE', 500, cast=int)
+
+# Job applications accepted per bulk ingestion request, and inserted per INSERT
+JOB_APPLICATION_BULK_MAX_SIZE = config('JOB_APPLICATION_BULK_MAX_SIZE', 1000, cast=int)
+JOB_APPLICATION_BULK_BATCH_SIZE = config('JOB_APPLICATION_BULK_BATCH_SIZE', 500, cast=int)
+
+# Job applications fetched and written out at a time by the streaming export
+JOB_APPLICATION_EXPORT_CHUNK_SIZE = config('JOB_APPLICATION_EXPORT_CHUNK_SIZE', 2000, cast=int)
+
+# How job applications are taken in: 'sync' stores them before answering,
+# 'stream' answers 202 once they are queued on the JOB_APPLICATION_INTAKE_STREAM
+# Redis stream and consume_job_application_intake stores them in batches
+JOB_APPLICATION_INTAKE = config('JOB_APPLICATION_INTAKE', 'sync')
+JOB_APPLICATION_INTAKE_STREAM = config('JOB_APPLICATION_INTAKE_STREAM',
+                                       'job-applications:intake')
+JOB_APPLICATION_INTAKE_BATCH_SIZE = config('JOB_APPLICATION_INTAKE_BATCH_SIZE', 500, cast=int)
+# Seconds the intake status of a job application, and its Idempotency-Key, are kept
+JOB_APPLICATION_INTAKE_STATUS_TTL = config('JOB_APPLICATION_INTAKE_STATUS_TTL', 86400, cast=int)
+# Seconds a queued job application may stay unacknowledged by the worker
+# that read it before another worker takes it over
+JOB_APPLICATION_INTAKE_CLAIM_IDLE = config('JOB_APPLICATION_INTAKE_CLAIM_IDLE', 60, cast=int)
+# Seconds the published state of a job advert is cached for the intake
+JOB_ADVERT_STATE_TTL = config('JOB_ADVERT_STATE_TTL', 300, cast=int)
+
 
 DEVELOPER_MODE = False
 
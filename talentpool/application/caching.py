@@ -0,0 +1,230 @@
+"""
+The job advert listing cache module
+NOTE: cached listing pages are keyed by a listing version, anything that
+changes what the listing shows bumps the version instead of hunting down
+every cached page; the stale pages simply expire. The published state of
+each advert is cached too, for the job application intake.
+"""
+import asyncio
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+LISTING_VERSION_KEY = 'job-adverts:listing:version'
+# How long a worker may hold the rebuild lock of an expired page
+LISTING_LOCK_TIMEOUT = 5
+LISTING_LOCK_POLL_INTERVAL = 0.05
+
+
+def get_listing_version() -> int:
+    """
+    The current listing version
+    NOTE: seeded from the clock so a version evicted from the cache can
+    never come back as a number that older pages were stored under
+    :return int:
+    """
+    version = cache.get(LISTING_VERSION_KEY)
+    if version is None:
+        cache.add(LISTING_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(LISTING_VERSION_KEY)
+    return version
+
+
+async def aget_listing_version() -> int:
+    """
+    Async twin of get_listing_version
+    :return int:
+    """
+    version = await cache.aget(LISTING_VERSION_KEY)
+    if version is None:
+        await cache.aadd(LISTING_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(LISTING_VERSION_KEY)
+    return version
+
+
+def _bump_listing_version() -> None:
+    """
+    Move the listing to a new version
+    :return None:
+    """
+    try:
+        cache.incr(LISTING_VERSION_KEY)
+    except ValueError:
+        cache.add(LISTING_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def job_advert_state_key(job_advert_id) -> str:
+    """
+    The cache key of the published state of a job advert
+    :param job_advert_id:
+    :return str:
+    """
+    return f'job-advert:state:{job_advert_id}'
+
+
+def get_job_advert_state(job_advert_id, load):
+    """
+    Whether the job advert is published, from the advert state cache
+    NOTE: entries live JOB_ADVERT_STATE_TTL seconds and are dropped when the
+    advert is published or unpublished (see invalidate_listing)
+    :param job_advert_id:
+    :param load: callable returning the state from the database, None when
+        there is no such job advert
+    :return bool | None: None when there is no such job advert
+    """
+    key = job_advert_state_key(job_advert_id)
+    state = cache.get(key)
+    if state is None:
+        published = load()
+        state = 'missing' if published is None else published
+        cache.set(key, state, timeout=settings.JOB_ADVERT_STATE_TTL)
+    return None if state == 'missing' else state
+
+
+def invalidate_listing(job_advert_ids=()) -> None:
+    """
+    Invalidate every cached listing page once the current transaction commits
+    NOTE: bumping before the commit would let a concurrent request cache the
+    old rows under the new version
+    :param job_advert_ids: the job adverts that were published or
+        unpublished, their cached states are dropped along
+    :return None:
+    """
+    keys = [job_advert_state_key(job_advert_id) for job_advert_id in job_advert_ids]
+    if not keys:
+        transaction.on_commit(_bump_listing_version)
+        return
+
+    def invalidate():
+        _bump_listing_version()
+        cache.delete_many(keys)
+    transaction.on_commit(invalidate)
+
+
+def _listing_digest(request) -> str:
+    """
+    Digest of the scheme, host and path (the page links are absolute, and
+    the sync and async listings link to themselves) and the query string
+    (page, page_size, cursor, ...) of a listing request
+    :param request:
+    :return str:
+    """
+    query = '&'.join(sorted(
+        f'{key}={value}' for key, values in request.query_params.lists() for value in values))
+    return hashlib.md5(
+        f'{request.scheme}://{request.get_host()}{request.path}?{query}'.encode()).hexdigest()
+
+
+def listing_cache_key(request, version=None) -> str:
+    """
+    The cache key of a listing page under the listing version
+    :param request:
+    :param version:
+    :return str:
+    """
+    if version is None:
+        version = get_listing_version()
+    return f'job-adverts:listing:encoded:{version}:{_listing_digest(request)}'
+
+
+async def alisting_cache_key(request) -> str:
+    """
+    Async twin of listing_cache_key
+    :param request:
+    :return str:
+    """
+    return listing_cache_key(request, version=await aget_listing_version())
+
+
+def listing_etag(request) -> str:
+    """
+    Strong ETag of a listing page: it changes whenever the listing version
+    does, so it is answered from the cache without touching the database
+    :param request:
+    :return str:
+    """
+    *_, version, digest = listing_cache_key(request).split(':')
+    return f'{version}-{digest}'
+
+
+async def alisting_etag(request) -> str:
+    """
+    Async twin of listing_etag
+    :param request:
+    :return str:
+    """
+    *_, version, digest = (await alisting_cache_key(request)).split(':')
+    return f'{version}-{digest}'
+
+
+def get_or_build_listing(request, build):
+    """
+    Return the cached listing page, building it on a miss
+    NOTE: only the worker holding the rebuild lock queries the database,
+    the others wait for its page instead of stampeding on the same query.
+    When the lock is released without a page (the build raised) the next
+    waiter takes it over at once rather than waiting out the lock timeout.
+    :param request:
+    :param build: callable returning the page, as stored in the cache
+    :return:
+    """
+    key = listing_cache_key(request)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + LISTING_LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, timeout=LISTING_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            # The rebuilding worker died or is too slow, do not wait any longer
+            return build()
+        time.sleep(LISTING_LOCK_POLL_INTERVAL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    try:
+        # The page may have been stored between the last poll and the lock
+        data = cache.get(key)
+        if data is None:
+            data = build()
+            cache.set(key, data, timeout=settings.CACHES_EXPIRY)
+    finally:
+        cache.delete(lock_key)
+    return data
+
+
+async def aget_or_build_listing(request, build):
+    """
+    Async twin of get_or_build_listing
+    NOTE: waiting for another worker's rebuild sleeps on the event loop
+    instead of holding a thread
+    :param request:
+    :param build: callable returning an awaitable of the page, as stored in the cache
+    :return:
+    """
+    key = await alisting_cache_key(request)
+    data = await cache.aget(key)
+    if data is not None:
+        return data
+
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + LISTING_LOCK_TIMEOUT
+    while not await cache.aadd(lock_key, 1, timeout=LISTING_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return await build()
+        await asyncio.sleep(LISTING_LOCK_POLL_INTERVAL)
+        data = await cache.aget(key)
+        if data is not None:
+            return data
+    try:
+        data = await cache.aget(key)
+        if data is None:
+            data = await build()
+            await cache.aset(key, data, timeout=settings.CACHES_EXPIRY)
+    finally:
+        await cache.adelete(lock_key)
+    return data
@@ -0,0 +1,204 @@
+"""
+The job application intake module
+NOTE: with JOB_APPLICATION_INTAKE=stream an application is acknowledged as
+soon as it is queued on a Redis stream; the consume_job_application_intake
+task reads the stream through a consumer group and stores the queued
+applications in batches. Every queued application has a status entry
+(queued, then created, duplicate or invalid) kept for
+JOB_APPLICATION_INTAKE_STATUS_TTL seconds. Applications that cannot be
+stored are moved to the dead-letter stream, so they never block the ones
+queued after them.
+"""
+import functools
+import hashlib
+import os
+import socket
+from uuid import uuid4
+
+import redis
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+from talentpool.interface.renderers import dumps, loads
+
+INTAKE_CONSUMER_GROUP = 'job-application-writers'
+# Queues the application and claims the idempotency key in one step, so a
+# retried request either finds its first attempt or queues itself, never half
+_ENQUEUE_SCRIPT = """
+if KEYS[3] then
+    local first = redis.call('GET', KEYS[3])
+    if first then
+        return first
+    end
+    redis.call('SET', KEYS[3], ARGV[3], 'EX', ARGV[4])
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[4])
+redis.call('XADD', KEYS[1], '*', 'application', ARGV[1])
+return false
+"""
+
+
+@functools.cache
+def redis_client() -> redis.Redis:
+    """
+    The Redis connection of the intake stream, shared by the process
+    :return redis.Redis:
+    """
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+@functools.cache
+def _enqueue_script():
+    """
+    The queuing script, registered with the intake Redis
+    :return redis.commands.core.Script:
+    """
+    return redis_client().register_script(_ENQUEUE_SCRIPT)
+
+
+def _status_key(job_application_id) -> str:
+    """
+    The key of the intake status of a job application
+    :param job_application_id:
+    :return str:
+    """
+    return f'{settings.JOB_APPLICATION_INTAKE_STREAM}:status:{job_application_id}'
+
+
+def dead_letter_stream() -> str:
+    """
+    The stream the job applications that cannot be stored are moved to
+    :return str:
+    """
+    return f'{settings.JOB_APPLICATION_INTAKE_STREAM}:dead-letter'
+
+
+def _idempotency_key(key) -> str:
+    """
+    The key of an Idempotency-Key, hashed as clients pick them
+    :param key:
+    :return str:
+    """
+    return (f'{settings.JOB_APPLICATION_INTAKE_STREAM}:idempotency:'
+            f'{hashlib.sha256(key.encode()).hexdigest()}')
+
+
+def enqueue_job_application(data, idempotency_key=None) -> dict:
+    """
+    Queue a validated job application on the intake stream
+    NOTE: an idempotency key already used for the same application returns
+    the first attempt instead of queuing it again
+    :param data: the validated job application
+    :param idempotency_key:
+    :return dict: the uuid of the job application and its status
+    """
+    content = dumps(data)
+    digest = hashlib.sha256(content).hexdigest()
+    job_application_id = str(uuid4())
+    keys = [settings.JOB_APPLICATION_INTAKE_STREAM, _status_key(job_application_id)]
+    if idempotency_key is not None:
+        keys.append(_idempotency_key(idempotency_key))
+    first = _enqueue_script()(keys=keys, args=[
+        dumps({'uuid': job_application_id, **data}),
+        dumps({'status': 'queued'}),
+        dumps({'uuid': job_application_id, 'digest': digest}),
+        settings.JOB_APPLICATION_INTAKE_STATUS_TTL,
+    ])
+    if first is None:
+        return {'uuid': job_application_id, 'status': 'queued'}
+
+    first = loads(first)
+    if first['digest'] != digest:
+        raise ValidationError(
+            {'detail': 'This Idempotency-Key was used for another job application.'})
+    return {'uuid': first['uuid'],
+            **(get_job_application_status(first['uuid']) or {'status': 'queued'})}
+
+
+def get_job_application_status(job_application_id) -> dict | None:
+    """
+    The intake status of a queued job application
+    :param job_application_id:
+    :return dict | None: None when it was never queued or its status expired
+    """
+    status = redis_client().get(_status_key(job_application_id))
+    return None if status is None else loads(status)
+
+
+def _consumer_name() -> str:
+    """
+    The name of this worker process in the consumer group
+    :return str:
+    """
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def read_job_applications(count) -> list:
+    """
+    Read the next queued job applications for this consumer
+    NOTE: applications another consumer read but did not acknowledge within
+    JOB_APPLICATION_INTAKE_CLAIM_IDLE seconds (it died) are taken over first
+    :param count:
+    :return list: (entry id, job application) pairs
+    """
+    client = redis_client()
+    stream = settings.JOB_APPLICATION_INTAKE_STREAM
+    try:
+        client.xgroup_create(stream, INTAKE_CONSUMER_GROUP, id='0', mkstream=True)
+    except redis.ResponseError as exc:
+        if 'BUSYGROUP' not in str(exc):
+            raise
+
+    entries = client.xautoclaim(
+        stream, INTAKE_CONSUMER_GROUP, _consumer_name(),
+        min_idle_time=settings.JOB_APPLICATION_INTAKE_CLAIM_IDLE * 1000, count=count)[1]
+    if not entries:
+        entries = next(iter(client.xreadgroup(
+            INTAKE_CONSUMER_GROUP, _consumer_name(), {stream: '>'}, count=count)), [None, []])[1]
+    # Entries deleted while pending come back empty, there is nothing left to store
+    deleted = [entry_id for entry_id, fields in entries if not fields]
+    if deleted:
+        client.xack(stream, INTAKE_CONSUMER_GROUP, *deleted)
+    return [(entry_id, loads(fields[b'application'])) for entry_id, fields in entries if fields]
+
+
+def acknowledge_job_applications(entry_ids, statuses) -> None:
+    """
+    Record the outcome of stored job applications and drop them from the stream
+    :param entry_ids: the stream entries of the job applications
+    :param statuses: the status of every job application, by uuid
+    :return None:
+    """
+    stream = settings.JOB_APPLICATION_INTAKE_STREAM
+    with redis_client().pipeline() as pipeline:
+        for job_application_id, status in statuses.items():
+            pipeline.set(_status_key(job_application_id), dumps(status),
+                         ex=settings.JOB_APPLICATION_INTAKE_STATUS_TTL)
+        if entry_ids:
+            pipeline.xack(stream, INTAKE_CONSUMER_GROUP, *entry_ids)
+            pipeline.xdel(stream, *entry_ids)
+        pipeline.execute()
+
+
+def dead_letter_job_applications(entries, error) -> None:
+    """
+    Move job applications that cannot be stored to the dead-letter stream,
+    with the error, and mark them invalid
+    :param entries: (entry id, job application) pairs
+    :param error: why they could not be stored
+    :return None:
+    """
+    stream = settings.JOB_APPLICATION_INTAKE_STREAM
+    status = dumps({'status': 'invalid',
+                    'errors': {'detail': 'The job application could not be stored.'}})
+    with redis_client().pipeline() as pipeline:
+        for entry_id, application in entries:
+            pipeline.xadd(dead_letter_stream(), {
+                'entry': entry_id, 'application': dumps(application), 'error': error})
+            if isinstance(application, dict) and 'uuid' in application:
+                pipeline.set(_status_key(application['uuid']), status,
+                             ex=settings.JOB_APPLICATION_INTAKE_STATUS_TTL)
+        entry_ids = [entry_id for entry_id, _ in entries]
+        pipeline.xack(stream, INTAKE_CONSUMER_GROUP, *entry_ids)
+        pipeline.xdel(stream, *entry_ids)
+        pipeline.execute()
@@ -0,0 +1,214 @@
+"""
+The job advert listing module
+NOTE: the queries behind the listing: its filters, the search, the rows in
+listing order and the facet counts. JobAdvertService builds and caches the
+pages from them.
+"""
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Case, Count, F, TextField, Value, When
+from django.db.models.functions import Concat, Length, Substr
+from django.db.models.lookups import GreaterThan
+from rest_framework.exceptions import ValidationError
+
+from talentpool.application.pagination import JobAdvertPagination, JobAdvertCursorPagination
+from talentpool.interface.serializers import (JobAdvertListingFilterSerializer,
+                                              JobAdvertValuesSerializer,
+                                              JobAdvertSummaryValuesSerializer)
+from talentpool.models import JobAdvert, SEARCH_CONFIG
+
+# The listing facets, each one a filter parameter of the listing
+JOB_ADVERT_FACETS = ('employment_type', 'experience_level', 'location')
+# An excluded -term of a web search query
+EXCLUDED_SEARCH_TERM = re.compile(r'(?:^|\s)-[^\s"]+(?=\s|$)')
+
+
+class JobAdvertListingService:
+    """
+    The job advert listing service
+    """
+
+    @staticmethod
+    def listing_queryset():
+        """
+        The published job adverts
+        :return QuerySet:
+        """
+        return JobAdvert.objects.filter(is_published=True)
+
+    @staticmethod
+    def listing_paginator(params):
+        """
+        The paginator of the listing page asked for
+        NOTE: pass pagination=cursor (or a cursor) for keyset pagination,
+        which skips the total count and stays flat at any depth. Searches
+        are ranked, so they always use page numbers.
+        :param params:
+        :return JobAdvertPagination | JobAdvertCursorPagination:
+        """
+        if params.query_params.get('q'):
+            return JobAdvertPagination()
+        if (params.query_params.get('pagination') == 'cursor'
+                or 'cursor' in params.query_params):
+            return JobAdvertCursorPagination()
+        return JobAdvertPagination()
+
+    @staticmethod
+    def listing_filters(params) -> dict:
+        """
+        The validated filter parameters of a listing request
+        :param params:
+        :return dict:
+        """
+        serializer = JobAdvertListingFilterSerializer(data=params.query_params)
+        if not serializer.is_valid():
+            raise ValidationError(serializer.errors)
+        return serializer.validated_data
+
+    @staticmethod
+    def search_job_adverts(params):
+        """
+        The published job adverts matching the q search, all of them without q
+        NOTE: q takes web search syntax ("exact phrase", or, -excluded) and
+        is matched against search_vector through its GIN index
+        :param params:
+        :return QuerySet:
+        """
+        queryset = JobAdvertListingService.listing_queryset()
+        search = params.query_params.get('q', '').strip()
+        if not search:
+            return queryset
+        return queryset.filter(
+            search_vector=SearchQuery(search, search_type='websearch', config=SEARCH_CONFIG))
+
+    @staticmethod
+    def job_advert_listing_queryset(params):
+        """
+        The rows of the listing in listing order, or the adverts matching
+        the q search, best match first
+        NOTE: each facet filter (employment_type, experience_level, location)
+        is served by its own partial index in listing order
+        :param params:
+        :return QuerySet:
+        """
+        filters = JobAdvertListingService.listing_filters(params)
+        queryset = JobAdvertListingService.search_job_adverts(params).filter(**{
+            f'{facet}__in': filters[facet] for facet in JOB_ADVERT_FACETS if filters.get(facet)
+        })
+        search = params.query_params.get('q', '').strip()
+        if not search:
+            # Every row is published, sorting on is_published would only keep
+            # the planner from walking the partial indexes in order
+            return queryset.order_by('-applicant_count', 'created', 'uuid')
+        # ts_rank scores any query holding a negation as 0, so rank on the
+        # terms wanted only; the filter still drops the excluded ones
+        ranked = SearchQuery(EXCLUDED_SEARCH_TERM.sub(' ', search),
+                             search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.annotate(
+            rank=SearchRank(F('search_vector'), ranked)
+        ).order_by('-rank', '-applicant_count', 'created', 'uuid')
+
+    @staticmethod
+    def listing_values_serializer(params):
+        """
+        The values serializer of the listing view asked for
+        NOTE: view=summary leaves out description and job_description, the
+        unbounded TEXT columns, for an excerpt of the description
+        :param params:
+        :return type[ValuesSerializer]:
+        """
+        if JobAdvertListingService.listing_filters(params)['view'] == 'summary':
+            return JobAdvertSummaryValuesSerializer
+        return JobAdvertValuesSerializer
+
+    @staticmethod
+    def job_advert_listing_values(params):
+        """
+        The listing rows as the columns its values serializer reads, pruned
+        to the sparse fieldset asked for, and the columns the cursor
+        positions hold
+        NOTE: the excerpt of the summary view is cut in the database, so the
+        full description never leaves it
+        :param params:
+        :return QuerySet:
+        """
+        queryset = JobAdvertListingService.job_advert_listing_queryset(params)
+        values_serializer = JobAdvertListingService.listing_values_serializer(params)
+        fieldset = values_serializer.sparse_fieldset(params)
+        if values_serializer is JobAdvertSummaryValuesSerializer and (
+                fieldset is None or 'excerpt' in fieldset):
+            length = settings.JOB_ADVERT_EXCERPT_LENGTH
+            queryset = queryset.annotate(excerpt=Case(
+                When(GreaterThan(Length('description'), length),
+                     then=Concat(Substr('description', 1, length), Value('…'),
+                                 output_field=TextField())),
+                default=F('description'),
+            ))
+        cursor_columns = [field.lstrip('-') for field in JobAdvertCursorPagination.ordering]
+        return values_serializer.values(queryset, *cursor_columns, fieldset=fieldset)
+
+    @staticmethod
+    def job_advert_facet_groups(params):
+        """
+        The number of matching adverts per employment type, experience level
+        and location combination, ignoring the facet filters
+        :param params:
+        :return QuerySet:
+        """
+        return JobAdvertListingService.search_job_adverts(params).order_by().values(
+            *JOB_ADVERT_FACETS).annotate(count=Count('*'))
+
+    @staticmethod
+    def count_job_advert_facets(filters, groups) -> dict:
+        """
+        The facet block of the listing from its facet groups
+        NOTE: a facet counts the adverts matching every filter but its own,
+        so a filter UI can still show the alternatives to the values picked
+        :param filters: the listing filters
+        :param groups: the rows of job_advert_facet_groups
+        :return dict:
+        """
+        counts = {facet: Counter() for facet in JOB_ADVERT_FACETS}
+        for group in groups:
+            for facet in JOB_ADVERT_FACETS:
+                if all(group[other] in filters[other] for other in JOB_ADVERT_FACETS
+                       if other != facet and filters.get(other)):
+                    counts[facet][group[facet]] += group['count']
+        locations = sorted(counts['location'].items(), key=lambda item: (-item[1], item[0]))
+        return {
+            'employment_type': [
+                {'value': value, 'label': label, 'count': counts['employment_type'][value]}
+                for value, label in JobAdvert.EMPLOYMENT_TYPES],
+            'experience_level': [
+                {'value': value, 'label': label, 'count': counts['experience_level'][value]}
+                for value, label in JobAdvert.EXPERIENCE_LEVELS],
+            'location': [
+                {'value': value, 'label': value, 'count': count}
+                for value, count in locations[:settings.JOB_ADVERT_LOCATION_FACET_SIZE]],
+        }
+
+    @staticmethod
+    def job_advert_facets(params) -> dict:
+        """
+        Counts of the listing per employment type, experience level and location
+        NOTE: one grouped query for the three facets
+        :param params:
+        :return dict:
+        """
+        return JobAdvertListingService.count_job_advert_facets(
+            JobAdvertListingService.listing_filters(params),
+            JobAdvertListingService.job_advert_facet_groups(params))
+
+    @staticmethod
+    async def ajob_advert_facets(params) -> dict:
+        """
+        Async twin of job_advert_facets
+        :param params:
+        :return dict:
+        """
+        return JobAdvertListingService.count_job_advert_facets(
+            JobAdvertListingService.listing_filters(params),
+            [group async for group in JobAdvertListingService.job_advert_facet_groups(params)])
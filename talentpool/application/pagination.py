@@ -0,0 +1,235 @@
+"""
+The pagination classes module
+"""
+from uuid import UUID
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination that can also paginate from the async views
+    """
+    # The state of the page being paginated, set by (a)paginate_queryset
+    request = None
+    page = None
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        Async twin of paginate_queryset, for the async views
+        NOTE: the count is taken up front with acount(), the Django paginator
+        then only checks the page number against it
+        :param queryset:
+        :param request:
+        :return list:
+        """
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc))) from exc
+        page.object_list = [row async for row in page.object_list]
+        self.page = page
+        return page.object_list
+
+
+class JobAdvertPagination(AsyncPageNumberPagination):
+    """
+    Job Advert Pagination class
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class JobApplicationPagination(AsyncPageNumberPagination):
+    """
+    Job Application Pagination class
+    NOTE: use the export endpoint to fetch every application at once
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class JobAdvertCursorPagination(CursorPagination):  # pylint: disable=R0902
+    """
+    Job Advert keyset (cursor) pagination class
+    NOTE: The cursor holds the full (-applicant_count, created, uuid) position
+    of the last row seen, so the next page is a range scan from that row:
+    no COUNT(*) and no OFFSET, every page costs the same however deep it is.
+    CursorPagination.paginate_queryset compares the first ordering field
+    only, skipping ties with an offset, so the page query is built here;
+    the ordering, the cursor encoding and decoding go through its hooks.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-applicant_count', 'created', 'uuid')
+    position_separator = '|'
+    # The state of the page being paginated, set by page_queryset and set_page
+    request = None
+    base_url = None
+    cursor = None
+    reverse = False
+    position = None
+    page = None
+    has_next = False
+    has_previous = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return a single page of results after (or before) the cursor position
+        :param queryset:
+        :param request:
+        :param view:
+        :return list:
+        """
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        Async twin of paginate_queryset, for the async views
+        :param queryset:
+        :param request:
+        :return list:
+        """
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """
+        The rows of the requested page, plus one to tell whether another follows
+        :param queryset:
+        :param request:
+        :return QuerySet:
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor is not None and self.cursor.reverse
+        self.position = None if self.cursor is None else self.cursor.position
+
+        ordering = self.get_ordering(request, queryset, None)
+        if self.reverse:
+            ordering = tuple(field[1:] if field.startswith('-') else f'-{field}'
+                             for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.keyset_filter(self.position, self.reverse))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results) -> list:
+        """
+        Keep the page out of the fetched rows and work out its neighbours
+        :param results: the rows of page_queryset
+        :return list:
+        """
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.position is not None
+        return self.page
+
+    def keyset_filter(self, position, reverse=False) -> Q:
+        """
+        Build the row-comparison predicate for rows after the position
+        in the listing ordering (or before it when reverse is set)
+        :param position:
+        :param reverse:
+        :return Q:
+        """
+        predicate = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            predicate |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return predicate
+
+    def encode_position(self, item) -> str:
+        """
+        Encode the ordering values of a row into a cursor position
+        :param item:
+        :return str:
+        """
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = item[name] if isinstance(item, dict) else getattr(item, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return self.position_separator.join(values)
+
+    def encode_cursor(self, cursor):
+        """
+        The URL of the cursor, whose position is the row the page starts after
+        :param cursor:
+        :return str:
+        """
+        if cursor.position is not None:
+            cursor = cursor._replace(position=self.encode_position(cursor.position))
+        return super().encode_cursor(cursor)
+
+    def decode_cursor(self, request):
+        """
+        The cursor of the request, its position decoded into the ordering values
+        :param request:
+        :return Cursor | None:
+        """
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        return cursor._replace(position=self.decode_position(cursor.position))
+
+    def decode_position(self, position) -> tuple:
+        """
+        Decode a cursor position back into (applicant_count, created, uuid)
+        :param position:
+        :return tuple:
+        """
+        try:
+            applicant_count, created, uuid = position.split(self.position_separator)
+            created = parse_datetime(created)
+            if created is None:
+                raise ValueError(position)
+            return int(applicant_count), created, UUID(uuid)
+        except ValueError as exc:
+            raise NotFound(self.invalid_cursor_message) from exc
+
+    def get_next_link(self):
+        """
+        Link to the page after the last row of this page
+        :return str:
+        """
+        if not self.has_next:
+            return None
+        # An empty page reached backwards means we are before the first row
+        position = self.page[-1] if self.page else None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        """
+        Link to the page before the first row of this page
+        :return str:
+        """
+        if not self.has_previous:
+            return None
+        # An empty page reached forwards means the previous page is the last one
+        position = self.page[0] if self.page else None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
@@ -0,0 +1,215 @@
+"""
+The job advert publishing module
+NOTE: publishing many job adverts at once and publishing the scheduled
+ones: every scheduled advert gets its own ETA task, and a periodic sweep
+publishes the due adverts whose task was lost. JobAdvertService schedules
+the adverts it creates and updates through it.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from talentpool.application.caching import invalidate_listing
+from talentpool.interface.serializers import JobAdvertIdListField
+from talentpool.models import JobAdvert
+
+LOG = logging.getLogger(__name__)
+
+
+class JobAdvertPublishingService:
+    """
+    The job advert bulk publishing and scheduling service
+    """
+
+    @staticmethod
+    def publish_job_adverts(job_advert_ids) -> dict:
+        """
+        Publish many job adverts at once
+        :param job_advert_ids:
+        :return dict:
+        """
+        return JobAdvertPublishingService.set_job_adverts_published(job_advert_ids, True)
+
+    @staticmethod
+    def unpublish_job_adverts(job_advert_ids) -> dict:
+        """
+        Unpublish many job adverts at once
+        :param job_advert_ids:
+        :return dict:
+        """
+        return JobAdvertPublishingService.set_job_adverts_published(job_advert_ids, False)
+
+    @staticmethod
+    def set_job_adverts_published(job_advert_ids, published) -> dict:
+        """
+        Flip is_published on many job adverts in a single UPDATE ... RETURNING
+        NOTE: only the adverts not already in that state are touched, and
+        the listing is invalidated once for the whole batch
+        :param job_advert_ids: a list of job advert uuids
+        :param published:
+        :return dict: the uuids that changed and the ones that did not
+            (already in that state or unknown)
+        """
+        job_advert_ids = list(dict.fromkeys(JobAdvertIdListField(
+            max_length=settings.JOB_ADVERT_BULK_MAX_SIZE).run_validation(job_advert_ids)))
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {JobAdvert._meta.db_table} '
+                    'SET is_published = %s, modified = %s '
+                    'WHERE uuid = ANY(%s) AND is_published = %s RETURNING uuid',
+                    (published, timezone.now(), job_advert_ids, not published)
+                )
+                changed = {row[0] for row in cursor.fetchall()}
+            if changed:
+                invalidate_listing(changed)
+        return {
+            'changed': [str(uuid) for uuid in job_advert_ids if uuid in changed],
+            'unchanged': [str(uuid) for uuid in job_advert_ids if uuid not in changed],
+        }
+
+    @staticmethod
+    def schedule_job_advert(job_advert) -> None:
+        """
+        Enqueue the publish task of a scheduled job advert for its publish time
+        NOTE: the task is sent once the transaction commits so the worker
+        always sees the saved publish_at
+        :param job_advert:
+        :return None:
+        """
+        JobAdvertPublishingService.schedule_job_adverts([job_advert])
+
+    @staticmethod
+    def schedule_job_adverts(job_adverts) -> None:
+        """
+        Enqueue the publish tasks of the scheduled job adverts in one pass
+        :param job_adverts:
+        :return None:
+        """
+        schedule = [(str(job_advert.uuid), job_advert.publish_at) for job_advert in job_adverts
+                    if job_advert.is_scheduled and not job_advert.is_published
+                    and job_advert.publish_at]
+        if not schedule:
+            return
+
+        def enqueue():
+            for job_advert_id, publish_at in schedule:
+                JobAdvertPublishingService.publish_job_advert_at.apply_async(
+                    args=[job_advert_id, publish_at.isoformat()],
+                    eta=JobAdvertPublishingService._publish_eta(publish_at))
+        transaction.on_commit(enqueue)
+
+    @staticmethod
+    def _publish_eta(publish_at):
+        """
+        The ETA of a publish task, at most JOB_ADVERT_PUBLISH_ETA_HORIZON away
+        NOTE: the broker redelivers a task still waiting for its ETA after the
+        visibility timeout, so a task for a later publish time waits for the
+        horizon and enqueues itself again
+        :param publish_at:
+        :return datetime:
+        """
+        return min(publish_at, timezone.now() + timedelta(
+            seconds=settings.JOB_ADVERT_PUBLISH_ETA_HORIZON))
+
+    @staticmethod
+    @shared_task
+    def publish_job_advert_at(job_advert_id, publish_at) -> bool:
+        """
+        Publish Scheduled Job Advert ETA Task
+        NOTE: a no-op when the advert has since been rescheduled, unscheduled
+        or published, so rescheduling never needs to revoke the old task and
+        a redelivered task cannot publish twice. Delivered before the publish
+        time (a hop of a publish time past the ETA horizon, worker clock
+        skew), it enqueues itself again, unless the advert is no longer
+        scheduled for that time.
+        :param job_advert_id:
+        :param publish_at: the publish time the task was scheduled for
+        :return bool: whether the job advert was published
+        """
+        publish_at = parse_datetime(publish_at)
+        now = timezone.now()
+        scheduled = JobAdvert.objects.filter(
+            uuid=job_advert_id,
+            is_scheduled=True,
+            is_published=False,
+            publish_at=publish_at
+        )
+        if publish_at > now:
+            if scheduled.exists():
+                JobAdvertPublishingService.publish_job_advert_at.apply_async(
+                    args=[job_advert_id, publish_at.isoformat()],
+                    eta=JobAdvertPublishingService._publish_eta(publish_at))
+            return False
+        published = scheduled.update(is_published=True, is_scheduled=False, modified=now)
+        if published:
+            invalidate_listing([job_advert_id])
+        return bool(published)
+
+    @staticmethod
+    def due_job_adverts(now):
+        """
+        The scheduled job adverts whose publish time has come
+        NOTE: matches the jobadvert_due_publish_idx partial index predicate
+        :param now:
+        :return QuerySet:
+        """
+        return JobAdvert.objects.filter(
+            is_scheduled=True,
+            publish_at__lte=now,
+            is_published=False
+        )
+
+    @staticmethod
+    def publish_due_job_adverts(now, limit) -> list:
+        """
+        Publish up to limit due job adverts in a single UPDATE ... RETURNING
+        NOTE: rows are claimed with FOR UPDATE SKIP LOCKED, so concurrent
+        workers drain disjoint batches and never publish an advert twice
+        :param now:
+        :param limit:
+        :return list: the uuids of the published job adverts
+        """
+        due = JobAdvertPublishingService.due_job_adverts(now).order_by(
+            'publish_at').select_for_update(skip_locked=True).values('uuid')[:limit]
+        with transaction.atomic():
+            due_sql, due_params = due.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {JobAdvert._meta.db_table} '
+                    'SET is_published = TRUE, is_scheduled = FALSE, modified = %s '
+                    f'WHERE uuid IN ({due_sql}) RETURNING uuid',
+                    (now, *due_params)
+                )
+                published = [row[0] for row in cursor.fetchall()]
+            if published:
+                invalidate_listing(published)
+            return published
+
+    @staticmethod
+    @shared_task
+    def publish_scheduled_job_adverts(batch_size=None) -> dict:
+        """
+        Publish Scheduled Job Advert Task
+        NOTE: every scheduled advert has its own ETA task, this periodic sweep
+        is the safety net for tasks lost by the broker
+        :param batch_size: the number of job adverts published per UPDATE
+        :return dict: how many job adverts were published and how long it took
+        """
+        batch_size = batch_size or settings.JOB_ADVERT_PUBLISH_BATCH_SIZE
+        started = time.monotonic()
+        published = 0
+        while True:
+            batch = JobAdvertPublishingService.publish_due_job_adverts(timezone.now(), batch_size)
+            published += len(batch)
+            if len(batch) < batch_size:
+                break
+        elapsed = time.monotonic() - started
+        LOG.info('Published %d scheduled job adverts in %.3fs', published, elapsed)
+        return {'published': published, 'elapsed': elapsed}
@@ -1,32 +1,43 @@
 """
 The Service classes module
 """
+import hashlib
+import logging
+import time
+from collections import Counter
+from uuid import UUID
 
+from asgiref.sync import sync_to_async
 from celery import shared_task
+from django.conf import settings
 from django.contrib.auth import authenticate
 # Django Import
-from django.db.models import Count
-from django.utils import timezone
+from django.db import DataError, IntegrityError, connection, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.views.decorators.debug import sensitive_variables
 from rest_framework.authtoken.models import Token
 
 # Third-party imports
 from rest_framework.exceptions import ValidationError
-from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.settings import api_settings
 
+from job_board.routers import use_replica
+from talentpool.application import intake
+from talentpool.application.caching import (get_or_build_listing, aget_or_build_listing,
+                                            get_job_advert_state, invalidate_listing)
+from talentpool.application.listing import JobAdvertListingService
+from talentpool.application.pagination import JobApplicationPagination
+from talentpool.application.publishing import JobAdvertPublishingService
+from talentpool.interface.renderers import EncodedJSONResponse, dumps, encode_json
 from talentpool.interface.serializers import (UserSerializer, JobAdvertSerializer,
-                                              JobApplicationSerializer)
+                                              JobApplicationSerializer,
+                                              JobApplicationBulkSerializer,
+                                              JobAdvertValuesSerializer,
+                                              JobApplicationValuesSerializer)
 from talentpool.models import User, JobAdvert, JobApplication
 
-
-class JobAdvertPagination(PageNumberPagination):
-    """
-    Job Advert Pagination class
-    """
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+LOG = logging.getLogger(__name__)
 
 
 class UserService:
@@ -82,6 +93,16 @@ class UserService:
         except Exception as exc:
             raise ValidationError(exc.args[0]) from exc
 
+    @staticmethod
+    def logout_user(token) -> None:
+        """
+        Logout the user
+        NOTE: deleting the token drops it from the authentication caches
+        :param token:
+        :return None:
+        """
+        token.delete()
+
 
 class JobAdvertService:
     """
@@ -98,10 +119,46 @@ class JobAdvertService:
         """
         serializer = JobAdvertSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                job_advert = serializer.save()
+                JobAdvertPublishingService.schedule_job_advert(job_advert)
+                if job_advert.is_published:
+                    invalidate_listing()
             return serializer.data
         raise ValidationError(serializer.errors)
 
+    @staticmethod
+    def bulk_create_job_adverts(data) -> dict:
+        """
+        Create many job adverts at once, skipping the invalid ones
+        NOTE: the valid adverts are inserted JOB_ADVERT_BULK_BATCH_SIZE rows
+        per INSERT, scheduled in one pass and the listing is invalidated once
+        :param data: a list of job adverts
+        :return dict: the created job adverts and the errors by item index
+        """
+        if not isinstance(data, list):
+            raise ValidationError({'detail': 'Expected a list of job adverts.'})
+        if len(data) > settings.JOB_ADVERT_BULK_MAX_SIZE:
+            raise ValidationError({'detail': (
+                f'Send at most {settings.JOB_ADVERT_BULK_MAX_SIZE} job adverts at a time.')})
+
+        serializer = JobAdvertSerializer()
+        job_adverts, errors = [], []
+        for index, item in enumerate(data):
+            try:
+                job_adverts.append(JobAdvert(**serializer.run_validation(item)))
+            except ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+
+        if job_adverts:
+            with transaction.atomic():
+                JobAdvert.objects.bulk_create(
+                    job_adverts, batch_size=settings.JOB_ADVERT_BULK_BATCH_SIZE)
+                JobAdvertPublishingService.schedule_job_adverts(job_adverts)
+                if any(job_advert.is_published for job_advert in job_adverts):
+                    invalidate_listing()
+        return {'created': JobAdvertSerializer(job_adverts, many=True).data, 'errors': errors}
+
     @staticmethod
     def update_job_advert(job_advert_id, data) -> JobAdvert:
         """
@@ -110,63 +167,200 @@ class JobAdvertService:
         :param data:
         :return:
         """
-        try:
-            job_advert = JobAdvert.objects.get(uuid=job_advert_id)
-        except JobAdvert.DoesNotExist as exc:
-            raise ValidationError({'detail': exc.args[0]}) from exc
+        with transaction.atomic():
+            try:
+                job_advert = JobAdvert.objects.select_for_update().get(uuid=job_advert_id)
+            except JobAdvert.DoesNotExist as exc:
+                raise ValidationError({'detail': exc.args[0]}) from exc
 
-        serializer = JobAdvertSerializer(job_advert, data=data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return serializer.data
-        raise ValidationError(serializer.errors)
+            serializer = JobAdvertSerializer(job_advert, data=data, partial=True)
+            if serializer.is_valid():
+                job_advert = serializer.save()
+                # A new publish time gets a new task, the stale one becomes a no-op
+                if {'publish_at', 'is_scheduled'} & set(serializer.validated_data):
+                    JobAdvertPublishingService.schedule_job_advert(job_advert)
+                invalidate_listing(
+                    [job_advert.uuid] if 'is_published' in serializer.validated_data else ())
+                return serializer.data
+            raise ValidationError(serializer.errors)
 
     @staticmethod
     def delete_job_advert(job_advert_id) -> None:
         """
         Delete the job advert
-        NOTE: we cannot delete a job advert unless it is unpublished
+        NOTE: we cannot delete a job advert unless it is unpublished.
+        This is a single DELETE, the database cascades it to the applications
         :param job_advert_id:
         :return:
         """
-        try:
-            job_advert = JobAdvert.objects.get(uuid=job_advert_id)
-            if not job_advert.is_published:
-                job_advert.delete()
-            else:
-                raise ValidationError("Published job adverts cannot be deleted")
-        except JobAdvert.DoesNotExist as exc:
-            raise ValidationError({'detail': exc.args[0]}) from exc
+        deleted, _ = JobAdvert.objects.filter(uuid=job_advert_id, is_published=False).delete()
+        if deleted:
+            return
+        if JobAdvert.objects.filter(uuid=job_advert_id).exists():
+            raise ValidationError("Published job adverts cannot be deleted")
+        raise ValidationError({'detail': 'JobAdvert matching query does not exist.'})
 
     @staticmethod
-    def list_job_adverts(params) -> Response:
+    @use_replica()
+    def list_job_adverts(params) -> EncodedJSONResponse:
         """
         List job adverts
+        NOTE: pages are served from the listing cache, see
+        talentpool.application.caching for how they are invalidated. They
+        are cached already encoded and compressed, so a cache hit sends the
+        stored bytes as they are.
         :param params:
-        :return:
+        :return EncodedJSONResponse:
+        """
+        return EncodedJSONResponse(get_or_build_listing(
+            params, lambda: encode_json(JobAdvertService.build_job_advert_listing(params))))
+
+    @staticmethod
+    async def alist_job_adverts(params) -> dict:
+        """
+        Async twin of list_job_adverts, for the async views
+        :param params:
+        :return dict: the page encoded by encode_json
         """
-        queryset = JobAdvert.objects.filter(
-            is_published=True).annotate(applicant_count=Count('applications')).order_by(
-            '-is_published', '-applicant_count', 'created'
-        )
-        paginator = JobAdvertPagination()
+        async def build():
+            return encode_json(await JobAdvertService.abuild_job_advert_listing(params))
+
+        with use_replica():
+            return await aget_or_build_listing(params, build)
+
+    @staticmethod
+    def build_job_advert_listing(params) -> dict:
+        """
+        Build a page of the job advert listing
+        :param params:
+        :return dict:
+        """
+        queryset = JobAdvertListingService.job_advert_listing_values(params)
+        paginator = JobAdvertListingService.listing_paginator(params)
         result_page = paginator.paginate_queryset(queryset, params)
-        serializer = JobAdvertSerializer(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        values_serializer = JobAdvertListingService.listing_values_serializer(params)
+        data = paginator.get_paginated_response(values_serializer.serialize(
+            result_page, values_serializer.sparse_fieldset(params))).data
+        if JobAdvertListingService.listing_filters(params).get('facets'):
+            data['facets'] = JobAdvertListingService.job_advert_facets(params)
+        return data
+
+    @staticmethod
+    async def abuild_job_advert_listing(params) -> dict:
+        """
+        Async twin of build_job_advert_listing
+        :param params:
+        :return dict:
+        """
+        queryset = JobAdvertListingService.job_advert_listing_values(params)
+        paginator = JobAdvertListingService.listing_paginator(params)
+        result_page = await paginator.apaginate_queryset(queryset, params)
+        values_serializer = JobAdvertListingService.listing_values_serializer(params)
+        data = paginator.get_paginated_response(values_serializer.serialize(
+            result_page, values_serializer.sparse_fieldset(params))).data
+        if JobAdvertListingService.listing_filters(params).get('facets'):
+            data['facets'] = await JobAdvertListingService.ajob_advert_facets(params)
+        return data
+
+    @staticmethod
+    def reconcile_applicant_counts() -> int:
+        """
+        Reset every drifted applicant_count to the real number of applications
+        :return int: the number of job adverts corrected
+        """
+        applications = JobApplication.objects.filter(
+            job_advert=OuterRef('uuid')).order_by().values('job_advert').annotate(
+            total=Count('uuid')).values('total')
+        actual = Coalesce(Subquery(applications), 0)
+        corrected = JobAdvert.objects.exclude(applicant_count=actual).update(
+            applicant_count=actual)
+        if corrected:
+            invalidate_listing()
+        return corrected
 
     @staticmethod
-    def get_job_advert(job_advert_id) -> JobAdvert:
+    @use_replica()
+    def get_job_advert(job_advert_id, params=None) -> dict:
         """
         Get the job advert
+        NOTE: only the columns of the fields asked for (?fields=, ?exclude=)
+        are read
         :param job_advert_id:
-        :return:
+        :param params: the read request, for its sparse fieldset
+        :return dict:
         """
+        fieldset = JobAdvertValuesSerializer.sparse_fieldset(params)
         try:
-            job_advert = JobAdvert.objects.get(uuid=job_advert_id)
-            serializer = JobAdvertSerializer(job_advert)
-            return serializer.data
+            job_advert = JobAdvertValuesSerializer.values(
+                JobAdvert.objects.filter(uuid=job_advert_id), fieldset=fieldset).get()
         except JobAdvert.DoesNotExist as exc:
             raise ValidationError({'detail': exc.args[0]}) from exc
+        return JobAdvertValuesSerializer.to_representation(job_advert, fieldset)
+
+    @staticmethod
+    async def aget_job_advert(job_advert_id, params=None) -> dict:
+        """
+        Async twin of get_job_advert
+        :param job_advert_id:
+        :param params:
+        :return dict:
+        """
+        fieldset = JobAdvertValuesSerializer.sparse_fieldset(params)
+        with use_replica():
+            try:
+                job_advert = await JobAdvertValuesSerializer.values(
+                    JobAdvert.objects.filter(uuid=job_advert_id), fieldset=fieldset).aget()
+            except JobAdvert.DoesNotExist as exc:
+                raise ValidationError({'detail': exc.args[0]}) from exc
+        return JobAdvertValuesSerializer.to_representation(job_advert, fieldset)
+
+    @staticmethod
+    @use_replica()
+    def get_job_advert_etag(job_advert_id, params=None) -> str | None:
+        """
+        Strong ETag of the job advert detail, without loading the row
+        NOTE: applicant_count is part of it because the counter is updated
+        without touching modified
+        :param job_advert_id:
+        :param params: the read request, its sparse fieldset is part of the ETag
+        :return str | None: None when the job advert does not exist
+        """
+        fieldset = JobAdvertValuesSerializer.sparse_fieldset(params)
+        version = JobAdvert.objects.filter(uuid=job_advert_id).values_list(
+            'modified', 'applicant_count').first()
+        return JobAdvertService.format_job_advert_etag(job_advert_id, version, fieldset)
+
+    @staticmethod
+    async def aget_job_advert_etag(job_advert_id, params=None) -> str | None:
+        """
+        Async twin of get_job_advert_etag
+        :param job_advert_id:
+        :param params:
+        :return str | None:
+        """
+        fieldset = JobAdvertValuesSerializer.sparse_fieldset(params)
+        with use_replica():
+            version = await JobAdvert.objects.filter(uuid=job_advert_id).values_list(
+                'modified', 'applicant_count').afirst()
+        return JobAdvertService.format_job_advert_etag(job_advert_id, version, fieldset)
+
+    @staticmethod
+    def format_job_advert_etag(job_advert_id, version, fieldset=None) -> str | None:
+        """
+        Format the ETag of a job advert from its (modified, applicant_count)
+        and the sparse fieldset rendered
+        :param job_advert_id:
+        :param version:
+        :param fieldset:
+        :return str | None:
+        """
+        if version is None:
+            return None
+        modified, applicant_count = version
+        etag = f'{job_advert_id}-{modified.timestamp()}-{applicant_count}'
+        if fieldset is not None:
+            etag = f"{etag}-{hashlib.md5(','.join(fieldset).encode()).hexdigest()}"
+        return etag
 
     @staticmethod
     def publish_job_advert(job_advert_id) -> JobAdvert:
@@ -176,33 +370,17 @@ class JobAdvertService:
         :return:
         """
         try:
-            job_advert = JobAdvert.objects.get(uuid=job_advert_id, is_published=False)
-            job_advert.is_published = True
-            job_advert.save()
+            with transaction.atomic():
+                job_advert = JobAdvert.objects.select_for_update().get(
+                    uuid=job_advert_id, is_published=False)
+                job_advert.is_published = True
+                job_advert.save(update_fields=['is_published', 'modified'])
+                invalidate_listing([job_advert.uuid])
             serializer = JobAdvertSerializer(job_advert)
             return serializer.data
         except (JobAdvert.DoesNotExist, AttributeError) as exc:
             raise ValidationError({'detail': exc.args[0]}) from exc
 
-    @staticmethod
-    @shared_task
-    def publish_scheduled_job_adverts():
-        """
-        Publish Scheduled Job Advert Task
-        :return:
-        """
-        now = timezone.now()
-        job_adverts = JobAdvert.objects.filter(
-            is_scheduled=True,
-            publish_at__lte=now,
-            is_published=False
-        )
-
-        for job_advert in job_adverts:
-            job_advert.is_published = True
-            job_advert.is_scheduled = False
-            job_advert.save()
-
     @staticmethod
     def unpublish_job_advert(job_advert_id) -> JobAdvert:
         """
@@ -211,9 +389,12 @@ class JobAdvertService:
         :return:
         """
         try:
-            job_advert = JobAdvert.objects.get(uuid=job_advert_id)
-            job_advert.is_published = False
-            job_advert.save()
+            with transaction.atomic():
+                job_advert = JobAdvert.objects.select_for_update().get(uuid=job_advert_id)
+                if job_advert.is_published:
+                    job_advert.is_published = False
+                    job_advert.save(update_fields=['is_published', 'modified'])
+                    invalidate_listing([job_advert.uuid])
             serializer = JobAdvertSerializer(job_advert)
             return serializer.data
         except JobAdvert.DoesNotExist as exc:
@@ -229,52 +410,401 @@ class JobApplicationService:
     def create_job_application(data) -> JobApplication:
         """
         Create the job application
+        NOTE: the serializer checks the applicant has not applied for the
+        advert already; one stored by a concurrent request in between is
+        caught by the (job_advert, email) unique constraint
         :param data:
         :return:
         """
         serializer = JobApplicationSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                with transaction.atomic():
+                    job_application = serializer.save()
+                    JobAdvert.objects.filter(uuid=job_application.job_advert_id).update(
+                        applicant_count=F('applicant_count') + 1)
+                    # The applicant count drives the listing order
+                    invalidate_listing()
+            except IntegrityError as exc:
+                if 'jobapplication_advert_email_uniq' not in str(exc):
+                    raise
+                raise ValidationError(
+                    {api_settings.NON_FIELD_ERRORS_KEY: [
+                        'The fields job_advert, email must make a unique set.']},
+                    code='unique') from exc
             return serializer.data
         raise ValidationError(serializer.errors)
 
     @staticmethod
-    def get_job_applications(job_advert_id) -> [JobApplication]:
+    def bulk_create_job_applications(data, uuids=None) -> dict:
         """
-        Get the job applications
-        :param job_advert_id:
-        :return:
+        Ingest a batch of job applications
+        NOTE: the adverts of the batch are resolved in one query and the
+        applications inserted JOB_APPLICATION_BULK_BATCH_SIZE rows per INSERT
+        with ON CONFLICT DO NOTHING, so an applicant who already applied for
+        the advert (in this batch or before) is reported as a duplicate
+        :param data: a list of job applications
+        :param uuids: the uuid of every job application, when they were
+            handed out before it was stored (see submit_job_application). An
+            application already stored under its uuid is reported as created
+            again, so a batch can safely be stored twice.
+        :return dict: the outcome of every item, in the order they were sent
+        """
+        if not isinstance(data, list):
+            raise ValidationError({'detail': 'Expected a list of job applications.'})
+        if len(data) > settings.JOB_APPLICATION_BULK_MAX_SIZE:
+            raise ValidationError({'detail': (
+                f'Send at most {settings.JOB_APPLICATION_BULK_MAX_SIZE} '
+                'job applications at a time.')})
+
+        results, validated = JobApplicationService._validate_job_applications(data)
+        applications = JobApplicationService._resolve_job_applications(validated, results, uuids)
+        if applications:
+            JobApplicationService._insert_job_applications(applications, results)
+        return {
+            'created': sum(result['status'] == 'created' for result in results),
+            'results': results,
+        }
+
+    @staticmethod
+    def _validate_job_applications(data) -> tuple[list, dict]:
+        """
+        Validate every job application of a batch on its own
+        :param data:
+        :return tuple[list, dict]: the results, set for the invalid
+            applications, and the validated applications by index
+        """
+        serializer = JobApplicationBulkSerializer()
+        results, validated = [None] * len(data), {}
+        for index, item in enumerate(data):
+            try:
+                validated[index] = serializer.run_validation(item)
+            except ValidationError as exc:
+                results[index] = {'index': index, 'status': 'invalid', 'errors': exc.detail}
+        return results, validated
+
+    @staticmethod
+    def _resolve_job_applications(validated, results, uuids) -> dict:
+        """
+        Check the adverts of the validated applications in one query, drop
+        the duplicates within the batch and, given their uuids, the
+        applications already stored (reported as created)
+        :param validated: the validated applications by index
+        :param results: the results, set here for the rejected applications
+        :param uuids: the uuids handed out for the applications, or None
+        :return dict: the applications to store, by index
+        """
+        job_adverts = JobAdvert.objects.only('uuid', 'is_published').in_bulk(
+            {item['job_advert'] for item in validated.values()})
+        applications, seen = {}, set()
+        for index, item in validated.items():
+            job_advert_id = item.pop('job_advert')
+            job_advert = job_adverts.get(job_advert_id)
+            if job_advert is None:
+                results[index] = {'index': index, 'status': 'invalid', 'errors': {
+                    'job_advert': [f'Invalid pk "{job_advert_id}" - object does not exist.']}}
+            elif not job_advert.is_published:
+                results[index] = {'index': index, 'status': 'invalid', 'errors': {
+                    'job_advert': ['You cannot apply for a job that is not published.']}}
+            elif (job_advert_id, item['email']) in seen:
+                results[index] = {'index': index, 'status': 'duplicate'}
+            else:
+                seen.add((job_advert_id, item['email']))
+                if uuids is not None:
+                    item['uuid'] = uuids[index]
+                applications[index] = JobApplication(job_advert_id=job_advert_id, **item)
+        if uuids is not None and applications:
+            stored = set(JobApplication.objects.filter(uuid__in=[
+                application.uuid for application in applications.values()
+            ]).values_list('uuid', flat=True))
+            for index in [index for index, application in applications.items()
+                          if application.uuid in stored]:
+                results[index] = {'index': index, 'status': 'created',
+                                  'uuid': str(applications.pop(index).uuid)}
+        return applications
+
+    @staticmethod
+    def _insert_job_applications(applications, results) -> None:
+        """
+        Insert the applications, skipping the applicants who already applied,
+        and count the inserted ones on their adverts
+        :param applications: the applications to store, by index
+        :param results:
+        :return None:
+        """
+        with transaction.atomic():
+            JobApplication.objects.bulk_create(
+                applications.values(), batch_size=settings.JOB_APPLICATION_BULK_BATCH_SIZE,
+                ignore_conflicts=True)
+            # Rows skipped by ON CONFLICT are not reported back, look them up
+            inserted = set(JobApplication.objects.filter(
+                uuid__in=[application.uuid for application in applications.values()]
+            ).values_list('uuid', flat=True))
+            counts = Counter(application.job_advert_id
+                             for application in applications.values()
+                             if application.uuid in inserted)
+            if counts:
+                JobAdvert.objects.filter(uuid__in=counts).update(
+                    applicant_count=F('applicant_count') + Case(
+                        *[When(uuid=job_advert_id, then=Value(count))
+                          for job_advert_id, count in counts.items()],
+                        default=Value(0)))
+                invalidate_listing()
+        for index, application in applications.items():
+            if application.uuid in inserted:
+                results[index] = {'index': index, 'status': 'created',
+                                  'uuid': str(application.uuid)}
+            else:
+                results[index] = {'index': index, 'status': 'duplicate'}
+
+    @staticmethod
+    def submit_job_application(data, idempotency_key=None) -> dict:
+        """
+        Queue the job application on the intake stream, to be stored later
+        NOTE: only its shape is validated and the advert checked against the
+        cached advert states, the database is not touched on a cache hit.
+        That the applicant has not applied already is only known once it is
+        stored, get_job_application_status tells.
+        :param data:
+        :param idempotency_key: repeats of a request with the same key are
+            answered with the first one instead of being queued again
+        :return dict: the uuid of the job application and its status
+        """
+        serializer = JobApplicationBulkSerializer(data=data)
+        if not serializer.is_valid():
+            raise ValidationError(serializer.errors)
+        job_advert_id = serializer.validated_data['job_advert']
+        published = get_job_advert_state(
+            job_advert_id, lambda: JobAdvert.objects.filter(uuid=job_advert_id).values_list(
+                'is_published', flat=True).first())
+        if published is None:
+            raise ValidationError({'job_advert': [
+                f'Invalid pk "{job_advert_id}" - object does not exist.']})
+        if not published:
+            raise ValidationError({'job_advert': [
+                'You cannot apply for a job that is not published.']})
+        return intake.enqueue_job_application(serializer.validated_data, idempotency_key)
+
+    @staticmethod
+    @shared_task
+    def consume_job_application_intake(batch_size=None) -> dict:
+        """
+        Store the job applications queued on the intake stream
+        NOTE: applications are stored batch_size at a time (at most
+        JOB_APPLICATION_BULK_MAX_SIZE) through bulk_create_job_applications,
+        then acknowledged. A worker dying in between leaves its batch
+        pending, another run takes it over and the applications already
+        stored are not stored twice.
+        :param batch_size: the number of job applications stored per batch
+        :return dict: how many job applications were stored and how long it took
+        """
+        batch_size = min(batch_size or settings.JOB_APPLICATION_INTAKE_BATCH_SIZE,
+                         settings.JOB_APPLICATION_BULK_MAX_SIZE)
+        started = time.monotonic()
+        created = 0
+        while True:
+            entries = intake.read_job_applications(batch_size)
+            if entries:
+                created += JobApplicationService._store_job_application_intake(entries)
+            if len(entries) < batch_size:
+                break
+        elapsed = time.monotonic() - started
+        if created:
+            LOG.info('Stored %d queued job applications in %.3fs', created, elapsed)
+        return {'created': created, 'elapsed': elapsed}
+
+    @staticmethod
+    def _store_job_application_intake(entries) -> int:
+        """
+        Store job applications read from the intake stream and acknowledge them
+        NOTE: a batch that cannot be stored is retried one application at a
+        time; an application that cannot be stored on its own is moved to
+        the dead-letter stream instead of being read again and again.
+        Database outages are not the application's fault, they are raised
+        and the batch stays pending.
+        :param entries: (entry id, job application) pairs
+        :return int: the number of job applications stored
         """
         try:
-            job_applications = JobApplication.objects.filter(job_advert_id=job_advert_id)
-            serializer = JobApplicationSerializer(job_applications, many=True)
-            return serializer.data
-        except JobApplication.DoesNotExist as exc:
-            raise ValidationError({'detail': exc.args[0]}) from exc
+            applications = [dict(application) for _, application in entries]
+            uuids = [UUID(application.pop('uuid')) for application in applications]
+            result = JobApplicationService.bulk_create_job_applications(
+                applications, uuids=uuids)
+        except (ValidationError, DataError, IntegrityError,
+                KeyError, TypeError, ValueError) as exc:
+            if len(entries) > 1:
+                return sum(JobApplicationService._store_job_application_intake([entry])
+                           for entry in entries)
+            LOG.warning('Moved queued job application %s to the dead-letter stream: %r',
+                        entries[0][0], exc)
+            intake.dead_letter_job_applications(entries, repr(exc))
+            return 0
+        intake.acknowledge_job_applications(
+            [entry_id for entry_id, _ in entries],
+            {str(job_application_id): {
+                key: value for key, value in outcome.items() if key not in ('index', 'uuid')}
+             for job_application_id, outcome in zip(uuids, result['results'])})
+        return result['created']
+
+    @staticmethod
+    def get_job_application_status(job_application_id) -> dict:
+        """
+        The intake status of a job application: queued, then created,
+        duplicate or invalid (with its errors)
+        NOTE: a job application whose status expired, or that was not
+        queued at all, is looked up in the database
+        :param job_application_id:
+        :return dict:
+        """
+        status = intake.get_job_application_status(job_application_id)
+        if status is None:
+            if not JobApplication.objects.filter(uuid=job_application_id).exists():
+                raise ValidationError({'detail': 'JobApplication matching query does not exist.'})
+            status = {'status': 'created'}
+        return {'uuid': str(job_application_id), **status}
+
+    @staticmethod
+    def job_applications_queryset(job_advert_id):
+        """
+        The applications of a job advert in the order they came in
+        :param job_advert_id:
+        :return QuerySet:
+        """
+        return JobApplication.objects.filter(
+            job_advert_id=job_advert_id).order_by('created', 'uuid')
+
+    @staticmethod
+    @use_replica()
+    def get_job_applications(params, job_advert_id) -> dict:
+        """
+        Get a page of the job applications
+        :param params:
+        :param job_advert_id:
+        :return dict:
+        """
+        fieldset = JobApplicationValuesSerializer.sparse_fieldset(params)
+        queryset = JobApplicationValuesSerializer.values(
+            JobApplicationService.job_applications_queryset(job_advert_id), fieldset=fieldset)
+        paginator = JobApplicationPagination()
+        result_page = paginator.paginate_queryset(queryset, params)
+        return paginator.get_paginated_response(
+            JobApplicationValuesSerializer.serialize(result_page, fieldset)).data
+
+    @staticmethod
+    async def aget_job_applications(params, job_advert_id) -> dict:
+        """
+        Async twin of get_job_applications
+        :param params:
+        :param job_advert_id:
+        :return dict:
+        """
+        fieldset = JobApplicationValuesSerializer.sparse_fieldset(params)
+        with use_replica():
+            queryset = JobApplicationValuesSerializer.values(
+                JobApplicationService.job_applications_queryset(job_advert_id),
+                fieldset=fieldset)
+            paginator = JobApplicationPagination()
+            result_page = await paginator.apaginate_queryset(queryset, params)
+        return paginator.get_paginated_response(
+            JobApplicationValuesSerializer.serialize(result_page, fieldset)).data
 
     @staticmethod
-    def get_job_application(job_application_id) -> JobApplication:
+    def export_job_applications(job_advert_id, ndjson=False, params=None,
+                                asynchronous=False):
+        """
+        Stream every application of a job advert as a JSON array, or as
+        NDJSON (one application per line)
+        NOTE: rows are read JOB_APPLICATION_EXPORT_CHUNK_SIZE at a time
+        through a server-side cursor and written out chunk by chunk, so
+        memory stays flat however many applicants the advert has. The
+        generator runs after the view returns, so the replica is picked
+        here, not when the rows are read. Under ASGI Django reads a sync
+        iterator to the end before sending any of it, so the ASGI server
+        needs the async iterator, which reads each chunk in a thread.
+        :param job_advert_id:
+        :param ndjson:
+        :param params: the read request, for its sparse fieldset
+        :param asynchronous: return an async iterator
+        :return Iterator[bytes] | AsyncIterator[bytes]:
+        """
+        fieldset = JobApplicationValuesSerializer.sparse_fieldset(params)
+        with use_replica():
+            queryset = JobApplicationValuesSerializer.values(
+                JobApplicationService.job_applications_queryset(job_advert_id),
+                fieldset=fieldset)
+            queryset = queryset.using(queryset.db)
+        chunk_size = settings.JOB_APPLICATION_EXPORT_CHUNK_SIZE
+
+        def encode(chunk) -> list:
+            return [dumps(item)
+                    for item in JobApplicationValuesSerializer.serialize(chunk, fieldset)]
+
+        def chunks():
+            chunk = []
+            for job_application in queryset.iterator(chunk_size=chunk_size):
+                chunk.append(job_application)
+                if len(chunk) == chunk_size:
+                    yield encode(chunk)
+                    chunk = []
+            if chunk:
+                yield encode(chunk)
+
+        def write_ndjson():
+            for lines in chunks():
+                yield b''.join(line + b'\n' for line in lines)
+
+        def write_json():
+            separator = b'['
+            for lines in chunks():
+                yield separator + b','.join(lines)
+                separator = b','
+            yield b'[]' if separator == b'[' else b']'
+
+        export = write_ndjson() if ndjson else write_json()
+
+        async def stream():
+            while (chunk := await sync_to_async(next)(export, None)) is not None:
+                yield chunk
+
+        return stream() if asynchronous else export
+
+    @staticmethod
+    @use_replica()
+    def get_job_application(job_application_id, params=None) -> dict:
         """
         Get the job application
+        NOTE: only the columns of the fields asked for (?fields=, ?exclude=)
+        are read
         :param job_application_id:
-        :return:
+        :param params: the read request, for its sparse fieldset
+        :return dict:
         """
+        fieldset = JobApplicationValuesSerializer.sparse_fieldset(params)
         try:
-            job_application = JobApplication.objects.get(uuid=job_application_id)
-            serializer = JobApplicationSerializer(job_application)
-            return serializer.data
+            job_application = JobApplicationValuesSerializer.values(
+                JobApplication.objects.filter(uuid=job_application_id), fieldset=fieldset).get()
         except JobApplication.DoesNotExist as exc:
             raise ValidationError({'detail': exc.args[0]}) from exc
+        return JobApplicationValuesSerializer.to_representation(job_application, fieldset)
 
     @staticmethod
     def delete_job_application(job_application_id) -> None:
         """
         Delete the job application
+        NOTE: the delete and the applicant count decrement are one statement
         :param job_application_id:
         :return:
         """
-        try:
-            job_application = JobApplication.objects.get(uuid=job_application_id)
-            job_application.delete()
-        except JobApplication.DoesNotExist as exc:
-            raise ValidationError({'detail': exc.args[0]}) from exc
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH deleted AS (DELETE FROM {JobApplication._meta.db_table} '
+                'WHERE uuid = %s RETURNING job_advert_id) '
+                f'UPDATE {JobAdvert._meta.db_table} '
+                'SET applicant_count = GREATEST(applicant_count - 1, 0) '
+                'WHERE uuid IN (SELECT job_advert_id FROM deleted) RETURNING uuid',
+                [job_application_id]
+            )
+            if cursor.fetchone() is None:
+                raise ValidationError({'detail': 'JobApplication matching query does not exist.'})
+        # The applicant count drives the listing order
+        invalidate_listing()
@@ -55,7 +55,17 @@ class TalentpoolConfig(AppConfig):
         :return None:
         """
         from django.apps import apps
+        # pylint: disable=C0415
+        from django.db.models.signals import post_delete, post_save
+        from rest_framework.authtoken.models import Token
+        from talentpool.interface.authentication import (invalidate_deleted_token,
+                                                         invalidate_user_tokens)
         for model in apps.get_app_config(self.name).get_models():
             # WARNING: This approach for replacing the id field as uuid
             # does not support migrations rollback
             set_uuid_primary_key(model)
+        # Drop the cached tokens of deleted tokens and saved users
+        post_delete.connect(invalidate_deleted_token, sender=Token,
+                            dispatch_uid='talentpool.invalidate_deleted_token')
+        post_save.connect(invalidate_user_tokens, sender=self.get_model('User'),
+                          dispatch_uid='talentpool.invalidate_user_tokens')
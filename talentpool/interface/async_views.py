@@ -0,0 +1,226 @@
+"""
+The Talentpool Interface async views module
+NOTE: async variants of the read endpoints for the ASGI deployment
+(SERVER_MODE=asgi). While a request waits on the database, the cache or
+a slow client, the worker's event loop serves other requests instead of
+parking a thread on it.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from job_board.compression import accepted_encoding
+from talentpool.application.caching import alisting_etag
+from talentpool.application.services import JobAdvertService, JobApplicationService
+from talentpool.interface.authentication import CachedTokenAuthentication
+from talentpool.interface.renderers import dumps
+
+
+class AsyncAPIView(View):
+    """
+    Base of the async views: token authentication, DRF permission and
+    throttle classes and DRF's exception handler, as on the sync views
+    NOTE: served outside of ATOMIC_REQUESTS, which Django does not support
+    for async views, and these views only read. There is no content
+    negotiation, the async views always answer JSON: the browsable API and
+    ?format= are left to their sync twins.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        """
+        Mark the view callable as non atomic
+        :param initkwargs:
+        :return:
+        """
+        return transaction.non_atomic_requests(super().as_view(**initkwargs))
+
+    # Django runs async views whose handlers, dispatch included, are coroutines
+    async def dispatch(self, request, *args, **kwargs):  # pylint: disable=W0236
+        """
+        Authenticate the request, check its permissions and throttles, then
+        run the handler
+        :param request:
+        :param args:
+        :param kwargs:
+        :return HttpResponse:
+        """
+        authentication = CachedTokenAuthentication()
+        try:
+            # Like DRF, only the token authenticates, not the session
+            request.user, request.auth = (
+                await authentication.aauthenticate(request) or (AnonymousUser(), None))
+            self.check_permissions(request)
+            await self.check_throttles(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except (exceptions.APIException, Http404, PermissionDenied) as exc:
+            return self.handle_exception(request, exc, authentication)
+
+    def check_permissions(self, request) -> None:
+        """
+        Raise when a permission class refuses the request, like APIView
+        :param request:
+        :return None:
+        """
+        for permission in [permission() for permission in self.permission_classes]:
+            if not permission.has_permission(request, self):
+                if request.auth is None:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(
+                    getattr(permission, 'message', None), getattr(permission, 'code', None))
+
+    async def check_throttles(self, request) -> None:
+        """
+        Raise when a throttle class refuses the request, like APIView
+        NOTE: throttles keep their history in the cache, off the event loop
+        :param request:
+        :return None:
+        """
+        waits = [throttle.wait() for throttle in
+                 [throttle() for throttle in self.throttle_classes]
+                 if not await sync_to_async(throttle.allow_request)(request, self)]
+        if waits:
+            raise exceptions.Throttled(max((wait for wait in waits if wait is not None),
+                                           default=None))
+
+    def handle_exception(self, request, exc, authentication) -> HttpResponse:
+        """
+        Answer the exception with DRF's exception handler, rendered as JSON
+        :param request:
+        :param exc:
+        :param authentication: for the WWW-Authenticate header of a 401
+        :return HttpResponse:
+        """
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = authentication.authenticate_header(request)
+        handled = api_settings.EXCEPTION_HANDLER(
+            exc, {'view': self, 'args': self.args, 'kwargs': self.kwargs, 'request': request})
+        if handled is None:
+            raise exc
+        response = self.render(handled.data, status=handled.status_code)
+        for header, value in handled.items():
+            if header != 'Content-Type':
+                response[header] = value
+        return response
+
+    @staticmethod
+    def render(data, status=200) -> HttpResponse:
+        """
+        Render the data as compact JSON, like DRF's JSONRenderer
+        :param data:
+        :param status:
+        :return HttpResponse:
+        """
+        # The body is encoded already, JsonResponse would encode it again
+        return HttpResponse(  # pylint: disable=R5102
+            dumps(data), status=status, content_type='application/json')
+
+    @staticmethod
+    def render_encoded(request, encoded) -> HttpResponse:
+        """
+        Send JSON encoded by encode_json, compressed when the client accepts it
+        :param request:
+        :param encoded:
+        :return HttpResponse:
+        """
+        encoding = accepted_encoding(request)
+        if encoding not in encoded:
+            encoding = 'json'
+        response = HttpResponse(  # pylint: disable=R5102
+            encoded[encoding], content_type='application/json')
+        if encoding != 'json':
+            response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def not_modified(request, etag):
+        """
+        The 304 answer to a conditional GET, or None when the page changed
+        :param request:
+        :param etag:
+        :return HttpResponse | None:
+        """
+        if etag is None:
+            return None
+        return get_conditional_response(request, etag=quote_etag(etag))
+
+    @staticmethod
+    def with_etag(response, etag) -> HttpResponse:
+        """
+        Set the ETag of the response
+        :param response:
+        :param etag:
+        :return HttpResponse:
+        """
+        if etag is not None:
+            response['ETag'] = quote_etag(etag)
+        return response
+
+
+class AsyncJobAdvertListView(AsyncAPIView):
+    """
+    The async Job Advert List API
+    """
+    permission_classes = []
+
+    async def get(self, request):
+        """
+        The list of Job adverts in the DB
+        :param request:
+        :return HttpResponse:
+        """
+        params = Request(request)
+        etag = await alisting_etag(params)
+        response = self.not_modified(request, etag)
+        if response is None:
+            response = self.with_etag(self.render_encoded(
+                request, await JobAdvertService.alist_job_adverts(params)), etag)
+        return response
+
+
+class AsyncJobAdvertDetailView(AsyncAPIView):
+    """
+    The async Job Advert Detail API
+    """
+
+    async def get(self, request, job_advert_id):
+        """
+        Retrieves the detail of a job advert
+        :param request:
+        :param job_advert_id:
+        :return HttpResponse:
+        """
+        params = Request(request)
+        etag = await JobAdvertService.aget_job_advert_etag(job_advert_id, params)
+        response = self.not_modified(request, etag)
+        if response is None:
+            response = self.with_etag(self.render(
+                await JobAdvertService.aget_job_advert(job_advert_id, params)), etag)
+        return response
+
+
+class AsyncJobApplicationListView(AsyncAPIView):
+    """
+    The async Job Application List API
+    """
+
+    async def get(self, request, job_advert_id):
+        """
+        Get Job Applications for a job advert
+        :param request:
+        :param job_advert_id:
+        :return HttpResponse:
+        """
+        return self.render(
+            await JobApplicationService.aget_job_applications(Request(request), job_advert_id))
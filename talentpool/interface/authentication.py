@@ -0,0 +1,229 @@
+"""
+Talentpool Interface Authentication Module
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from talentpool.models import User
+
+
+class TokenLRUCache:
+    """
+    Bounded, thread safe, in-process LRU of token cache key -> token entry with a TTL
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached token entry, or None when it is missing or expired
+        :param key:
+        :return dict | None:
+        """
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+            expires_at, token = entry
+            if expires_at < time.monotonic():
+                del self._tokens[key]
+                return None
+            self._tokens.move_to_end(key)
+            return token
+
+    def set(self, key, token) -> None:
+        """
+        Cache the token entry, evicting the least recently used one when full
+        :param key:
+        :param token: the token entry
+        :return None:
+        """
+        with self._lock:
+            self._tokens[key] = (time.monotonic() + self.ttl, token)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.maxsize:
+                self._tokens.popitem(last=False)
+
+    def delete(self, key) -> None:
+        """
+        Forget the token
+        :param key:
+        :return None:
+        """
+        with self._lock:
+            self._tokens.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Forget every token
+        :return None:
+        """
+        with self._lock:
+            self._tokens.clear()
+
+
+def _from_db(model, values):
+    """
+    A model instance loaded with the given fields only, the others deferred
+    :param model:
+    :param values: the field values, by attname
+    :return:
+    """
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(router.db_for_read(model), names, [values[name] for name in names])
+
+
+def token_cache_key(key) -> str:
+    """
+    The shared cache key of a token, hashed so raw tokens never show up in Redis
+    :param key:
+    :return str:
+    """
+    return f"auth-token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that skips the Token/User join on repeat requests
+    NOTE: tokens are resolved from an in-process LRU first, then from the
+    shared cache, then from the database. Both caches hold only the user id
+    and active flag of a token, under its hashed key, and every request gets
+    its own User and Token built from them. Deleting the token or saving its
+    user invalidates both, but the LRU of other worker processes only lets
+    go after AUTH_TOKEN_LRU_TTL, so keep that TTL short.
+    """
+    local_cache = TokenLRUCache(settings.AUTH_TOKEN_LRU_SIZE, settings.AUTH_TOKEN_LRU_TTL)
+
+    def authenticate_credentials(self, key):
+        """
+        Resolve the token key to its user
+        :param key:
+        :return tuple[User, Token]:
+        """
+        cache_key = token_cache_key(key)
+        entry = self.local_cache.get(cache_key)
+        if entry is None:
+            entry = cache.get(cache_key)
+            if entry is None:
+                entry = self.get_model().objects.filter(key=key).values(
+                    'user_id', is_active=F('user__is_active')).first()
+                if entry is None:
+                    raise AuthenticationFailed(_('Invalid token.'))
+                cache.set(cache_key, entry, timeout=settings.AUTH_TOKEN_CACHE_TTL)
+            self.local_cache.set(cache_key, entry)
+
+        return self.active_user(key, entry)
+
+    async def aauthenticate(self, request):
+        """
+        Async twin of authenticate, for the async views
+        :param request:
+        :return tuple[User, Token] | None: None when no token was sent
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        if len(auth) > 2:
+            raise AuthenticationFailed(
+                _('Invalid token header. Token string should not contain spaces.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError as exc:
+            raise AuthenticationFailed(_(
+                'Invalid token header. Token string should not contain invalid characters.'
+            )) from exc
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        """
+        Async twin of authenticate_credentials
+        :param key:
+        :return tuple[User, Token]:
+        """
+        cache_key = token_cache_key(key)
+        entry = self.local_cache.get(cache_key)
+        if entry is None:
+            entry = await cache.aget(cache_key)
+            if entry is None:
+                entry = await self.get_model().objects.filter(key=key).values(
+                    'user_id', is_active=F('user__is_active')).afirst()
+                if entry is None:
+                    raise AuthenticationFailed(_('Invalid token.'))
+                await cache.aset(cache_key, entry, timeout=settings.AUTH_TOKEN_CACHE_TTL)
+            self.local_cache.set(cache_key, entry)
+        return self.active_user(key, entry)
+
+    def active_user(self, key, entry):
+        """
+        The user of the token entry, unless it was deactivated
+        NOTE: the user is loaded with only its primary key and is_active, any
+        other field is read from the database on first access
+        :param key:
+        :param entry: the cached user_id and is_active of the token
+        :return tuple[User, Token]:
+        """
+        if not entry['is_active']:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        user = _from_db(User, {User._meta.pk.attname: entry['user_id'], 'is_active': True})
+        token = _from_db(self.get_model(), {'key': key, 'user_id': entry['user_id']})
+        token.user = user
+        return user, token
+
+
+def invalidate_token(key) -> None:
+    """
+    Drop a token from the authentication caches
+    :param key:
+    :return None:
+    """
+    CachedTokenAuthentication.local_cache.delete(token_cache_key(key))
+    cache.delete(token_cache_key(key))
+
+
+def invalidate_deleted_token(sender, instance, **kwargs) -> None:  # pylint: disable=W0613
+    """
+    post_delete receiver of Token, a deleted token (logout, deleted user)
+    stops authenticating at once
+    :param sender:
+    :param instance:
+    :param kwargs:
+    :return None:
+    """
+    invalidate_token(instance.key)
+
+
+def invalidate_user_tokens(sender, instance, created,  # pylint: disable=W0613
+                           update_fields=None, **kwargs) -> None:
+    """
+    post_save receiver of User, the cached tokens of a saved user are
+    dropped so a deactivation is seen by the next request
+    NOTE: skipped for new users, who have no token yet, and for saves that
+    leave is_active alone
+    :param sender:
+    :param instance:
+    :param created:
+    :param update_fields:
+    :param kwargs:
+    :return None:
+    """
+    if created or (update_fields is not None and 'is_active' not in update_fields):
+        return
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        invalidate_token(key)
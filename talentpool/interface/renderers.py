@@ -0,0 +1,155 @@
+"""
+Talentpool Interface Renderers Module
+NOTE: JSON is encoded with orjson when it is installed and with the
+standard library otherwise, both giving the compact JSON of DRF's
+JSONRenderer
+"""
+import json
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils import encoders
+
+from job_board.compression import accepted_encoding, compress, supported_encodings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Dates, times and anything orjson does not know go through DRF's encoder
+_encoder = encoders.JSONEncoder()
+
+
+def _escape_line_separators(content) -> bytes:
+    """
+    Escape U+2028 and U+2029, which are valid JSON but break JavaScript
+    NOTE: DRF's JSONRenderer does the same
+    :param content:
+    :return bytes:
+    """
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+def dumps(data) -> bytes:
+    """
+    Encode the data as compact UTF-8 JSON
+    NOTE: what orjson cannot encode (integers over 64 bits) is left to the
+    standard library
+    :param data:
+    :return bytes:
+    """
+    if orjson is not None:
+        try:
+            return _escape_line_separators(orjson.dumps(
+                data, default=_encoder.default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME))
+        except orjson.JSONEncodeError:
+            pass
+    return _escape_line_separators(json.dumps(
+        data, cls=encoders.JSONEncoder, ensure_ascii=False, allow_nan=False,
+        separators=(',', ':')).encode())
+
+
+def loads(content):
+    """
+    Decode JSON
+    :param content:
+    :return:
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson
+    NOTE: indented output (the browsable API, ?indent=) is left to
+    JSONRenderer
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render the data as compact JSON
+        :param data:
+        :param accepted_media_type:
+        :param renderer_context:
+        :return bytes:
+        """
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class EncodedJSONResponse(Response):
+    """
+    Response of a body encoded, and compressed, ahead of time
+    NOTE: JSON clients get the stored bytes, compressed with the best
+    encoding they accept, so nothing is encoded nor compressed again. The
+    data is only decoded for the other renderers (the browsable API).
+    :param encoded: dict of 'json' (the JSON) and, when it was worth it,
+    the JSON compressed under each encoding name
+    """
+
+    def __init__(self, encoded, **kwargs):
+        self.encoded = encoded
+        self._data = None
+        super().__init__(**kwargs)
+
+    @property
+    def data(self):
+        """
+        The response data, decoded from the JSON on first access
+        :return:
+        """
+        if self._data is None:
+            self._data = loads(self.encoded['json'])
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        """
+        The stored bytes for a compact JSON rendering, the rendered data otherwise
+        NOTE: the view sets the accepted renderer and the renderer context in
+        finalize_response, read them the way DRF's Response does
+        :return bytes:
+        """
+        renderer = getattr(self, 'accepted_renderer', None)
+        renderer_context = getattr(self, 'renderer_context', None) or {}
+        if not isinstance(renderer, FastJSONRenderer) or renderer.get_indent(
+                getattr(self, 'accepted_media_type', None), renderer_context) is not None:
+            return super().rendered_content
+
+        self['Content-Type'] = self.content_type or renderer.media_type
+        encoding = accepted_encoding(renderer_context['request'])
+        if encoding in self.encoded:
+            self['Content-Encoding'] = encoding
+            return self.encoded[encoding]
+        return self.encoded['json']
+
+
+def encode_json(data) -> dict:
+    """
+    Encode the data for an EncodedJSONResponse
+    NOTE: JSON under COMPRESSION_MIN_SIZE bytes is not compressed
+    :param data:
+    :return dict:
+    """
+    content = dumps(data)
+    encoded = {'json': content}
+    if len(content) >= settings.COMPRESSION_MIN_SIZE:
+        for encoding in supported_encodings():
+            compressed = compress(content, encoding)
+            if len(compressed) < len(content):
+                encoded[encoding] = compressed
+    return encoded
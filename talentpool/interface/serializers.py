@@ -2,7 +2,10 @@
 Talentpool Interface Serializers Module
 """
 
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
 from django.utils import timezone
+from django.utils.encoding import is_protected_type
 from rest_framework import serializers
 from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import ValidationError
@@ -21,7 +24,8 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user = User.objects.create_user(**validated_data)
-        token, _ = Token.objects.get_or_create(user=user)
+        # A new user has no token yet, no need for get_or_create's lookup
+        token = Token.objects.create(user=user)
         return user, token
 
     def save(self, **kwargs):
@@ -72,7 +76,56 @@ class UserSerializer(serializers.ModelSerializer):
         return self.instance, token
 
 
-class JobAdvertSerializer(serializers.ModelSerializer):
+def query_param_list(params, name) -> list:
+    """
+    The values of a list query parameter, repeated (?a=x&a=y) or comma
+    separated (?a=x,y)
+    :param params:
+    :param name:
+    :return list:
+    """
+    return [part.strip() for value in params.query_params.getlist(name)
+            for part in value.split(',') if part.strip()]
+
+
+# A mixin, its serializers bring the rest of the public methods
+class SparseFieldsMixin:  # pylint: disable=R0903
+    """
+    ModelSerializer mixin rendering a subset of its Meta.fields
+    NOTE: pass the fieldset returned by sparse_fieldset for the fields and
+    exclude query parameters of a read request
+    """
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fieldset is not None:
+            for name in [name for name in self.fields if name not in fieldset]:
+                del self.fields[name]
+
+    @classmethod
+    def sparse_fieldset(cls, params) -> tuple | None:
+        """
+        The fields asked for with ?fields=a,b and ?exclude=c, in Meta.fields order
+        :param params:
+        :return tuple | None: None when every field is asked for
+        """
+        if params is None:
+            return None
+        fields = query_param_list(params, 'fields')
+        exclude = query_param_list(params, 'exclude')
+        if not fields and not exclude:
+            return None
+        unknown = [name for name in fields + exclude if name not in cls.Meta.fields]
+        if unknown:
+            raise ValidationError({'fields': [f'Unknown field: {name}.' for name in unknown]})
+        fieldset = tuple(name for name in cls.Meta.fields
+                         if (not fields or name in fields) and name not in exclude)
+        if not fieldset:
+            raise ValidationError({'fields': ['No field left to return.']})
+        return fieldset
+
+
+class JobAdvertSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     JobAdvertSerializer
     """
@@ -101,8 +154,158 @@ class JobAdvertSerializer(serializers.ModelSerializer):
                 )
         return value
 
+    def update(self, instance, validated_data):
+        """
+        Write only the columns that changed, and modified
+        NOTE: a plain save() would rewrite description and job_description,
+        the big TEXT columns, on every edit
+        :param instance:
+        :param validated_data:
+        :return JobAdvert:
+        """
+        changed = [field for field, value in validated_data.items()
+                   if getattr(instance, field) != value]
+        for field in changed:
+            setattr(instance, field, validated_data[field])
+        if changed:
+            instance.save(update_fields=[*changed, 'modified'])
+        return instance
+
+
+class ValuesSerializer:
+    """
+    Read-only twin of a ModelSerializer for .values() rows
+    NOTE: the fields of serializer_class are compiled once into (key, column,
+    converter) accessors, so a row costs a dict copy and the few conversions
+    DRF would make, instead of a model instance and a to_representation call
+    per field. The output renders to the same JSON as serializer_class.
+    """
+    # The ModelSerializer mirrored, set by every subclass
+    serializer_class: type[serializers.ModelSerializer]
+    # Fields whose to_representation returns database values unchanged
+    unchanged_fields = (serializers.CharField, serializers.ChoiceField,
+                        serializers.BooleanField, serializers.IntegerField,
+                        serializers.PrimaryKeyRelatedField)
+
+    @classmethod
+    def converter(cls, field):
+        """
+        The function turning a column value into the field's representation
+        :param field:
+        :return callable | None: None when the value is used as is
+        """
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is not None:
+            return field.pk_field.to_representation
+        if isinstance(field, cls.unchanged_fields):
+            return None
+        if isinstance(field, serializers.ModelField):
+            model_field = field.model_field
+            if type(model_field).value_to_string is not models.Field.value_to_string:
+                raise ImproperlyConfigured(f'{field.field_name} has a custom value_to_string')
+            return lambda value: value if is_protected_type(value) else str(value)
+        if isinstance(field, (serializers.RelatedField, serializers.ManyRelatedField,
+                              serializers.SerializerMethodField, serializers.BaseSerializer)):
+            raise ImproperlyConfigured(f'{field.field_name} cannot be read from a column')
+        return field.to_representation
+
+    @classmethod
+    def fields(cls, fieldset=None) -> tuple:
+        """
+        The compiled accessors of the readable fields of serializer_class
+        :param fieldset: the sparse fieldset, None for every field
+        :return tuple: (key, column) pairs, and (key, converter) pairs
+        """
+        if '_fields' not in cls.__dict__:
+            cls._fields = {}
+        if fieldset not in cls._fields:
+            columns, converters = [], []
+            for key, field in cls.serializer_class(fieldset=fieldset).fields.items():
+                if field.write_only:
+                    continue
+                if '.' in field.source or field.source == '*':
+                    raise ImproperlyConfigured(f'{key} is not read from a column')
+                columns.append((key, field.source))
+                converter = cls.converter(field)
+                if converter is not None:
+                    converters.append((key, converter))
+            cls._fields[fieldset] = (tuple(columns), tuple(converters))
+        return cls._fields[fieldset]
 
-class JobApplicationSerializer(serializers.ModelSerializer):
+    @classmethod
+    def sparse_fieldset(cls, params) -> tuple | None:
+        """
+        The sparse fieldset of a read request, see SparseFieldsMixin
+        :param params:
+        :return tuple | None:
+        """
+        return cls.serializer_class.sparse_fieldset(params)
+
+    @classmethod
+    def values(cls, queryset, *extra, fieldset=None):
+        """
+        The queryset as rows of the columns the fields read
+        :param queryset:
+        :param extra: more columns to fetch, such as the ordering of a cursor
+        :param fieldset:
+        :return QuerySet:
+        """
+        columns, _ = cls.fields(fieldset)
+        return queryset.values(*dict.fromkeys([column for _, column in columns] + list(extra)))
+
+    @classmethod
+    def to_representation(cls, row, fieldset=None) -> dict:
+        """
+        The representation of one row
+        :param row:
+        :param fieldset:
+        :return dict:
+        """
+        columns, converters = cls.fields(fieldset)
+        data = {key: row[column] for key, column in columns}
+        for key, converter in converters:
+            value = data[key]
+            if value is not None:
+                data[key] = converter(value)
+        return data
+
+    @classmethod
+    def serialize(cls, rows, fieldset=None) -> list:
+        """
+        The representation of the rows
+        :param rows:
+        :param fieldset:
+        :return list:
+        """
+        return [cls.to_representation(row, fieldset) for row in rows]
+
+
+class JobAdvertSummarySerializer(JobAdvertSerializer):
+    """
+    The compact job advert of the listing's summary view
+    NOTE: excerpt is the start of the description, annotated by the query
+    """
+    excerpt = serializers.CharField(read_only=True)
+
+    class Meta(JobAdvertSerializer.Meta):
+        fields = [field for field in JobAdvertSerializer.Meta.fields
+                  if field not in ('description', 'job_description')] + ['excerpt']
+
+
+class JobAdvertValuesSerializer(ValuesSerializer):
+    """
+    JobAdvertSerializer for the listing
+    """
+    serializer_class = JobAdvertSerializer
+
+
+class JobAdvertSummaryValuesSerializer(ValuesSerializer):
+    """
+    JobAdvertSummarySerializer for the listing's summary view
+    """
+    serializer_class = JobAdvertSummarySerializer
+
+
+class JobApplicationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Job Application Serializer
     """
@@ -118,7 +321,60 @@ class JobApplicationSerializer(serializers.ModelSerializer):
         :param value:
         :return:
         """
-        job_advert = JobAdvert.objects.get(uuid=value.job_advert)
-        if job_advert.is_published is not True:
+        if value.is_published is not True:
             raise ValidationError("You cannot apply for a job that is not published.")
         return value
+
+
+class JobApplicationValuesSerializer(ValuesSerializer):
+    """
+    JobApplicationSerializer for the applications list and export
+    """
+    serializer_class = JobApplicationSerializer
+
+
+class JobApplicationBulkSerializer(JobApplicationSerializer):
+    """
+    Job Application Serializer for bulk ingestion
+    NOTE: job_advert is only checked to be a uuid here, the service resolves
+    the adverts of the whole batch in one query, and the (job_advert, email)
+    uniqueness is left to the database
+    """
+    job_advert = serializers.UUIDField()
+
+    class Meta(JobApplicationSerializer.Meta):
+        validators = []
+
+    def validate_job_advert(self, value):
+        """
+        Checked by JobApplicationService.bulk_create_job_applications
+        :param value:
+        :return:
+        """
+        return value
+
+
+class JobAdvertIdListField(serializers.ListField):
+    """
+    A non empty list of job advert uuids, for the bulk operations
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('child', serializers.UUIDField())
+        kwargs.setdefault('allow_empty', False)
+        super().__init__(**kwargs)
+
+
+class JobAdvertListingFilterSerializer(serializers.Serializer):  # pylint: disable=W0223
+    """
+    The filter and view parameters of the job advert listing
+    NOTE: a filter repeated in the query string matches any of its values
+    """
+    view = serializers.ChoiceField(choices=['full', 'summary'], default='full')
+    employment_type = serializers.MultipleChoiceField(
+        choices=JobAdvert.EMPLOYMENT_TYPES, required=False)
+    experience_level = serializers.MultipleChoiceField(
+        choices=JobAdvert.EXPERIENCE_LEVELS, required=False)
+    location = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False)
+    facets = serializers.BooleanField(required=False)
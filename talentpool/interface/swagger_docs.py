@@ -7,7 +7,26 @@ from drf_yasg.utils import swagger_auto_schema
 
 from talentpool.interface.serializers import (UserSerializer,
                                               JobAdvertSerializer,
-                                              JobApplicationSerializer)
+                                              JobApplicationSerializer,
+                                              JobApplicationBulkSerializer)
+from talentpool.models import JobAdvert
+
+
+def sparse_fieldset_parameters(serializer_class) -> list:
+    """
+    The fields and exclude query parameters of a read endpoint
+    :param serializer_class:
+    :return list:
+    """
+    return [
+        openapi.Parameter(name, openapi.IN_QUERY, type=openapi.TYPE_ARRAY,
+                          items=openapi.Items(type=openapi.TYPE_STRING,
+                                              enum=serializer_class.Meta.fields),
+                          collection_format='csv', description=description)
+        for name, description in (('fields', 'Only return these fields'),
+                                  ('exclude', 'Leave these fields out'))
+    ]
+
 
 user_login_schema = swagger_auto_schema(
     operation_description="User login",
@@ -38,6 +57,40 @@ user_logout_schema = swagger_auto_schema(
 
 job_advert_list_schema = swagger_auto_schema(
     operation_description="The list of Job adverts in the DB",
+    manual_parameters=[
+        openapi.Parameter('pagination', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          enum=['page', 'cursor'],
+                          description='Use cursor for keyset pagination (no total count)'),
+        openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          description='Opaque cursor from a previous next/previous link'),
+        openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          description='Full-text search, best match first; supports '
+                                      '"quoted phrases", or and -excluded words'),
+        openapi.Parameter('employment_type', openapi.IN_QUERY, type=openapi.TYPE_ARRAY,
+                          items=openapi.Items(type=openapi.TYPE_STRING,
+                                              enum=[value for value, _ in
+                                                    JobAdvert.EMPLOYMENT_TYPES]),
+                          collection_format='multi',
+                          description='Only adverts of these employment types'),
+        openapi.Parameter('experience_level', openapi.IN_QUERY, type=openapi.TYPE_ARRAY,
+                          items=openapi.Items(type=openapi.TYPE_STRING,
+                                              enum=[value for value, _ in
+                                                    JobAdvert.EXPERIENCE_LEVELS]),
+                          collection_format='multi',
+                          description='Only adverts of these experience levels'),
+        openapi.Parameter('location', openapi.IN_QUERY, type=openapi.TYPE_ARRAY,
+                          items=openapi.Items(type=openapi.TYPE_STRING),
+                          collection_format='multi',
+                          description='Only adverts in these locations'),
+        openapi.Parameter('view', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          enum=['full', 'summary'],
+                          description='summary leaves out description and job_description '
+                                      'for an excerpt of the description'),
+        openapi.Parameter('facets', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+                          description='Add the counts per employment type, experience '
+                                      'level and location, each ignoring its own filter'),
+        *sparse_fieldset_parameters(JobAdvertSerializer),
+    ],
     responses={
         200: openapi.Response('List of Job Adverts',
                               JobAdvertSerializer(many=True))
@@ -46,6 +99,7 @@ job_advert_list_schema = swagger_auto_schema(
 
 job_advert_detail_schema = swagger_auto_schema(
     operation_description="Retrieves the detail of a job advert",
+    manual_parameters=sparse_fieldset_parameters(JobAdvertSerializer),
     responses={
         200: openapi.Response('Job Advert Detail',
                               JobAdvertSerializer)
@@ -61,6 +115,26 @@ job_advert_create_schema = swagger_auto_schema(
     }
 )
 
+job_advert_bulk_create_schema = swagger_auto_schema(
+    operation_description="Create many job adverts, skipping the invalid ones",
+    request_body=JobAdvertSerializer(many=True),
+    responses={
+        201: openapi.Response('Created Job Adverts and the errors by item index',
+                              openapi.Schema(
+                                  type=openapi.TYPE_OBJECT,
+                                  properties={
+                                      'created': openapi.Schema(
+                                          type=openapi.TYPE_ARRAY,
+                                          items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                                      'errors': openapi.Schema(
+                                          type=openapi.TYPE_ARRAY,
+                                          items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                                  }
+                              )),
+        400: 'None of the job adverts were valid'
+    }
+)
+
 job_advert_update_schema = swagger_auto_schema(
     operation_description="Updates the detail of a job advert",
     request_body=JobAdvertSerializer,
@@ -85,25 +159,119 @@ job_advert_unpublish_schema = swagger_auto_schema(
     responses={200: 'Job advert unpublished'}
 )
 
+job_advert_ids_body = openapi.Schema(
+    type=openapi.TYPE_ARRAY,
+    items=openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID)
+)
+
+job_advert_ids_changed = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'changed': job_advert_ids_body,
+        'unchanged': job_advert_ids_body,
+    }
+)
+
+job_advert_bulk_publish_schema = swagger_auto_schema(
+    operation_description="Publishes many job adverts",
+    request_body=job_advert_ids_body,
+    responses={200: openapi.Response('The job adverts published', job_advert_ids_changed)}
+)
+
+job_advert_bulk_unpublish_schema = swagger_auto_schema(
+    operation_description="Unpublishes many job adverts",
+    request_body=job_advert_ids_body,
+    responses={200: openapi.Response('The job adverts unpublished', job_advert_ids_changed)}
+)
+
 job_application_list_schema = swagger_auto_schema(
-    operation_description="Get Job Applications for a job advert",
+    operation_description="Get a page of the Job Applications for a job advert",
+    manual_parameters=[
+        openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        *sparse_fieldset_parameters(JobApplicationSerializer),
+    ],
     responses={
         200: openapi.Response('List of Job Applications',
                               JobApplicationSerializer(many=True))
     }
 )
 
+job_application_export_schema = swagger_auto_schema(
+    operation_description="Stream every Job Application for a job advert",
+    manual_parameters=[
+        openapi.Parameter('output', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          enum=['json', 'ndjson'],
+                          description='A JSON array, or one application per line'),
+        *sparse_fieldset_parameters(JobApplicationSerializer),
+    ],
+    responses={
+        200: openapi.Response('All the Job Applications',
+                              JobApplicationSerializer(many=True))
+    }
+)
+
+job_application_intake_status = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'uuid': openapi.Schema(type=openapi.TYPE_STRING),
+        'status': openapi.Schema(type=openapi.TYPE_STRING,
+                                 enum=['queued', 'created', 'duplicate', 'invalid']),
+        'errors': openapi.Schema(type=openapi.TYPE_OBJECT),
+    }
+)
+
 job_application_create_schema = swagger_auto_schema(
     operation_description="Submit a job application for a job advert",
     request_body=JobApplicationSerializer,
+    manual_parameters=[
+        openapi.Parameter('Idempotency-Key', openapi.IN_HEADER, type=openapi.TYPE_STRING,
+                          description="Repeats of a submission with the same key are "
+                                      "answered with the first one (stream intake only)"),
+    ],
     responses={
         201: openapi.Response('Created Job Application',
-                              JobApplicationSerializer)
+                              JobApplicationSerializer),
+        202: openapi.Response('Queued Job Application (JOB_APPLICATION_INTAKE=stream)',
+                              job_application_intake_status)
+    }
+)
+
+job_application_status_schema = swagger_auto_schema(
+    operation_description="Tell whether a submitted job application was stored",
+    responses={
+        200: openapi.Response('Job Application Intake Status', job_application_intake_status)
+    }
+)
+
+job_application_bulk_create_schema = swagger_auto_schema(
+    operation_description="Ingest a batch of job applications, skipping "
+                          "the invalid ones and the duplicates",
+    request_body=JobApplicationBulkSerializer(many=True),
+    responses={
+        201: openapi.Response('The outcome of every job application', openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'created': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'results': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
+                        'index': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'status': openapi.Schema(type=openapi.TYPE_STRING,
+                                                 enum=['created', 'duplicate', 'invalid']),
+                        'uuid': openapi.Schema(type=openapi.TYPE_STRING),
+                        'errors': openapi.Schema(type=openapi.TYPE_OBJECT),
+                    })),
+            }
+        )),
+        200: 'Nothing new was created',
+        400: 'None of the job applications were valid'
     }
 )
 
 job_application_detail_schema = swagger_auto_schema(
     operation_description="Get the detail of a job application",
+    manual_parameters=sparse_fieldset_parameters(JobApplicationSerializer),
     responses={
         200: openapi.Response('Job Application Detail',
                               JobApplicationSerializer)
@@ -1,11 +1,19 @@
 """
 The Talentpool Interface views module
 """
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.reverse import reverse
 
+from talentpool.application.caching import listing_etag
+from talentpool.application.publishing import JobAdvertPublishingService
 from talentpool.application.services import (UserService, JobAdvertService,
                                              JobApplicationService)
 from talentpool.interface.swagger_docs import (user_login_schema,
@@ -16,11 +24,35 @@ from talentpool.interface.swagger_docs import (user_login_schema,
                                                job_advert_delete_schema,
                                                job_advert_publish_schema,
                                                job_advert_unpublish_schema,
+                                               job_advert_bulk_publish_schema,
+                                               job_advert_bulk_unpublish_schema,
                                                job_application_delete_schema,
                                                job_application_detail_schema,
                                                job_application_create_schema,
-                                               job_application_list_schema, user_signup_schema,
-                                               job_advert_create_schema)
+                                               job_application_status_schema,
+                                               job_application_bulk_create_schema,
+                                               job_application_list_schema,
+                                               job_application_export_schema, user_signup_schema,
+                                               job_advert_create_schema,
+                                               job_advert_bulk_create_schema)
+
+
+class NonAtomicAPIView(APIView):
+    """
+    An APIView served outside of ATOMIC_REQUESTS
+    NOTE: reads skip the BEGIN/COMMIT round trips and the held transaction,
+    so every write behind such a view must open its own transaction.atomic
+    block in the service layer
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        """
+        Mark the view callable as non atomic
+        :param initkwargs:
+        :return:
+        """
+        return transaction.non_atomic_requests(super().as_view(**initkwargs))
 
 
 class UserAPIView(APIView):
@@ -64,17 +96,18 @@ class UserAuthenticationAPIView(APIView):
         :param request:
         :return Response:
         """
-        request.auth.delete()
+        UserService.logout_user(request.auth)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class JobAdvertListAPIView(APIView):
+class JobAdvertListAPIView(NonAtomicAPIView):
     """
     The Job Advert List API
     """
     permission_classes = []
 
     @job_advert_list_schema
+    @method_decorator(condition(etag_func=listing_etag))
     def get(self, request) -> Response:
         """
         The list of Job adverts in the DB
@@ -86,13 +119,16 @@ class JobAdvertListAPIView(APIView):
         return response
 
 
-class JobAdvertDetailAPIView(APIView):
+class JobAdvertDetailAPIView(NonAtomicAPIView):
     """
     The Job Advert Detail API
     """
     permission_classes = [IsAuthenticated]
 
     @job_advert_detail_schema
+    @method_decorator(condition(
+        etag_func=lambda request, job_advert_id: JobAdvertService.get_job_advert_etag(
+            job_advert_id, request)))
     def get(self, request, job_advert_id):
         """
         Retrieves the detail of a job advert
@@ -100,7 +136,7 @@ class JobAdvertDetailAPIView(APIView):
         :param job_advert_id:
         :return Response:
         """
-        job_advert = JobAdvertService.get_job_advert(job_advert_id)
+        job_advert = JobAdvertService.get_job_advert(job_advert_id, request)
         return Response(job_advert)
 
     @job_advert_create_schema
@@ -136,7 +172,28 @@ class JobAdvertDetailAPIView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class JobAdvertPublishAPIView(APIView):
+class JobAdvertBulkCreateAPIView(NonAtomicAPIView):
+    """
+    The Job Advert Bulk Create API
+    """
+    permission_classes = [IsAuthenticated]
+
+    @job_advert_bulk_create_schema
+    def post(self, request) -> Response:
+        """
+        Create many job adverts at once
+        NOTE: invalid adverts are reported by index, the valid ones are
+        still created
+        :param request:
+        :return Response:
+        """
+        result = JobAdvertService.bulk_create_job_adverts(request.data)
+        if result['created']:
+            return Response(result, status=status.HTTP_201_CREATED)
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+
+
+class JobAdvertPublishAPIView(NonAtomicAPIView):
     """
     The Job Advert Publish API
     """
@@ -165,7 +222,39 @@ class JobAdvertPublishAPIView(APIView):
         return Response(status=status.HTTP_200_OK)
 
 
-class JobApplicationListAPIView(APIView):
+class JobAdvertBulkPublishAPIView(NonAtomicAPIView):
+    """
+    The Job Advert Bulk Publish API
+    """
+    permission_classes = [IsAuthenticated]
+
+    @job_advert_bulk_publish_schema
+    def post(self, request) -> Response:
+        """
+        Publishes the job adverts of a list of uuids
+        :param request:
+        :return Response:
+        """
+        return Response(JobAdvertPublishingService.publish_job_adverts(request.data))
+
+
+class JobAdvertBulkUnpublishAPIView(NonAtomicAPIView):
+    """
+    The Job Advert Bulk Unpublish API
+    """
+    permission_classes = [IsAuthenticated]
+
+    @job_advert_bulk_unpublish_schema
+    def post(self, request) -> Response:
+        """
+        Unpublishes the job adverts of a list of uuids
+        :param request:
+        :return Response:
+        """
+        return Response(JobAdvertPublishingService.unpublish_job_adverts(request.data))
+
+
+class JobApplicationListAPIView(NonAtomicAPIView):
     """
     The JobApplicationListAPIView
     """
@@ -179,11 +268,36 @@ class JobApplicationListAPIView(APIView):
         :param job_advert_id:
         :return Response:
         """
-        job_applications = JobApplicationService.get_job_applications(job_advert_id)
+        job_applications = JobApplicationService.get_job_applications(request, job_advert_id)
         return Response(job_applications)
 
 
-class JobApplicationDetailAPIView(APIView):
+class JobApplicationExportAPIView(NonAtomicAPIView):
+    """
+    The JobApplicationExportAPIView
+    """
+    permission_classes = [IsAuthenticated]
+
+    @job_application_export_schema
+    def get(self, request, job_advert_id) -> StreamingHttpResponse:
+        """
+        Stream every Job Application for a job advert
+        NOTE: pass output=ndjson for one application per line. The export is
+        streamed from an async iterator under ASGI (SERVER_MODE=asgi)
+        :param request:
+        :param job_advert_id:
+        :return StreamingHttpResponse:
+        """
+        ndjson = request.query_params.get('output') == 'ndjson'
+        # JsonResponse encodes its data at once, it cannot stream
+        return StreamingHttpResponse(  # pylint: disable=R5102
+            JobApplicationService.export_job_applications(
+                job_advert_id, ndjson=ndjson, params=request,
+                asynchronous=settings.SERVER_MODE == 'asgi'),
+            content_type='application/x-ndjson' if ndjson else 'application/json')
+
+
+class JobApplicationDetailAPIView(NonAtomicAPIView):
     """
     Job Application Detail API
     """
@@ -197,16 +311,28 @@ class JobApplicationDetailAPIView(APIView):
         :param job_application_id:
         :return Response:
         """
-        job_application = JobApplicationService.get_job_application(job_application_id)
+        job_application = JobApplicationService.get_job_application(job_application_id, request)
         return Response(job_application)
 
     @job_application_create_schema
     def post(self, request) -> Response:
         """
         Submit a job job_application for a job advert
+        NOTE: with JOB_APPLICATION_INTAKE=stream the application is only
+        queued, the answer is 202 with the URL of its status
         :param request:
         :return Response:
         """
+        if settings.JOB_APPLICATION_INTAKE == 'stream':
+            idempotency_key = request.headers.get('Idempotency-Key')
+            if idempotency_key:
+                # Keys are picked by the clients, keep them apart
+                idempotency_key = f'{request.user.pk}:{idempotency_key}'
+            job_application = JobApplicationService.submit_job_application(
+                request.data, idempotency_key=idempotency_key or None)
+            return Response(job_application, status=status.HTTP_202_ACCEPTED, headers={
+                'Location': reverse('job-application-status', args=[job_application['uuid']],
+                                    request=request)})
         job_application = JobApplicationService.create_job_application(request.data)
         return Response(job_application, status=status.HTTP_201_CREATED)
 
@@ -221,3 +347,41 @@ class JobApplicationDetailAPIView(APIView):
         """
         JobApplicationService.delete_job_application(job_application_id)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class JobApplicationStatusAPIView(NonAtomicAPIView):
+    """
+    Job Application Intake Status API
+    """
+    permission_classes = [IsAuthenticated]
+
+    @job_application_status_schema
+    def get(self, request, job_application_id) -> Response:
+        """
+        Tell whether a submitted job application was stored
+        :param request:
+        :param job_application_id:
+        :return Response:
+        """
+        return Response(JobApplicationService.get_job_application_status(job_application_id))
+
+
+class JobApplicationBulkCreateAPIView(NonAtomicAPIView):
+    """
+    Job Application Bulk Ingestion API
+    """
+    permission_classes = [IsAuthenticated]
+
+    @job_application_bulk_create_schema
+    def post(self, request) -> Response:
+        """
+        Ingest a batch of job applications, from a partner job board say
+        :param request:
+        :return Response:
+        """
+        result = JobApplicationService.bulk_create_job_applications(request.data)
+        if result['created']:
+            return Response(result, status=status.HTTP_201_CREATED)
+        if all(item['status'] == 'invalid' for item in result['results']):
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
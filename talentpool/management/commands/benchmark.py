@@ -0,0 +1,369 @@
+"""
+Benchmark Management Command
+"""
+import random
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from urllib.request import Request as HTTPRequest, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.pagination import Cursor
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from talentpool.application.listing import JobAdvertListingService
+from talentpool.application.pagination import JobAdvertCursorPagination
+from talentpool.application.services import JobAdvertService
+from talentpool.interface.authentication import CachedTokenAuthentication, invalidate_token
+from talentpool.interface.serializers import (JobAdvertValuesSerializer,
+                                              JobApplicationValuesSerializer)
+from talentpool.interface.views import JobAdvertDetailAPIView
+from talentpool.models import JobAdvert, JobApplication, User
+
+
+# Vocabulary of the seeded search documents, rare words appear in few adverts
+SEARCH_TITLES = ['Senior', 'Junior', 'Lead', 'Staff', 'Principal']
+SEARCH_ROLES = ['Python Developer', 'Java Engineer', 'Data Scientist', 'Product Designer',
+                'DevOps Engineer', 'Frontend Developer', 'QA Analyst', 'Account Manager']
+SEARCH_WORDS = ['remote', 'team', 'customers', 'cloud', 'django', 'react', 'kubernetes',
+                'payments', 'mentoring', 'agile', 'analytics', 'security', 'startup']
+SEARCH_RARE_WORDS = ['haskell', 'erlang', 'fortran']
+
+
+class Rollback(Exception):
+    """
+    Raised to discard the seeded benchmark data
+    """
+
+
+class Command(BaseCommand):
+    """
+    Benchmark Management Command
+    NOTE: seeded rows live in a transaction that is rolled back at the end,
+    pass --keep to leave them in the database for repeated runs
+    """
+    help = 'Benchmark the hot API paths'
+
+    def add_arguments(self, parser):
+        """
+        Add command arguments
+        :param parser:
+        :return:
+        """
+        parser.add_argument('scenario',
+                            choices=['listing', 'auth', 'load', 'search', 'serializers'],
+                            help='What to benchmark')
+        parser.add_argument('--adverts', type=int, default=100_000,
+                            help='Number of published adverts to seed')
+        parser.add_argument('--pages', type=int, nargs='+', default=[1, 10_000],
+                            help='Listing pages to time')
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed runs per measurement')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the seeded rows')
+        parser.add_argument('--server', default='http://localhost:8000',
+                            help='Running server of the load scenario')
+        parser.add_argument('--url', nargs='+',
+                            help='URLs of the load scenario, the sync and async detail of a '
+                                 'published advert by default')
+        parser.add_argument('--token',
+                            help='Token sent by the load scenario, any stored token by default')
+        parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10_000],
+                            help='Rows serialized per run of the serializers scenario')
+        parser.add_argument('--query', nargs='+',
+                            default=['python', 'haskell', '"senior python"', 'cobol'],
+                            help='Searches of the search scenario')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64],
+                            help='Concurrent clients of the load scenario')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per concurrency level of the load scenario')
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle command
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        if kwargs['scenario'] == 'load':
+            # The requests run on the server, there is nothing to roll back here
+            self.benchmark_load(**kwargs)
+            return
+        try:
+            with transaction.atomic():
+                getattr(self, f"benchmark_{kwargs['scenario']}")(**kwargs)
+                if not kwargs['keep']:
+                    raise Rollback
+        except Rollback:
+            pass
+
+    @property
+    def host(self) -> str:
+        """
+        A host name the settings accept
+        :return str:
+        """
+        host = settings.ALLOWED_HOSTS[0].lstrip('.')
+        return 'localhost' if host == '*' else host
+
+    def seed_job_adverts(self, count) -> None:
+        """
+        Top up the published job adverts to count rows
+        :param count:
+        :return None:
+        """
+        missing = count - JobAdvert.objects.filter(is_published=True).count()
+        if missing <= 0:
+            return
+        self.stdout.write(f'Seeding {missing} job adverts...')
+        JobAdvert.objects.bulk_create((
+            JobAdvert(
+                title=f'Benchmark Job {n}',
+                company_name='Benchmark Company',
+                employment_type='full_time',
+                experience_level='entry',
+                description='Job description',
+                location='Location',
+                job_description='Detailed job description',
+                is_published=True,
+            ) for n in range(missing)
+        ), batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {JobAdvert._meta.db_table}')
+
+    def seed_search_job_adverts(self, count) -> None:
+        """
+        Top up the published job adverts to count rows of varied text
+        NOTE: the text is drawn from a fixed seed, so runs are comparable
+        :param count:
+        :return None:
+        """
+        missing = count - JobAdvert.objects.filter(is_published=True).count()
+        if missing <= 0:
+            return
+        self.stdout.write(f'Seeding {missing} job adverts...')
+        rng = random.Random(0)
+
+        def text(words):
+            if rng.random() < 0.001:
+                words.append(rng.choice(SEARCH_RARE_WORDS))
+            return ' '.join(words)
+
+        JobAdvert.objects.bulk_create((
+            JobAdvert(
+                title=f'{rng.choice(SEARCH_TITLES)} {rng.choice(SEARCH_ROLES)}',
+                company_name=f'Company {rng.randrange(5000)}',
+                employment_type='full_time',
+                experience_level='entry',
+                description=text(rng.sample(SEARCH_WORDS, 4)),
+                location=f'City {rng.randrange(200)}',
+                job_description=text(rng.sample(SEARCH_WORDS, 8)),
+                applicant_count=rng.randrange(100),
+                is_published=True,
+            ) for _ in range(missing)
+        ), batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {JobAdvert._meta.db_table}')
+
+    @staticmethod
+    def measure(call, repeat) -> tuple[float, float, int]:
+        """
+        Time repeated calls
+        :param call:
+        :param repeat:
+        :return tuple[float, float, int]: median ms, p99 ms, queries of the last call
+        """
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                call()
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = len(context)
+        return statistics.median(timings), statistics.quantiles(timings, n=100)[98], queries
+
+    def time_get(self, path, repeat) -> tuple[float, float, int]:
+        """
+        Time building and rendering listing pages, bypassing the listing cache
+        :param path:
+        :param repeat:
+        :return tuple[float, float, int]: median ms, p99 ms, queries per request
+        """
+        factory = APIRequestFactory()
+        renderer = JSONRenderer()
+        return self.measure(lambda: renderer.render(JobAdvertService.build_job_advert_listing(
+            Request(factory.get(path, HTTP_HOST=self.host)))), repeat)
+
+    def cursor_path(self, page, page_size) -> str:
+        """
+        Build the cursor URL that a client paging forwards would hold at page
+        :param page:
+        :param page_size:
+        :return str:
+        """
+        if page <= 1:
+            return f'/job-adverts/?pagination=cursor&page_size={page_size}'
+        paginator = JobAdvertCursorPagination()
+        anchor = JobAdvertListingService.listing_queryset().order_by(
+            *paginator.ordering).values(*[f.lstrip('-') for f in paginator.ordering])[
+            (page - 1) * page_size - 1]
+        paginator.base_url = f'/job-adverts/?page_size={page_size}'
+        return paginator.encode_cursor(Cursor(offset=0, reverse=False, position=anchor))
+
+    def benchmark_listing(self, **kwargs) -> None:
+        """
+        Compare page-number and cursor pagination at increasing depth
+        :param kwargs:
+        :return None:
+        """
+        page_size = kwargs['page_size']
+        self.seed_job_adverts(kwargs['adverts'])
+        self.stdout.write(f"{'mode':<8}{'page':>8}{'median ms':>12}{'p99 ms':>10}{'queries':>9}")
+        for page in kwargs['pages']:
+            paths = {
+                'page': f'/job-adverts/?page={page}&page_size={page_size}',
+                'cursor': self.cursor_path(page, page_size),
+            }
+            for mode, path in paths.items():
+                median, p99, queries = self.time_get(path, kwargs['repeat'])
+                self.stdout.write(f'{mode:<8}{page:>8}{median:>12.2f}{p99:>10.2f}{queries:>9}')
+
+    def benchmark_search(self, **kwargs) -> None:
+        """
+        Time the first page of common, rare, phrase and unmatched searches
+        :param kwargs:
+        :return None:
+        """
+        self.seed_search_job_adverts(kwargs['adverts'])
+        self.stdout.write(f"{'q':<20}{'matches':>9}{'median ms':>12}{'p99 ms':>10}{'queries':>9}")
+        for query in kwargs['query']:
+            path = f"/job-adverts/?{urlencode({'q': query, 'page_size': kwargs['page_size']})}"
+            matches = JobAdvertService.build_job_advert_listing(
+                Request(APIRequestFactory().get(path, HTTP_HOST=self.host)))['count']
+            median, p99, queries = self.time_get(path, kwargs['repeat'])
+            self.stdout.write(f'{query:<20}{matches:>9}{median:>12.2f}{p99:>10.2f}{queries:>9}')
+
+    def benchmark_serializers(self, **kwargs) -> None:
+        """
+        Rows per second read and rendered to JSON by the model serializers
+        and by their values serializers
+        :param kwargs:
+        :return None:
+        """
+        rows = max(kwargs['rows'])
+        self.seed_job_adverts(rows)
+        job_advert = JobAdvert.objects.filter(is_published=True).first()
+        JobApplication.objects.bulk_create((
+            JobApplication(
+                job_advert=job_advert,
+                first_name='Benchmark',
+                last_name=f'Applicant {n}',
+                email=f'benchmark-{n}@example.com',
+                phone='1234567890',
+                linkedin_profile='https://linkedin.com/in/benchmark',
+                github_profile='https://github.com/benchmark',
+                years_of_experience='3-4',
+                cover_letter='Cover letter',
+            ) for n in range(rows)
+        ), batch_size=5000)
+        renderer = JSONRenderer()
+        querysets = {
+            JobAdvertValuesSerializer: JobAdvert.objects.order_by('created', 'uuid'),
+            JobApplicationValuesSerializer: JobApplication.objects.filter(
+                job_advert=job_advert).order_by('created', 'uuid'),
+        }
+
+        self.stdout.write(f"{'serializer':<32}{'rows':>8}{'median ms':>12}{'rows/s':>12}")
+        for values_serializer, queryset in querysets.items():
+            serializer_class = values_serializer.serializer_class
+            for count in kwargs['rows']:
+                calls = {
+                    serializer_class.__name__: lambda count=count: renderer.render(
+                        serializer_class(queryset[:count], many=True).data),
+                    values_serializer.__name__: lambda count=count: renderer.render(
+                        values_serializer.serialize(values_serializer.values(queryset)[:count])),
+                }
+                for name, call in calls.items():
+                    median, _, _ = self.measure(call, kwargs['repeat'])
+                    self.stdout.write(
+                        f'{name:<32}{count:>8}{median:>12.2f}{count / median * 1000:>12.0f}')
+
+    def benchmark_auth(self, **kwargs) -> None:
+        """
+        Compare database queries per authenticated request with plain and
+        cached token authentication
+        :param kwargs:
+        :return None:
+        """
+        user = User.objects.create_user(username=f'benchmark-{uuid.uuid4().hex}')
+        token = Token.objects.create(user=user)
+        self.seed_job_adverts(1)
+        job_advert = JobAdvert.objects.filter(is_published=True).first()
+        factory = APIRequestFactory()
+        path = f'/job-advert/{job_advert.uuid}/'
+
+        self.stdout.write(f"{'authentication':<16}{'median ms':>12}{'p99 ms':>10}{'queries':>9}")
+        for name, authentication_class in (('token', TokenAuthentication),
+                                           ('cached token', CachedTokenAuthentication)):
+            invalidate_token(token.key)
+            view = JobAdvertDetailAPIView.as_view(authentication_classes=[authentication_class])
+            median, p99, queries = self.measure(lambda view=view: view(factory.get(
+                path, HTTP_HOST=self.host, HTTP_AUTHORIZATION=f'Token {token.key}'),
+                job_advert_id=job_advert.uuid).render(),
+                kwargs['repeat'])
+            self.stdout.write(f'{name:<16}{median:>12.2f}{p99:>10.2f}{queries:>9}')
+
+    def benchmark_load(self, **kwargs) -> None:
+        """
+        Latency percentiles of a running server as concurrency grows
+        NOTE: nothing is seeded, the server reads its own database; seed it
+        first with `benchmark listing --keep` and `benchmark auth --keep`.
+        The default URLs are the advert detail, which is not cached, so every
+        request queries the database (the listing pages would be served from
+        the cache). Run it once against the WSGI server and once against
+        SERVER_MODE=asgi to compare the sync views with their /async/
+        variants on both
+        :param kwargs:
+        :return None:
+        """
+        token = kwargs['token'] or Token.objects.values_list('key', flat=True).first()
+        if token is None:
+            raise CommandError('No stored token, run `benchmark auth --keep` or pass --token')
+        urls = kwargs['url']
+        if not urls:
+            job_advert_id = JobAdvert.objects.filter(
+                is_published=True).values_list('uuid', flat=True).first()
+            if job_advert_id is None:
+                raise CommandError('No published job advert, run `benchmark listing --keep`')
+            urls = [kwargs['server'] + reverse(name, args=[job_advert_id])
+                    for name in ('job-advert-detail', 'async-job-advert-detail')]
+
+        def get(url):
+            start = time.perf_counter()
+            with urlopen(HTTPRequest(url, headers={'Authorization': f'Token {token}'})) as response:
+                response.read()
+            return (time.perf_counter() - start) * 1000
+
+        self.stdout.write(f"{'url':<72}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for url in urls:
+            get(url)  # warm up the server and its connections
+            for concurrency in kwargs['concurrency']:
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    start = time.perf_counter()
+                    timings = list(executor.map(get, [url] * kwargs['requests']))
+                    elapsed = time.perf_counter() - start
+                percentiles = statistics.quantiles(timings, n=100)
+                self.stdout.write(f"{url:<72}{concurrency:>8}{len(timings) / elapsed:>10.1f}"
+                                  f"{percentiles[49]:>10.2f}{percentiles[98]:>10.2f}")
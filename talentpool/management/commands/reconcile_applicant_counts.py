@@ -0,0 +1,25 @@
+"""
+Reconcile Applicant Counts Management Command
+"""
+
+from django.core.management.base import BaseCommand
+
+from talentpool.application.services import JobAdvertService
+
+
+class Command(BaseCommand):
+    """
+    Reconcile Applicant Counts Management Command
+    """
+    help = 'Reset job advert applicant counts that drifted from their applications'
+
+    def handle(self, *args, **kwargs):
+        """
+        Handle command
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        corrected = JobAdvertService.reconcile_applicant_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Corrected the applicant count of {corrected} job adverts'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.7 on 2026-10-17 18:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_applicant_count(apps, schema_editor):
+    """
+    Copy the current number of applications onto each job advert
+    """
+    JobAdvert = apps.get_model('talentpool', 'JobAdvert')
+    JobApplication = apps.get_model('talentpool', 'JobApplication')
+    applications = JobApplication.objects.filter(
+        job_advert=OuterRef('uuid')).order_by().values('job_advert').annotate(
+        total=Count('uuid')).values('total')
+    JobAdvert.objects.update(applicant_count=Coalesce(Subquery(applications), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('talentpool', '0001_squashed_0002_alter_jobadvert_uuid_alter_jobapplication_uuid_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobadvert',
+            name='applicant_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_applicant_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='jobadvert',
+            index=models.Index(fields=['-applicant_count', 'created', 'uuid'], name='jobadvert_listing_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-17 18:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('talentpool', '0003_jobadvert_applicant_count'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='jobadvert',
+            name='jobadvert_listing_idx',
+        ),
+        migrations.AlterField(
+            model_name='jobapplication',
+            name='job_advert',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='talentpool.jobadvert'),
+        ),
+        migrations.AddIndex(
+            model_name='jobadvert',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-applicant_count', 'created', 'uuid'], name='jobadvert_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobadvert',
+            index=models.Index(condition=models.Q(('is_published', False), ('is_scheduled', True)), fields=['publish_at'], name='jobadvert_due_publish_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['job_advert', 'created', 'uuid'], name='jobapplication_advert_idx'),
+        ),
+    ]
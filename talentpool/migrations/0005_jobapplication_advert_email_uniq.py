@@ -0,0 +1,80 @@
+# Generated by Django 5.0.7 on 2026-10-17 18:38
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Where the duplicate applications removed by this migration are kept
+ARCHIVE_TABLE = 'talentpool_jobapplication_duplicate'
+
+
+def recount_applicants(apps, job_advert_ids):
+    """
+    Recount the applicants of the job adverts
+    """
+    JobAdvert = apps.get_model('talentpool', 'JobAdvert')
+    JobApplication = apps.get_model('talentpool', 'JobApplication')
+    applications = JobApplication.objects.filter(
+        job_advert=OuterRef('uuid')).order_by().values('job_advert').annotate(
+        total=Count('uuid')).values('total')
+    JobAdvert.objects.filter(uuid__in=job_advert_ids).update(
+        applicant_count=Coalesce(Subquery(applications), 0))
+
+
+def archive_duplicate_applications(apps, schema_editor):
+    """
+    Keep the first application of each (job advert, email), move the later
+    ones to the talentpool_jobapplication_duplicate table and recount the
+    applicants of the job adverts that had duplicates
+    NOTE: the archive table is only left behind when there were duplicates;
+    reverting the migration puts its rows back
+    """
+    JobApplication = apps.get_model('talentpool', 'JobApplication')
+    table = JobApplication._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {ARCHIVE_TABLE} (LIKE {table} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH removed AS (DELETE FROM {table} AS later USING {table} AS earlier '
+            'WHERE later.job_advert_id = earlier.job_advert_id '
+            'AND later.email = earlier.email '
+            'AND (later.created, later.uuid) > (earlier.created, earlier.uuid) '
+            'RETURNING later.*) '
+            f'INSERT INTO {ARCHIVE_TABLE} SELECT * FROM removed RETURNING job_advert_id'
+        )
+        job_advert_ids = {row[0] for row in cursor.fetchall()}
+        if not job_advert_ids:
+            cursor.execute(f'DROP TABLE {ARCHIVE_TABLE}')
+            return
+    recount_applicants(apps, job_advert_ids)
+
+
+def restore_duplicate_applications(apps, schema_editor):
+    """
+    Put the archived duplicate applications back and drop the archive
+    """
+    JobApplication = apps.get_model('talentpool', 'JobApplication')
+    table = JobApplication._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [ARCHIVE_TABLE])
+        if cursor.fetchone()[0] is None:
+            return
+        cursor.execute(
+            f'INSERT INTO {table} SELECT * FROM {ARCHIVE_TABLE} RETURNING job_advert_id')
+        job_advert_ids = {row[0] for row in cursor.fetchall()}
+        cursor.execute(f'DROP TABLE {ARCHIVE_TABLE}')
+    recount_applicants(apps, job_advert_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('talentpool', '0004_service_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(archive_duplicate_applications, restore_duplicate_applications),
+        migrations.AddConstraint(
+            model_name='jobapplication',
+            constraint=models.UniqueConstraint(fields=('job_advert', 'email'), name='jobapplication_advert_email_uniq'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-17 18:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The name Django gave the job_advert foreign key of job applications
+JOB_ADVERT_FK = 'talentpool_jobapplic_job_advert_id_30cef8a9_fk_talentpoo'
+
+
+def job_advert_foreign_key(on_delete):
+    """
+    SQL recreating the job_advert foreign key of job applications with the
+    given ON DELETE action
+    """
+    return (
+        f'ALTER TABLE talentpool_jobapplication DROP CONSTRAINT {JOB_ADVERT_FK}, '
+        f'ADD CONSTRAINT {JOB_ADVERT_FK} FOREIGN KEY (job_advert_id) '
+        f'REFERENCES talentpool_jobadvert (uuid) {on_delete} DEFERRABLE INITIALLY DEFERRED'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('talentpool', '0005_jobapplication_advert_email_uniq'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobapplication',
+            name='job_advert',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='applications', to='talentpool.jobadvert'),
+        ),
+        migrations.RunSQL(job_advert_foreign_key('ON DELETE CASCADE'),
+                          job_advert_foreign_key('')),
+    ]
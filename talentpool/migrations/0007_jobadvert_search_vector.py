@@ -0,0 +1,45 @@
+# Generated by Django 5.0.7 on 2026-10-17 18:46
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('talentpool', '0006_jobapplication_advert_db_cascade'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobadvert',
+            name='search_vector',
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.contrib.postgres.search.CombinedSearchVector(
+                    django.contrib.postgres.search.CombinedSearchVector(
+                        django.contrib.postgres.search.CombinedSearchVector(
+                            django.contrib.postgres.search.SearchVector(
+                                'title', config='english', weight='A'),
+                            '||',
+                            django.contrib.postgres.search.SearchVector(
+                                'company_name', 'location', config='english', weight='B'),
+                            django.contrib.postgres.search.SearchConfig('english')),
+                        '||',
+                        django.contrib.postgres.search.SearchVector(
+                            'description', config='english', weight='C'),
+                        django.contrib.postgres.search.SearchConfig('english')),
+                    '||',
+                    django.contrib.postgres.search.SearchVector(
+                        'job_description', config='english', weight='D'),
+                    django.contrib.postgres.search.SearchConfig('english')),
+                output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='jobadvert',
+            index=django.contrib.postgres.indexes.GinIndex(
+                condition=models.Q(('is_published', True)), fields=['search_vector'],
+                name='jobadvert_search_idx'),
+        ),
+    ]
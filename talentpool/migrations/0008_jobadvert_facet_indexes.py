@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-17 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('talentpool', '0007_jobadvert_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobadvert',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['employment_type', '-applicant_count', 'created', 'uuid'], name='jobadvert_employment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobadvert',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['experience_level', '-applicant_count', 'created', 'uuid'], name='jobadvert_experience_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobadvert',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['location', '-applicant_count', 'created', 'uuid'], name='jobadvert_location_idx'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 """
 Talentpool models module
 """
-from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models
 from django_extensions.db.models import TimeStampedModel
 
 
@@ -19,6 +21,26 @@ class User(TimeStampedModel, AbstractUser):
     """
 
 
+# Text search configuration of JobAdvert.search_vector, searches must use it too
+SEARCH_CONFIG = 'english'
+
+
+# A manager only overriding get_queryset, pylint counts the one method
+class JobAdvertManager(models.Manager):  # pylint: disable=R0903
+    """
+    The JobAdvert manager
+    NOTE: search_vector is only read by searches, which filter and rank on
+    it in the database, so it is left out of the rows loaded
+    """
+
+    def get_queryset(self):
+        """
+        The job adverts, without their search vector
+        :return QuerySet:
+        """
+        return super().get_queryset().defer('search_vector')
+
+
 class JobAdvert(TimeStampedModel):
     """
     The JobAdvert Model
@@ -48,6 +70,49 @@ class JobAdvert(TimeStampedModel):
 
     publish_at = models.DateTimeField(null=True, blank=True)
     is_scheduled = models.BooleanField(default=False)
+    # Denormalized count of applications, kept in step by JobApplicationService
+    # so the listing can sort on an indexed column instead of aggregating
+    applicant_count = models.PositiveIntegerField(default=0)
+    # Full-text search document, kept by Postgres: the title weighs the most,
+    # then who and where, then the descriptions
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('company_name', 'location', weight='B', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+            + SearchVector('job_description', weight='D', config=SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = JobAdvertManager()
+
+    class Meta(TimeStampedModel.Meta):
+        indexes = [
+            # The public listing: published adverts in listing order
+            models.Index(fields=['-applicant_count', 'created', 'uuid'],
+                         condition=models.Q(is_published=True),
+                         name='jobadvert_listing_idx'),
+            # The listing filtered on a facet, still walked in listing order
+            models.Index(fields=['employment_type', '-applicant_count', 'created', 'uuid'],
+                         condition=models.Q(is_published=True),
+                         name='jobadvert_employment_idx'),
+            models.Index(fields=['experience_level', '-applicant_count', 'created', 'uuid'],
+                         condition=models.Q(is_published=True),
+                         name='jobadvert_experience_idx'),
+            models.Index(fields=['location', '-applicant_count', 'created', 'uuid'],
+                         condition=models.Q(is_published=True),
+                         name='jobadvert_location_idx'),
+            # The scheduled publish task: only adverts still waiting to go live
+            models.Index(fields=['publish_at'],
+                         condition=models.Q(is_scheduled=True, is_published=False),
+                         name='jobadvert_due_publish_idx'),
+            # Searches of the public listing
+            GinIndex(fields=['search_vector'],
+                     condition=models.Q(is_published=True),
+                     name='jobadvert_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -65,9 +130,14 @@ class JobApplication(TimeStampedModel):
         ('7+', '7 and above')
     ]
 
+    # db_index is off because jobapplication_advert_idx leads with job_advert.
+    # The cascade is ON DELETE CASCADE in the database (migration 0006), so
+    # deleting adverts is a single DELETE instead of Django collecting every
+    # application first. Altering this field drops it: re-add it with RunSQL,
+    # test_job_advert_foreign_key_cascades fails until then
     job_advert = models.ForeignKey(
-        JobAdvert, on_delete=models.CASCADE, related_name='applications',
-        to_field='uuid'
+        JobAdvert, on_delete=models.DO_NOTHING, related_name='applications',
+        to_field='uuid', db_index=False
     )
     # why do we have to keep first_name, last_name and email here when we can
     # get it from the users model
@@ -81,5 +151,22 @@ class JobApplication(TimeStampedModel):
     years_of_experience = models.CharField(max_length=10, choices=YEARS_OF_EXPERIENCE)
     cover_letter = models.TextField(blank=True, null=True)
 
+    class Meta(TimeStampedModel.Meta):
+        indexes = [
+            # The applications of an advert, in the order they came in
+            models.Index(fields=['job_advert', 'created', 'uuid'],
+                         name='jobapplication_advert_idx'),
+        ]
+        constraints = [
+            # One application per applicant and advert, bulk ingestion skips
+            # the duplicates with ON CONFLICT DO NOTHING
+            models.UniqueConstraint(fields=['job_advert', 'email'],
+                                    name='jobapplication_advert_email_uniq'),
+        ]
+
     def __str__(self):
-        return f"{self.first_name} {self.last_name} for {self.job_advert.title}"
+        # Never fetch the advert just to print an application. On the class,
+        # job_advert is the relation descriptor, pylint takes it for the advert
+        if JobApplication.job_advert.is_cached(self):  # pylint: disable=E1101
+            return f"{self.first_name} {self.last_name} for {self.job_advert.title}"
+        return f"{self.first_name} {self.last_name} for {self.job_advert_id}"
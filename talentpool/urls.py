@@ -8,9 +8,19 @@ from drf_yasg import openapi
 from talentpool.interface.views import (UserAPIView,
                                         JobAdvertListAPIView,
                                         JobAdvertDetailAPIView,
+                                        JobAdvertBulkCreateAPIView,
                                         JobAdvertPublishAPIView,
+                                        JobAdvertBulkPublishAPIView,
+                                        JobAdvertBulkUnpublishAPIView,
                                         JobApplicationListAPIView,
-                                        JobApplicationDetailAPIView, UserAuthenticationAPIView)
+                                        JobApplicationExportAPIView,
+                                        JobApplicationDetailAPIView,
+                                        JobApplicationStatusAPIView,
+                                        JobApplicationBulkCreateAPIView,
+                                        UserAuthenticationAPIView)
+from talentpool.interface.async_views import (AsyncJobAdvertListView,
+                                              AsyncJobAdvertDetailView,
+                                              AsyncJobApplicationListView)
 
 SchemaView = get_schema_view(
     openapi.Info(
@@ -48,11 +58,26 @@ urlpatterns = [
         JobAdvertListAPIView.as_view(),
         name='job-advert'
     ),
+    path(
+        'job-adverts/publish',
+        JobAdvertBulkPublishAPIView.as_view(),
+        name='job-advert-bulk-publish'
+    ),
+    path(
+        'job-adverts/unpublish',
+        JobAdvertBulkUnpublishAPIView.as_view(),
+        name='job-advert-bulk-unpublish'
+    ),
     path(
         'job-advert/',
         JobAdvertDetailAPIView.as_view(),
         name='job-advert-create'
     ),
+    path(
+        'job-advert/bulk/',
+        JobAdvertBulkCreateAPIView.as_view(),
+        name='job-advert-bulk-create'
+    ),
     path(
         'job-advert/<uuid:job_advert_id>/',
         JobAdvertDetailAPIView.as_view(),
@@ -68,14 +93,44 @@ urlpatterns = [
         JobApplicationListAPIView.as_view(),
         name='job-application'
     ),
+    path(
+        'job-advert/<uuid:job_advert_id>/applications/export/',
+        JobApplicationExportAPIView.as_view(),
+        name='job-application-export'
+    ),
     path(
         'job-application/',
         JobApplicationDetailAPIView.as_view(),
         name='job-application-create'
     ),
+    path(
+        'job-application/bulk/',
+        JobApplicationBulkCreateAPIView.as_view(),
+        name='job-application-bulk-create'
+    ),
     path(
         'job-application/<uuid:job_application_id>/',
         JobApplicationDetailAPIView.as_view(),
         name='job-application-detail'
+    ),
+    path(
+        'job-application/<uuid:job_application_id>/status/',
+        JobApplicationStatusAPIView.as_view(),
+        name='job-application-status'
+    ),
+    path(
+        'async/job-adverts/',
+        AsyncJobAdvertListView.as_view(),
+        name='async-job-advert'
+    ),
+    path(
+        'async/job-advert/<uuid:job_advert_id>/',
+        AsyncJobAdvertDetailView.as_view(),
+        name='async-job-advert-detail'
+    ),
+    path(
+        'async/job-advert/<uuid:job_advert_id>/applications/',
+        AsyncJobApplicationListView.as_view(),
+        name='async-job-application'
     )
 ]
@@ -0,0 +1,44 @@
+"""
+Shared test fixtures
+"""
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def local_cache(settings):
+    """
+    Run every test against an empty in-process cache instead of Redis
+    :param settings:
+    :return:
+    """
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    from django.core.cache import cache  # pylint: disable=C0415
+    from talentpool.interface.authentication import \
+        CachedTokenAuthentication  # pylint: disable=C0415
+    cache.clear()
+    CachedTokenAuthentication.local_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def intake_stream(settings):
+    """
+    Give every test its own job application intake stream in Redis, and
+    drop it afterwards
+    :param settings:
+    :return:
+    """
+    from uuid import uuid4  # pylint: disable=C0415
+    import redis  # pylint: disable=C0415
+    from talentpool.application import intake  # pylint: disable=C0415
+    settings.JOB_APPLICATION_INTAKE_STREAM = f'test:{uuid4().hex}:job-applications:intake'
+    yield settings.JOB_APPLICATION_INTAKE_STREAM
+    try:
+        keys = list(intake.redis_client().scan_iter(f'{settings.JOB_APPLICATION_INTAKE_STREAM}*'))
+        if keys:
+            intake.redis_client().delete(*keys)
+    except redis.ConnectionError:
+        pass
@@ -60,10 +60,48 @@ class JobApplicationFactory(factory.django.DjangoModelFactory):
     job_advert = factory.SubFactory(JobAdvertFactory)
     first_name = 'John'
     last_name = 'Doe'
-    email = 'john.doe@example.com'
+    email = factory.Sequence(lambda n: f'john.doe{n}@example.com')
     phone = '1234567890'
     linkedin_profile = 'https://linkedin.com/in/johndoe'
     github_profile = 'https://github.com/johndoe'
     website = 'https://johndoe.com'
     years_of_experience = '1-2'
     cover_letter = 'Cover letter content'
+
+
+def job_advert_data(**fields) -> dict:
+    """
+    The body of a job advert create request
+    :param fields: the fields to add or override
+    :return dict:
+    """
+    return {
+        'title': 'New Job',
+        'company_name': 'New Company',
+        'employment_type': 'full_time',
+        'experience_level': 'entry',
+        'description': 'Job description',
+        'location': 'Location',
+        'job_description': 'Detailed job description',
+        **fields,
+    }
+
+
+def job_application_data(job_advert, **fields) -> dict:
+    """
+    The body of a job application create request
+    :param job_advert: the job advert applied for
+    :param fields: the fields to add or override
+    :return dict:
+    """
+    return {
+        'job_advert': str(job_advert.uuid),
+        'first_name': 'Jane',
+        'last_name': 'Doe',
+        'email': 'jane.doe@example.com',
+        'phone': '1234567890',
+        'linkedin_profile': 'https://linkedin.com/in/janedoe',
+        'github_profile': 'https://github.com/janedoe',
+        'years_of_experience': '1-2',
+        **fields,
+    }
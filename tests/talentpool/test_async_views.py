@@ -0,0 +1,153 @@
+""" Talentpool async view tests """
+import gzip
+import json
+from unittest import mock
+from uuid import uuid4
+
+from django.db import transaction
+from django.urls import reverse
+
+import pytest
+
+from rest_framework.authtoken.models import Token
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework.throttling import BaseThrottle
+
+from talentpool.interface.async_views import AsyncJobAdvertListView
+from talentpool.interface.views import JobAdvertListAPIView
+from tests.talentpool.factories import UserFactory, JobAdvertFactory, JobApplicationFactory
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    """
+    Test the async variants of the read endpoints
+    """
+
+    def setup_method(self):
+        """
+        Method setup
+        :return:
+        """
+        self.client = APIClient()  # pylint: disable=W0201
+        self.user = UserFactory()  # pylint: disable=W0201
+        self.token = Token.objects.get(user=self.user)  # pylint: disable=W0201
+        self.job_advert = JobAdvertFactory.create(is_published=True)  # pylint: disable=W0201
+
+    def test_list_job_adverts_matches_sync_view(self, settings):
+        """
+        The async listing returns the same adverts as the sync one, each
+        linking to its own pages under its own ETag
+        :param settings:
+        :return:
+        """
+        settings.COMPRESSION_MIN_SIZE = 200
+        JobAdvertFactory.create_batch(12, is_published=True)
+        async_response = self.client.get(reverse('async-job-advert'), {'page': 2})
+        sync_response = self.client.get(reverse('job-advert'), {'page': 2})
+        assert async_response.status_code == status.HTTP_200_OK
+        assert async_response.json()['results'] == sync_response.json()['results']
+        assert sync_response.json()['previous'] == f"http://testserver{reverse('job-advert')}"
+        assert async_response.json()['previous'] == (
+            f"http://testserver{reverse('async-job-advert')}")
+        assert async_response['ETag'] != sync_response['ETag']
+
+        # the scheme is part of the links, and so of the cache key
+        secure_response = self.client.get(reverse('job-advert'), {'page': 2}, secure=True)
+        assert secure_response.json()['previous'].startswith('https://testserver/')
+        assert secure_response['ETag'] != sync_response['ETag']
+
+        gzip_response = self.client.get(reverse('async-job-advert'), {'page': 2},
+                                        HTTP_ACCEPT_ENCODING='gzip')
+        assert gzip_response['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(gzip_response.content)) == async_response.json()
+
+        response = self.client.get(reverse('async-job-advert'), {'page': 9})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_get_job_advert_details(self):
+        """
+        The async detail needs a token and answers conditional GETs
+        :return:
+        """
+        url = reverse('async-job-advert-detail', args=[self.job_advert.uuid])
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response['WWW-Authenticate'] == 'Token'
+
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['title'] == self.job_advert.title
+
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Token {self.token.key}',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_errors_match_sync_view(self):
+        """
+        Authentication and lookup errors go through DRF's exception handler
+        on both paths
+        NOTE: the handler rolls back the ATOMIC_REQUESTS transaction, which
+        is the test's, every request runs in a savepoint of its own
+        :return:
+        """
+        for args, headers in (([self.job_advert.uuid], {}),
+                              ([self.job_advert.uuid], {'HTTP_AUTHORIZATION': 'Token nope'}),
+                              ([uuid4()], {'HTTP_AUTHORIZATION': f'Token {self.token.key}'})):
+            with transaction.atomic():
+                sync_response = self.client.get(
+                    reverse('job-advert-detail', args=args), **headers)
+            with transaction.atomic():
+                async_response = self.client.get(
+                    reverse('async-job-advert-detail', args=args), **headers)
+            assert async_response.status_code == sync_response.status_code
+            assert async_response.json() == sync_response.json()
+            assert async_response.get('WWW-Authenticate') == sync_response.get('WWW-Authenticate')
+
+    def test_throttles_and_renderers(self, settings):
+        """
+        Throttle classes apply to both paths; only the sync view negotiates
+        its renderer, the async one always answers JSON
+        :param settings:
+        :return:
+        """
+        # The browsable API links static files, there is no manifest in tests
+        settings.STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        class Refuse(BaseThrottle):
+            """
+            Throttle refusing every request
+            """
+            def allow_request(self, request, view):
+                return False
+
+            def wait(self):
+                return 30
+
+        with mock.patch.object(JobAdvertListAPIView, 'throttle_classes', [Refuse]), \
+                mock.patch.object(AsyncJobAdvertListView, 'throttle_classes', [Refuse]):
+            with transaction.atomic():
+                sync_response = self.client.get(reverse('job-advert'))
+            with transaction.atomic():
+                async_response = self.client.get(reverse('async-job-advert'))
+        assert async_response.status_code == sync_response.status_code == 429
+        assert async_response.json() == sync_response.json()
+        assert async_response['Retry-After'] == sync_response['Retry-After'] == '30'
+
+        assert self.client.get(reverse('job-advert'), {'format': 'api'})[
+            'Content-Type'].startswith('text/html')
+        assert self.client.get(reverse('async-job-advert'), {'format': 'api'})[
+            'Content-Type'] == 'application/json'
+
+    def test_get_job_applications(self):
+        """
+        The async applications list returns the applications of the advert
+        :return:
+        """
+        JobApplicationFactory.create_batch(3, job_advert=self.job_advert)
+        response = self.client.get(
+            reverse('async-job-application', args=[self.job_advert.uuid]),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['count'] == 3
+        assert len(response.json()['results']) == 3
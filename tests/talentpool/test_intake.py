@@ -0,0 +1,151 @@
+""" Talentpool job application intake tests """
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import pytest
+
+from rest_framework.exceptions import ValidationError
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from talentpool.application import intake
+from talentpool.models import JobApplication
+from talentpool.application.services import JobAdvertService, JobApplicationService
+from talentpool.interface.renderers import dumps
+from tests.talentpool.factories import (UserFactory, JobAdvertFactory, JobApplicationFactory,
+                                        job_application_data)
+
+
+@pytest.mark.django_db
+class TestJobApplicationIntake:
+    """
+    Test the job application intake stream
+    """
+
+    def setup_method(self):
+        """
+        Method setup
+        :return:
+        """
+        self.client = APIClient()  # pylint: disable=W0201
+        self.user = UserFactory()  # pylint: disable=W0201
+        self.job_advert = JobAdvertFactory.create(is_published=True)  # pylint: disable=W0201
+
+    def test_stream_intake(self, settings, django_capture_on_commit_callbacks):
+        """
+        Stream intake answers 202 without storing, the consumer stores the
+        queued applications in a batch and the status follows along
+        :param settings:
+        :return:
+        """
+        settings.JOB_APPLICATION_INTAKE = 'stream'
+        applicant_count = self.job_advert.applicant_count
+        item = job_application_data(self.job_advert)
+        url = reverse('job-application-create')
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(url, item, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['status'] == 'queued'
+        job_application_id = response.data['uuid']
+        assert response['Location'].endswith(
+            reverse('job-application-status', args=[job_application_id]))
+        assert not JobApplication.objects.filter(uuid=job_application_id).exists()
+
+        # a retry is answered with the first attempt
+        response = self.client.post(url, item, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        assert response.data['uuid'] == job_application_id
+        duplicate_id = self.client.post(url, item, format='json').data['uuid']
+        response = self.client.get(reverse('job-application-status', args=[job_application_id]))
+        assert response.data == {'uuid': job_application_id, 'status': 'queued'}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            result = JobApplicationService.consume_job_application_intake()
+        assert result['created'] == 1
+        assert JobApplication.objects.get(uuid=job_application_id).email == item['email']
+        self.job_advert.refresh_from_db()
+        assert self.job_advert.applicant_count == applicant_count + 1
+        response = self.client.get(reverse('job-application-status', args=[job_application_id]))
+        assert response.data == {'uuid': job_application_id, 'status': 'created'}
+        response = self.client.get(reverse('job-application-status', args=[duplicate_id]))
+        assert response.data['status'] == 'duplicate'
+        assert JobApplicationService.consume_job_application_intake()['created'] == 0
+
+        # the key of another application, and applications of the wrong shape, are refused
+        response = self.client.post(url, {**item, 'email': 'jane@example.com'}, format='json',
+                                    HTTP_IDEMPOTENCY_KEY='retry-1')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.post(url, {**item, 'email': 'not an email'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_stream_intake_checks_the_cached_advert_state(self, django_capture_on_commit_callbacks):
+        """
+        The advert state is read from the cache until it is published
+        :return:
+        """
+        draft = JobAdvertFactory.create(is_published=False)
+        application = JobApplicationFactory.build(job_advert=draft)
+        item = {field: getattr(application, field) for field in (
+            'first_name', 'last_name', 'email', 'phone', 'linkedin_profile',
+            'github_profile', 'years_of_experience')}
+        item['job_advert'] = str(draft.uuid)
+        with pytest.raises(ValidationError) as exc:
+            JobApplicationService.submit_job_application(item)
+        assert 'job_advert' in exc.value.detail
+        with CaptureQueriesContext(connection) as queries:
+            with pytest.raises(ValidationError):
+                JobApplicationService.submit_job_application(item)
+        assert len(queries) == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            JobAdvertService.publish_job_advert(draft.uuid)
+        assert JobApplicationService.submit_job_application(item)['status'] == 'queued'
+
+    def test_stream_intake_dead_letters_what_cannot_be_stored(self, settings):
+        """
+        A queued entry that cannot be stored is moved to the dead-letter
+        stream and marked invalid, the rest of its batch is still stored,
+        and batches are never bigger than a bulk create takes
+        :param settings:
+        :return:
+        """
+        settings.JOB_APPLICATION_BULK_MAX_SIZE = 2
+        items = []
+        for application in JobApplicationFactory.build_batch(3, job_advert=self.job_advert):
+            item = {field: getattr(application, field) for field in (
+                'first_name', 'last_name', 'email', 'phone', 'linkedin_profile',
+                'github_profile', 'years_of_experience')}
+            item['job_advert'] = str(self.job_advert.uuid)
+            items.append(item)
+        queued = [intake.enqueue_job_application(item)['uuid'] for item in items]
+        client = intake.redis_client()
+        # entries of the wrong shape, a missing and a malformed uuid
+        client.xadd(settings.JOB_APPLICATION_INTAKE_STREAM, {'application': dumps(items[0])})
+        client.xadd(settings.JOB_APPLICATION_INTAKE_STREAM,
+                    {'application': dumps({**items[1], 'uuid': 'not a uuid'})})
+
+        result = JobApplicationService.consume_job_application_intake(batch_size=10)
+        assert result['created'] == 3
+        assert JobApplication.objects.filter(uuid__in=queued).count() == 3
+        assert intake.get_job_application_status('not a uuid')['status'] == 'invalid'
+        assert client.xlen(intake.dead_letter_stream()) == 2
+        assert client.xlen(settings.JOB_APPLICATION_INTAKE_STREAM) == 0
+
+    def test_stored_intake_batch_is_not_counted_twice(self):
+        """
+        A batch stored again (its worker died before acknowledging it) is
+        reported as created without counting the applicants again
+        :return:
+        """
+        application = JobApplicationFactory.build(job_advert=self.job_advert)
+        item = {field: getattr(application, field) for field in (
+            'first_name', 'last_name', 'email', 'phone', 'linkedin_profile',
+            'github_profile', 'years_of_experience')}
+        item['job_advert'] = str(self.job_advert.uuid)
+        for _ in range(2):
+            result = JobApplicationService.bulk_create_job_applications(
+                [dict(item)], uuids=[application.uuid])
+            assert result['results'][0] == {
+                'index': 0, 'status': 'created', 'uuid': str(application.uuid)}
+        self.job_advert.refresh_from_db()
+        assert self.job_advert.applicant_count == 1
@@ -0,0 +1,302 @@
+""" Talentpool job advert listing tests """
+import gzip
+import json
+from base64 import b64encode
+from unittest import mock
+from urllib.parse import urlencode
+
+import brotli
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from talentpool.application.caching import get_or_build_listing, listing_cache_key
+from talentpool.application.listing import JobAdvertListingService
+from talentpool.models import JobAdvert
+from talentpool.application.services import JobAdvertService
+from tests.talentpool.factories import UserFactory, JobAdvertFactory
+
+
+@pytest.mark.django_db
+class TestJobAdvertListing:
+    """
+    Test the job advert listing: pagination, search, facets and the listing cache
+    """
+
+    def setup_method(self):
+        """
+        Method setup
+        :return:
+        """
+        self.client = APIClient()  # pylint: disable=W0201
+        self.user = UserFactory()  # pylint: disable=W0201
+        self.job_advert = JobAdvertFactory.create(is_published=True)  # pylint: disable=W0201
+
+    def test_list_job_adverts_cursor_pagination(self):
+        """
+        Paging with cursors returns every published advert once, in listing
+        order, without counting the table
+        :return:
+        """
+        JobAdvertFactory.create_batch(3, is_published=True)
+        JobAdvertFactory.create(is_published=True, applicant_count=2)
+        expected = [str(uuid) for uuid in JobAdvert.objects.filter(
+            is_published=True).order_by(
+            '-applicant_count', 'created', 'uuid').values_list('uuid', flat=True)]
+
+        seen = []
+        url = reverse('job-advert') + '?pagination=cursor&page_size=2'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert 'count' not in response.data
+            assert not any('COUNT(*)' in query['sql'] for query in queries)
+            seen.extend(advert['uuid'] for advert in response.data['results'])
+            url = response.data['next']
+        assert seen == expected
+
+        # and walking back from the last page returns the previous rows
+        response = self.client.get(response.data['previous'])
+        assert [advert['uuid'] for advert in response.data['results']] == expected[2:4]
+
+    def test_list_job_adverts_invalid_cursor(self):
+        """
+        A tampered cursor is rejected
+        :return:
+        """
+        response = self.client.get(reverse('job-advert'), {'cursor': 'cD1ub3Q='})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        forged = b64encode(urlencode({'p': f'1|{timezone.now().isoformat()}|not-a-uuid'}).encode())
+        response = self.client.get(reverse('job-advert'), {'cursor': forged.decode()})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_search_job_adverts(self):
+        """
+        q searches the published adverts, best match first, and the listing
+        order comes back without it
+        :return:
+        """
+        description = JobAdvertFactory.create(
+            title='Backend Engineer', description='We write Python services')
+        title = JobAdvertFactory.create(title='Senior Python Developer')
+        JobAdvertFactory.create(title='Python Developer', is_published=False)
+        JobAdvertFactory.create(title='Python Django Developer')
+
+        response = self.client.get(reverse('job-advert'), {'q': 'python -django'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [advert['uuid'] for advert in response.data['results']] == [
+            str(title.uuid), str(description.uuid)]
+        assert response.data['count'] == 2
+
+        response = self.client.get(reverse('job-advert'), {'q': '"senior python"'})
+        assert [advert['uuid'] for advert in response.data['results']] == [str(title.uuid)]
+
+        response = self.client.get(reverse('job-advert'), {'q': ' '})
+        assert response.data['count'] == JobAdvert.objects.filter(is_published=True).count()
+
+    def test_filter_job_adverts(self):
+        """
+        The listing filters on employment type, experience level and location,
+        a repeated filter matching any of its values
+        :return:
+        """
+        remote = JobAdvertFactory.create(employment_type='remote', location='Lagos')
+        contract = JobAdvertFactory.create(employment_type='contract', experience_level='senior',
+                                           location='Lagos')
+        JobAdvertFactory.create(employment_type='remote', location='Lagos', is_published=False)
+
+        response = self.client.get(reverse('job-advert'), {'location': 'Lagos'})
+        assert response.status_code == status.HTTP_200_OK
+        assert {advert['uuid'] for advert in response.data['results']} == {
+            str(remote.uuid), str(contract.uuid)}
+
+        response = self.client.get(reverse('job-advert'), {
+            'location': 'Lagos', 'employment_type': ['remote', 'full_time']})
+        assert [advert['uuid'] for advert in response.data['results']] == [str(remote.uuid)]
+
+        response = self.client.get(reverse('job-advert'), {'experience_level': 'senior'})
+        assert [advert['uuid'] for advert in response.data['results']] == [str(contract.uuid)]
+
+        response = self.client.get(reverse('job-advert'), {'employment_type': 'freelance'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'employment_type' in response.data
+
+    def test_job_advert_facets(self, django_assert_num_queries):
+        """
+        facets=true adds the counts of each facet from one grouped query,
+        each facet ignoring its own filter
+        :return:
+        """
+        JobAdvertFactory.create(employment_type='remote', location='Lagos')
+        JobAdvertFactory.create(employment_type='contract', experience_level='senior',
+                                location='Lagos')
+        JobAdvertFactory.create(employment_type='remote', location='Abuja', is_published=False)
+
+        response = self.client.get(reverse('job-advert'))
+        assert 'facets' not in response.data
+
+        response = self.client.get(reverse('job-advert'), {'facets': 'true'})
+        facets = response.data['facets']
+        assert {row['value']: row['count'] for row in facets['employment_type']} == {
+            'full_time': 1, 'contract': 1, 'remote': 1, 'part_time': 0}
+        assert {row['value']: row['count'] for row in facets['experience_level']} == {
+            'entry': 2, 'mid': 0, 'senior': 1}
+        assert facets['location'] == [
+            {'value': 'Lagos', 'label': 'Lagos', 'count': 2},
+            {'value': 'Location', 'label': 'Location', 'count': 1}]
+
+        request = Request(APIRequestFactory().get(
+            '/job-adverts/', {'location': 'Lagos', 'employment_type': 'remote'}))
+        with django_assert_num_queries(1):
+            facets = JobAdvertListingService.job_advert_facets(request)
+        # Other employment types in Lagos stay on offer, other locations too
+        assert {row['value']: row['count'] for row in facets['employment_type']} == {
+            'full_time': 0, 'contract': 1, 'remote': 1, 'part_time': 0}
+        assert {row['value']: row['count'] for row in facets['experience_level']} == {
+            'entry': 1, 'mid': 0, 'senior': 0}
+        assert facets['location'] == [{'value': 'Lagos', 'label': 'Lagos', 'count': 1}]
+
+    def test_list_job_adverts_summary(self, settings):
+        """
+        view=summary leaves the descriptions out of both the rows read and
+        the response, for an excerpt cut in the database
+        :return:
+        """
+        settings.JOB_ADVERT_EXCERPT_LENGTH = 16
+        long = JobAdvertFactory.create(description='A description of more than sixteen characters')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('job-advert'), {'view': 'summary'})
+        assert response.status_code == status.HTTP_200_OK
+        adverts = {advert['uuid']: advert for advert in response.data['results']}
+        assert adverts[str(long.uuid)]['excerpt'] == 'A description of…'
+        assert adverts[str(self.job_advert.uuid)]['excerpt'] == self.job_advert.description
+        assert 'description' not in adverts[str(long.uuid)]
+        assert 'job_description' not in adverts[str(long.uuid)]
+        assert '"job_description"' not in queries.captured_queries[-1]['sql']
+        queryset = JobAdvertListingService.job_advert_listing_values(
+            Request(APIRequestFactory().get('/job-adverts/', {'view': 'summary'})))
+        assert 'description' not in queryset.query.values_select
+
+        response = self.client.get(reverse('job-advert'), {'view': 'full'})
+        assert 'job_description' in response.data['results'][0]
+        assert 'excerpt' not in response.data['results'][0]
+
+        response = self.client.get(reverse('job-advert'), {'view': 'tiny'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_job_adverts_sparse_fieldset(self):
+        """
+        The listing prunes its fields, cursor pages still link to each other
+        :return:
+        """
+        JobAdvertFactory.create_batch(3, is_published=True)
+        response = self.client.get(reverse('job-advert'), {
+            'fields': 'title', 'pagination': 'cursor', 'page_size': 2})
+        assert [set(advert) for advert in response.data['results']] == [{'title'}, {'title'}]
+        response = self.client.get(response.data['next'])
+        assert [set(advert) for advert in response.data['results']] == [{'title'}, {'title'}]
+
+        response = self.client.get(reverse('job-advert'), {
+            'view': 'summary', 'fields': 'uuid,excerpt'})
+        assert set(response.data['results'][0]) == {'uuid', 'excerpt'}
+        response = self.client.get(reverse('job-advert'), {'fields': 'excerpt'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_job_adverts_is_cached_until_published(self, django_capture_on_commit_callbacks):
+        """
+        Listing pages are served from the cache until a publish invalidates them
+        :return:
+        """
+        response = self.client.get(reverse('job-advert'))
+        assert response.data['count'] == 1
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(reverse('job-advert'))
+        # not even the SAVEPOINT pair of ATOMIC_REQUESTS
+        assert len(queries) == 0
+        assert cached.data == response.data
+
+        job_advert = JobAdvertFactory.create(is_published=False)
+        with django_capture_on_commit_callbacks(execute=True):
+            JobAdvertService.publish_job_advert(job_advert.uuid)
+        response = self.client.get(reverse('job-advert'))
+        assert response.data['count'] == 2
+
+    def test_list_job_adverts_is_cached_compressed(self, settings):
+        """
+        Listing pages are cached already encoded and compressed, a cache hit
+        neither encodes nor compresses
+        :param settings:
+        :return:
+        """
+        settings.COMPRESSION_MIN_SIZE = 200
+        JobAdvertFactory.create_batch(3, is_published=True)
+        body = self.client.get(reverse('job-advert'), HTTP_ACCEPT_ENCODING='identity').content
+
+        with mock.patch('talentpool.interface.renderers.dumps') as dumps_mock, \
+                mock.patch('talentpool.interface.renderers.compress') as compress:
+            response = self.client.get(reverse('job-advert'), HTTP_ACCEPT_ENCODING='gzip')
+            assert response['Content-Encoding'] == 'gzip'
+            assert gzip.decompress(response.content) == body
+            response = self.client.get(reverse('job-advert'),
+                                       HTTP_ACCEPT_ENCODING='gzip;q=0.5, br')
+            assert response['Content-Encoding'] == 'br'
+            assert brotli.decompress(response.content) == body
+        dumps_mock.assert_not_called()
+        compress.assert_not_called()
+        assert 'Accept-Encoding' in response['Vary']
+        assert response['ETag'].startswith('W/')
+
+        response = self.client.get(reverse('job-advert'), HTTP_ACCEPT_ENCODING='br',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        # indented JSON (and the browsable API) is rendered from the data
+        response = self.client.get(reverse('job-advert'), HTTP_ACCEPT='application/json; indent=2')
+        assert response.content.startswith(b'{\n  ')
+        assert json.loads(response.content) == json.loads(body)
+
+    def test_listing_rebuild_is_taken_over_when_the_lock_is_released(self):
+        """
+        A worker waiting for another one's rebuild takes it over as soon as
+        the lock is released without a page, instead of waiting it out
+        :return:
+        """
+        request = Request(APIRequestFactory().get('/job-adverts/'))
+        lock_key = f'{listing_cache_key(request)}:lock'
+        cache.add(lock_key, 1)
+        build = mock.Mock(return_value={'json': b'{}'})
+        # The rebuilding worker fails while this one waits
+        with mock.patch('talentpool.application.caching.time.sleep',
+                        side_effect=lambda _: cache.delete(lock_key)) as sleep:
+            assert get_or_build_listing(request, build) == {'json': b'{}'}
+        sleep.assert_called_once()
+        build.assert_called_once()
+        assert cache.get(listing_cache_key(request)) == {'json': b'{}'}
+        assert cache.get(lock_key) is None
+
+    def test_list_job_adverts_not_modified(self, django_capture_on_commit_callbacks):
+        """
+        The listing ETag is answered without touching the database
+        :return:
+        """
+        etag = self.client.get(reverse('job-advert'))['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('job-advert'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not [query for query in queries if query['sql'].startswith('SELECT')]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            JobAdvertService.unpublish_job_advert(self.job_advert.uuid)
+        response = self.client.get(reverse('job-advert'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
@@ -0,0 +1,155 @@
+""" Talentpool job advert publishing tests """
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from talentpool.application.publishing import JobAdvertPublishingService
+from talentpool.models import JobAdvert
+from talentpool.application.services import JobAdvertService
+from tests.talentpool.factories import UserFactory, JobAdvertFactory, job_advert_data
+
+
+@pytest.mark.django_db
+class TestJobAdvertPublishing:
+    """
+    Test the bulk and scheduled publishing of job adverts
+    """
+
+    def setup_method(self):
+        """
+        Method setup
+        :return:
+        """
+        self.client = APIClient()  # pylint: disable=W0201
+        self.user = UserFactory()  # pylint: disable=W0201
+        self.job_advert = JobAdvertFactory.create(is_published=True)  # pylint: disable=W0201
+
+    def test_bulk_publish_job_adverts(self, django_capture_on_commit_callbacks):
+        """
+        Publishing and unpublishing a batch is one UPDATE that reports what changed
+        :return:
+        """
+        drafts = JobAdvertFactory.create_batch(3, is_published=False)
+        ids = [str(job_advert.uuid) for job_advert in drafts]
+        missing = '00000000-0000-0000-0000-000000000000'
+        self.client.force_authenticate(user=self.user)
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse('job-advert-bulk-publish'),
+                                            [*ids, str(self.job_advert.uuid), missing],
+                                            format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'changed': ids,
+                                 'unchanged': [str(self.job_advert.uuid), missing]}
+        assert len([query for query in queries if query['sql'].startswith('UPDATE')]) == 1
+        assert len(callbacks) == 1
+        assert JobAdvert.objects.filter(uuid__in=ids, is_published=True).count() == 3
+
+        response = self.client.post(reverse('job-advert-bulk-unpublish'), ids[:2], format='json')
+        assert response.data['changed'] == ids[:2]
+        assert JobAdvert.objects.filter(uuid__in=ids, is_published=False).count() == 2
+
+        response = self.client.post(reverse('job-advert-bulk-unpublish'), ['nope'], format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_publish_scheduled_job_adverts(self):
+        """
+        Due adverts are published in batches, adverts in the future are left alone
+        :return:
+        """
+        past = timezone.now() - timezone.timedelta(minutes=1)
+        due = JobAdvertFactory.create_batch(
+            3, is_published=False, is_scheduled=True, publish_at=past)
+        future = JobAdvertFactory.create(
+            is_published=False, is_scheduled=True,
+            publish_at=timezone.now() + timezone.timedelta(days=1))
+
+        result = JobAdvertPublishingService.publish_scheduled_job_adverts(batch_size=2)
+        assert result['published'] == 3
+
+        for job_advert in due:
+            job_advert.refresh_from_db()
+            assert job_advert.is_published
+            assert not job_advert.is_scheduled
+        future.refresh_from_db()
+        assert not future.is_published
+        assert JobAdvertPublishingService.publish_scheduled_job_adverts()['published'] == 0
+
+    def test_schedule_job_advert_enqueues_eta_task(self, django_capture_on_commit_callbacks):
+        """
+        A scheduled advert gets a publish task for its exact publish time,
+        and a new publish time gets a new task
+        :return:
+        """
+        publish_at = timezone.now() + timezone.timedelta(hours=1)
+        data = job_advert_data(title='Schedule Job', publish_at=publish_at, is_scheduled=True)
+        with mock.patch.object(
+                JobAdvertPublishingService.publish_job_advert_at, 'apply_async') as apply_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                job_advert = JobAdvertService.create_job_advert(data)
+            apply_async.assert_called_once_with(
+                args=[job_advert['uuid'], publish_at.isoformat()], eta=publish_at)
+
+            later = publish_at + timezone.timedelta(hours=1)
+            with django_capture_on_commit_callbacks(execute=True):
+                JobAdvertService.update_job_advert(job_advert['uuid'], {'publish_at': later})
+            assert apply_async.call_args == mock.call(
+                args=[job_advert['uuid'], later.isoformat()], eta=later)
+
+    def test_publish_job_advert_at_skips_rescheduled_adverts(self):
+        """
+        Only the task for the current publish time publishes the advert
+        :return:
+        """
+        publish_at = timezone.now() - timezone.timedelta(seconds=1)
+        job_advert = JobAdvertFactory.create(
+            is_published=False, is_scheduled=True, publish_at=publish_at)
+        stale = publish_at - timezone.timedelta(minutes=10)
+
+        assert not JobAdvertPublishingService.publish_job_advert_at(
+            str(job_advert.uuid), stale.isoformat())
+        assert JobAdvertPublishingService.publish_job_advert_at(
+            str(job_advert.uuid), publish_at.isoformat())
+        job_advert.refresh_from_db()
+        assert job_advert.is_published
+        assert not job_advert.is_scheduled
+
+    def test_publish_job_advert_at_hops_past_the_eta_horizon(self, settings):
+        """
+        A publish time past the ETA horizon is reached in hops, so no task
+        waits longer than the broker visibility timeout
+        :return:
+        """
+        settings.JOB_ADVERT_PUBLISH_ETA_HORIZON = 3600
+        publish_at = timezone.now() + timezone.timedelta(days=7)
+        job_advert = JobAdvertFactory.create(
+            is_published=False, is_scheduled=True, publish_at=publish_at)
+        with mock.patch.object(
+                JobAdvertPublishingService.publish_job_advert_at, 'apply_async') as apply_async:
+            assert not JobAdvertPublishingService.publish_job_advert_at(
+                str(job_advert.uuid), publish_at.isoformat())
+        eta = apply_async.call_args.kwargs['eta']
+        assert eta <= timezone.now() + timezone.timedelta(hours=1)
+        assert eta > timezone.now() + timezone.timedelta(minutes=59)
+        assert apply_async.call_args.kwargs['args'] == [
+            str(job_advert.uuid), publish_at.isoformat()]
+        job_advert.refresh_from_db()
+        assert not job_advert.is_published
+
+        # the hops of a publish time the advert was moved off stop at once
+        JobAdvert.objects.filter(uuid=job_advert.uuid).update(
+            publish_at=publish_at + timezone.timedelta(days=1))
+        with mock.patch.object(
+                JobAdvertPublishingService.publish_job_advert_at, 'apply_async') as apply_async:
+            assert not JobAdvertPublishingService.publish_job_advert_at(
+                str(job_advert.uuid), publish_at.isoformat())
+        apply_async.assert_not_called()
@@ -0,0 +1,291 @@
+""" Talentpool query plan and query count tests """
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.utils import timezone
+
+import pytest
+
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from talentpool.application import intake
+from talentpool.application.listing import JobAdvertListingService
+from talentpool.application.publishing import JobAdvertPublishingService
+from talentpool.models import JobAdvert
+from talentpool.application.services import UserService, JobAdvertService, JobApplicationService
+from tests.talentpool.factories import (UserFactory, JobAdvertFactory, JobApplicationFactory,
+                                        job_advert_data, job_application_data)
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='EXPLAIN output is Postgres specific')
+class TestQueryPlans:
+    """
+    Test that the service queries are served by their indexes
+    NOTE: the test tables are tiny, so sequential scans are priced out of
+    the planner to check that an index matching the predicate exists at all
+    """
+
+    @staticmethod
+    def explain(queryset) -> str:
+        """
+        EXPLAIN the queryset with sequential scans disabled
+        :param queryset:
+        :return str:
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_listing_uses_listing_index(self):
+        """
+        The published listing walks the partial listing index in order
+        :return:
+        """
+        plan = self.explain(JobAdvertListingService.job_advert_listing_queryset(
+            Request(APIRequestFactory().get('/job-adverts/')))[:10])
+        assert 'Seq Scan' not in plan
+        assert 'Sort' not in plan
+        assert 'jobadvert_listing_idx' in plan
+
+    def test_due_job_adverts_uses_partial_index(self):
+        """
+        The scheduled publish task only looks at adverts waiting to go live
+        :return:
+        """
+        plan = self.explain(JobAdvertPublishingService.due_job_adverts(timezone.now()))
+        assert 'Seq Scan' not in plan
+        assert 'jobadvert_due_publish_idx' in plan
+
+    def test_search_uses_search_index(self):
+        """
+        Searches of the listing match through the GIN search index
+        :return:
+        """
+        # A rare term among enough published adverts for the planner to tell
+        JobAdvert.objects.bulk_create(
+            JobAdvertFactory.build(is_published=True) for _ in range(2000))
+        JobAdvertFactory.create(title='Python Developer', is_published=True)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {JobAdvert._meta.db_table}')
+            # Move the new rows out of the GIN pending list, as autovacuum would
+            cursor.execute("SELECT gin_clean_pending_list('jobadvert_search_idx')")
+        plan = self.explain(JobAdvertListingService.job_advert_listing_queryset(
+            Request(APIRequestFactory().get('/job-adverts/', {'q': 'python'}))))
+        assert 'Seq Scan' not in plan
+        assert 'jobadvert_search_idx' in plan
+
+    def test_facet_filter_uses_facet_index(self):
+        """
+        A listing filtered on a location is served by the location index
+        :return:
+        """
+        plan = self.explain(JobAdvertListingService.job_advert_listing_queryset(
+            Request(APIRequestFactory().get('/job-adverts/', {'location': 'Lagos'})))[:10])
+        assert 'Seq Scan' not in plan
+        assert 'jobadvert_location_idx' in plan
+
+    def test_job_applications_uses_advert_index(self):
+        """
+        The applications of an advert come from the composite advert index
+        :return:
+        """
+        job_advert = JobAdvertFactory.create()
+        plan = self.explain(JobApplicationService.job_applications_queryset(job_advert.uuid))
+        assert 'Seq Scan' not in plan
+        assert 'jobapplication_advert_idx' in plan
+
+
+@pytest.mark.django_db
+class TestServiceQueryCounts:
+    """
+    Query count regression suite of the service layer
+    NOTE: when a count here goes up, a hot path got a new query; make sure
+    it is wanted before bumping the number. SAVEPOINT and RELEASE of the
+    service transactions are counted too
+    """
+    CASES = [
+        ('UserService.authenticate', 2,
+            lambda t: UserService.authenticate(username=t.user.username, password='password')),
+        ('UserService.create_user', 3,
+            lambda t: UserService.create_user({'username': 'new-user', 'password': 'x-pass-123'})),
+        ('UserService.login_user', 2,
+            lambda t: UserService.login_user({'username': t.user.username,
+                                              'password': 'password'})),
+        ('UserService.logout_user', 1,
+            lambda t: UserService.logout_user(t.token)),
+        ('JobAdvertService.create_job_advert', 3,
+            lambda t: JobAdvertService.create_job_advert(t.advert_data)),
+        ('JobAdvertService.bulk_create_job_adverts', 3,
+            lambda t: JobAdvertService.bulk_create_job_adverts([t.advert_data] * 3)),
+        ('JobAdvertService.update_job_advert', 4,
+            lambda t: JobAdvertService.update_job_advert(t.job_advert.uuid, {'title': 'New'})),
+        ('JobAdvertService.delete_job_advert', 1,
+            lambda t: JobAdvertService.delete_job_advert(t.draft.uuid)),
+        ('JobAdvertListingService.listing_queryset', 0,
+            lambda t: JobAdvertListingService.listing_queryset()),
+        ('JobAdvertListingService.job_advert_listing_queryset', 0,
+            lambda t: JobAdvertListingService.job_advert_listing_queryset(
+                t.request('/job-adverts/?q=python'))),
+        ('JobAdvertListingService.listing_filters', 0,
+            lambda t: JobAdvertListingService.listing_filters(
+                t.request('/job-adverts/?facets=true'))),
+        ('JobAdvertListingService.search_job_adverts', 0,
+            lambda t: JobAdvertListingService.search_job_adverts(
+                t.request('/job-adverts/?q=job'))),
+        ('JobAdvertListingService.listing_values_serializer', 0,
+            lambda t: JobAdvertListingService.listing_values_serializer(
+                t.request('/job-adverts/?view=summary'))),
+        ('JobAdvertListingService.job_advert_listing_values', 0,
+            lambda t: JobAdvertListingService.job_advert_listing_values(
+                t.request('/job-adverts/'))),
+        ('JobAdvertListingService.job_advert_facet_groups', 0,
+            lambda t: JobAdvertListingService.job_advert_facet_groups(
+                t.request('/job-adverts/'))),
+        ('JobAdvertListingService.count_job_advert_facets', 0,
+            lambda t: JobAdvertListingService.count_job_advert_facets({}, [])),
+        ('JobAdvertListingService.job_advert_facets', 1,
+            lambda t: JobAdvertListingService.job_advert_facets(t.request('/job-adverts/'))),
+        ('JobAdvertListingService.ajob_advert_facets', 1,
+            lambda t: async_to_sync(JobAdvertListingService.ajob_advert_facets)(
+                t.request('/job-adverts/'))),
+        ('JobAdvertListingService.listing_paginator', 0,
+            lambda t: JobAdvertListingService.listing_paginator(t.request('/job-adverts/'))),
+        ('JobAdvertService.list_job_adverts', 2,
+            lambda t: JobAdvertService.list_job_adverts(t.request('/job-adverts/'))),
+        ('JobAdvertService.alist_job_adverts', 2,
+            lambda t: async_to_sync(JobAdvertService.alist_job_adverts)(
+                t.request('/job-adverts/'))),
+        ('JobAdvertService.build_job_advert_listing', 2,
+            lambda t: JobAdvertService.build_job_advert_listing(t.request('/job-adverts/'))),
+        ('JobAdvertService.build_job_advert_listing search', 2,
+            lambda t: JobAdvertService.build_job_advert_listing(
+                t.request('/job-adverts/?q=job'))),
+        ('JobAdvertService.build_job_advert_listing facets', 3,
+            lambda t: JobAdvertService.build_job_advert_listing(
+                t.request('/job-adverts/?facets=true&employment_type=full_time'))),
+        ('JobAdvertService.build_job_advert_listing summary', 2,
+            lambda t: JobAdvertService.build_job_advert_listing(
+                t.request('/job-adverts/?view=summary'))),
+        ('JobAdvertService.build_job_advert_listing cursor', 1,
+            lambda t: JobAdvertService.build_job_advert_listing(
+                t.request('/job-adverts/?pagination=cursor'))),
+        ('JobAdvertService.abuild_job_advert_listing', 2,
+            lambda t: async_to_sync(JobAdvertService.abuild_job_advert_listing)(
+                t.request('/job-adverts/'))),
+        ('JobAdvertService.get_job_advert', 1,
+            lambda t: JobAdvertService.get_job_advert(t.job_advert.uuid)),
+        ('JobAdvertService.aget_job_advert', 1,
+            lambda t: async_to_sync(JobAdvertService.aget_job_advert)(t.job_advert.uuid)),
+        ('JobAdvertService.get_job_advert_etag', 1,
+            lambda t: JobAdvertService.get_job_advert_etag(t.job_advert.uuid)),
+        ('JobAdvertService.aget_job_advert_etag', 1,
+            lambda t: async_to_sync(JobAdvertService.aget_job_advert_etag)(t.job_advert.uuid)),
+        ('JobAdvertService.format_job_advert_etag', 0,
+            lambda t: JobAdvertService.format_job_advert_etag(
+                t.job_advert.uuid, (t.job_advert.modified, 0))),
+        ('JobAdvertService.reconcile_applicant_counts', 1,
+            lambda t: JobAdvertService.reconcile_applicant_counts()),
+        ('JobAdvertService.publish_job_advert', 4,
+            lambda t: JobAdvertService.publish_job_advert(t.draft.uuid)),
+        ('JobAdvertService.unpublish_job_advert', 4,
+            lambda t: JobAdvertService.unpublish_job_advert(t.job_advert.uuid)),
+        ('JobAdvertPublishingService.publish_job_adverts', 3,
+            lambda t: JobAdvertPublishingService.publish_job_adverts([str(t.draft.uuid)])),
+        ('JobAdvertPublishingService.unpublish_job_adverts', 3,
+            lambda t: JobAdvertPublishingService.unpublish_job_adverts(
+                [str(t.job_advert.uuid)])),
+        ('JobAdvertPublishingService.set_job_adverts_published', 3,
+            lambda t: JobAdvertPublishingService.set_job_adverts_published(
+                [str(t.draft.uuid)], True)),
+        ('JobAdvertPublishingService.schedule_job_advert', 0,
+            lambda t: JobAdvertPublishingService.schedule_job_advert(t.draft)),
+        ('JobAdvertPublishingService.schedule_job_adverts', 0,
+            lambda t: JobAdvertPublishingService.schedule_job_adverts(
+                [t.draft, t.job_advert])),
+        ('JobAdvertPublishingService.publish_job_advert_at', 1,
+            lambda t: JobAdvertPublishingService.publish_job_advert_at(
+                str(t.draft.uuid), t.draft.publish_at.isoformat())),
+        ('JobAdvertPublishingService.due_job_adverts', 0,
+            lambda t: JobAdvertPublishingService.due_job_adverts(timezone.now())),
+        ('JobAdvertPublishingService.publish_due_job_adverts', 3,
+            lambda t: JobAdvertPublishingService.publish_due_job_adverts(timezone.now(), 10)),
+        ('JobAdvertPublishingService.publish_scheduled_job_adverts', 3,
+            lambda t: JobAdvertPublishingService.publish_scheduled_job_adverts()),
+        ('JobApplicationService.create_job_application', 6,
+            lambda t: JobApplicationService.create_job_application(t.application_data)),
+        ('JobApplicationService.bulk_create_job_applications', 6,
+            lambda t: JobApplicationService.bulk_create_job_applications(
+                [t.application_data, {**t.application_data, 'email': 'other@example.com'}])),
+        ('JobApplicationService.submit_job_application', 1,
+            lambda t: JobApplicationService.submit_job_application(t.application_data)),
+        ('JobApplicationService.consume_job_application_intake', 7,
+            lambda t: (intake.enqueue_job_application(t.application_data),
+                       JobApplicationService.consume_job_application_intake())),
+        ('JobApplicationService.get_job_application_status', 1,
+            lambda t: JobApplicationService.get_job_application_status(t.job_application.uuid)),
+        ('JobApplicationService.job_applications_queryset', 0,
+            lambda t: JobApplicationService.job_applications_queryset(t.job_advert.uuid)),
+        ('JobApplicationService.get_job_applications', 2,
+            lambda t: JobApplicationService.get_job_applications(
+                t.request('/applications/'), t.job_advert.uuid)),
+        ('JobApplicationService.aget_job_applications', 2,
+            lambda t: async_to_sync(JobApplicationService.aget_job_applications)(
+                t.request('/applications/'), t.job_advert.uuid)),
+        ('JobApplicationService.export_job_applications', 1,
+            lambda t: list(JobApplicationService.export_job_applications(t.job_advert.uuid))),
+        ('JobApplicationService.get_job_application', 1,
+            lambda t: JobApplicationService.get_job_application(t.job_application.uuid)),
+        ('JobApplicationService.delete_job_application', 1,
+            lambda t: JobApplicationService.delete_job_application(t.job_application.uuid)),
+    ]
+
+    @pytest.fixture(autouse=True)
+    def data(self):
+        """
+        A user, a published advert with an application and a due scheduled draft
+        :return:
+        """
+        self.user = UserFactory()  # pylint: disable=W0201
+        self.token = Token.objects.get(user=self.user)  # pylint: disable=W0201
+        self.job_advert = JobAdvertFactory.create(is_published=True)  # pylint: disable=W0201
+        self.draft = JobAdvertFactory.create(  # pylint: disable=W0201
+            is_published=False, is_scheduled=True,
+            publish_at=timezone.now() - timezone.timedelta(minutes=1))
+        self.job_application = JobApplicationFactory.create(  # pylint: disable=W0201
+            job_advert=self.job_advert)
+        self.advert_data = job_advert_data(is_published=True)  # pylint: disable=W0201
+        self.application_data = job_application_data(  # pylint: disable=W0201
+            self.job_advert)
+
+    @staticmethod
+    def request(path) -> Request:
+        """
+        A GET request for the services taking request params
+        :param path:
+        :return Request:
+        """
+        return Request(APIRequestFactory().get(path))
+
+    @pytest.mark.parametrize('queries, call', [
+        pytest.param(queries, call, id=name) for name, queries, call in CASES])
+    def test_query_count(self, queries, call, django_assert_num_queries):
+        """
+        The service method runs exactly the expected number of queries
+        :return:
+        """
+        with django_assert_num_queries(queries):
+            call(self)
+
+    def test_every_service_method_is_counted(self):
+        """
+        A new service method needs a query count here
+        :return:
+        """
+        counted = {name.split()[0] for name, *_ in self.CASES}
+        methods = {f'{service.__name__}.{name}'
+                   for service in (UserService, JobAdvertService, JobAdvertListingService,
+                                   JobAdvertPublishingService, JobApplicationService)
+                   for name in vars(service) if not name.startswith('_')}
+        assert methods - counted == set()
@@ -0,0 +1,65 @@
+""" Talentpool rendering and compression tests """
+import json
+from decimal import Decimal
+from unittest import mock
+
+import brotli
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from job_board.compression import CompressionMiddleware
+from talentpool.interface.renderers import FastJSONRenderer
+
+
+class TestRendering:
+    """
+    Test the fast JSON renderer and the response compression
+    """
+    data = {
+        'title': 'Ünïcode "quoted"\u2028line\u2029',
+        'created': timezone.datetime(2024, 5, 1, 12, 30, 15, 123456,
+                                     tzinfo=timezone.get_fixed_timezone(0)),
+        'date': timezone.datetime(2024, 5, 1).date(),
+        'salary': Decimal('1200.50'),
+        'ids': (1, 2 ** 70),
+        'nested': [{'count': 3, 'none': None, 'flag': True}],
+    }
+
+    def test_renders_like_json_renderer(self):
+        """
+        The fast renderer gives the bytes of DRF's JSONRenderer, with or without orjson
+        :return:
+        """
+        expected = JSONRenderer().render(self.data)
+        assert FastJSONRenderer().render(self.data) == expected
+        small = {key: value for key, value in self.data.items() if key != 'ids'}
+        assert FastJSONRenderer().render(small) == JSONRenderer().render(small)
+        with mock.patch('talentpool.interface.renderers.orjson', None):
+            assert FastJSONRenderer().render(self.data) == expected
+        assert FastJSONRenderer().render(None) == b''
+
+    def test_small_bodies_are_not_compressed(self, settings):
+        """
+        Bodies under COMPRESSION_MIN_SIZE are sent as they are
+        :param settings:
+        :return:
+        """
+        settings.COMPRESSION_MIN_SIZE = 100
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        middleware = CompressionMiddleware(lambda request: None)
+
+        response = middleware.process_response(request, HttpResponse(b'{}'))
+        assert not response.has_header('Content-Encoding')
+        assert response['Vary'] == 'Accept-Encoding'
+
+        body = json.dumps([self.data['nested']] * 20).encode()
+        response = HttpResponse(body)
+        response['ETag'] = '"1"'
+        response = middleware.process_response(request, response)
+        assert response['Content-Encoding'] == 'br'
+        assert response['ETag'] == 'W/"1"'
+        assert brotli.decompress(response.content) == body
@@ -0,0 +1,93 @@
+""" Talentpool database router tests """
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+import pytest
+
+
+from job_board.routers import ReplicaRouter, ReplicaStickinessMiddleware, use_replica
+from talentpool.models import JobAdvert
+
+
+class TestReplicaRouter:
+    """
+    Test the read replica router
+    """
+
+    @pytest.fixture(autouse=True)
+    def replicas(self, settings):
+        """
+        Pretend two caught up replicas are configured
+        :param settings:
+        :return:
+        """
+        settings.DATABASE_REPLICAS = ['replica_0', 'replica_1']
+        with mock.patch.object(ReplicaRouter, 'replica_lag', return_value=0.0):
+            ReplicaRouter._lag_checked_at = 0.0  # pylint: disable=W0212
+            yield
+        ReplicaRouter._lag_checked_at = 0.0  # pylint: disable=W0212
+        ReplicaRouter._lag.clear()  # pylint: disable=W0212
+
+    def test_reads_stay_on_primary_by_default(self):
+        """
+        Reads outside use_replica() and all writes go to the primary
+        :return:
+        """
+        router = ReplicaRouter()
+        assert router.db_for_read(JobAdvert) is None
+        with use_replica():
+            assert router.db_for_write(JobAdvert) == 'default'
+
+    def test_use_replica_reads_from_one_replica(self):
+        """
+        use_replica() reads are served by a replica, the same one per request
+        :return:
+        """
+        middleware = ReplicaStickinessMiddleware(lambda request: HttpResponse())
+        router = ReplicaRouter()
+        aliases = []
+
+        def view(request):
+            with use_replica():
+                aliases.extend(router.db_for_read(JobAdvert) for _ in range(10))
+            return HttpResponse()
+
+        middleware.get_response = view
+        middleware(RequestFactory().get('/job-adverts/'))
+        assert len(set(aliases)) == 1
+        assert aliases[0] in ('replica_0', 'replica_1')
+
+    def test_lagging_replicas_are_skipped(self):
+        """
+        A replica lagging more than REPLICA_MAX_LAG is not read from
+        :return:
+        """
+        lags = {'replica_0': 3600.0, 'replica_1': 0.0}
+        with mock.patch.object(ReplicaRouter, 'replica_lag', side_effect=lags.get):
+            with use_replica():
+                assert ReplicaRouter().db_for_read(JobAdvert) == 'replica_1'
+
+    def test_writers_are_pinned_to_the_primary(self):
+        """
+        After a write, the same client reads from the primary for the sticky window
+        :return:
+        """
+        router = ReplicaRouter()
+        reads = []
+
+        def view(request):
+            with use_replica():
+                reads.append(router.db_for_read(JobAdvert))
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(view)
+        factory = RequestFactory()
+        middleware(factory.get('/job-adverts/', HTTP_AUTHORIZATION='Token writer'))
+        middleware(factory.post('/job-advert/', HTTP_AUTHORIZATION='Token writer'))
+        middleware(factory.get('/job-adverts/', HTTP_AUTHORIZATION='Token writer'))
+        middleware(factory.get('/job-adverts/', HTTP_AUTHORIZATION='Token reader'))
+        assert reads[0] is not None
+        assert reads[2] is None
+        assert reads[3] is not None
@@ -0,0 +1,85 @@
+""" Talentpool values serializer tests """
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+import pytest
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from talentpool.models import JobAdvert, JobApplication
+from talentpool.interface.serializers import (
+    JobAdvertSerializer, JobAdvertValuesSerializer, JobApplicationValuesSerializer)
+from tests.talentpool.factories import JobAdvertFactory, JobApplicationFactory
+
+
+@pytest.mark.django_db
+class TestValuesSerializers:
+    """
+    Test that the values serializers render the same JSON as the model serializers
+    """
+
+    @staticmethod
+    def assert_same_json(values_serializer, queryset, fieldset=None):
+        """
+        Render the queryset through both serializers and compare the bytes
+        :param values_serializer:
+        :param queryset:
+        :param fieldset:
+        :return:
+        """
+        renderer = JSONRenderer()
+        expected = values_serializer.serializer_class(queryset, many=True, fieldset=fieldset).data
+        rows = values_serializer.values(queryset, fieldset=fieldset)
+        assert renderer.render(values_serializer.serialize(rows, fieldset)) == renderer.render(
+            expected)
+
+    def test_job_advert_values_serializer(self):
+        """
+        Adverts, scheduled or not, come out the same
+        :return:
+        """
+        JobAdvertFactory.create(is_published=True, applicant_count=3)
+        JobAdvertFactory.create(
+            title='Ünïcode "quoted" title', is_scheduled=True,
+            publish_at=timezone.now() + timezone.timedelta(days=1, microseconds=7))
+        self.assert_same_json(JobAdvertValuesSerializer,
+                              JobAdvert.objects.order_by('created', 'uuid'))
+        self.assert_same_json(JobAdvertValuesSerializer,
+                              JobAdvert.objects.order_by('created', 'uuid'),
+                              fieldset=('uuid', 'publish_at'))
+
+    def test_job_application_values_serializer(self):
+        """
+        Applications, with and without their optional fields, come out the same
+        :return:
+        """
+        job_advert = JobAdvertFactory.create(is_published=True)
+        JobApplicationFactory.create(job_advert=job_advert)
+        JobApplicationFactory.create(job_advert=job_advert, website=None, github_profile='')
+        self.assert_same_json(JobApplicationValuesSerializer,
+                              JobApplication.objects.order_by('created', 'uuid'))
+
+    def test_unsupported_field(self):
+        """
+        Fields that are not read from a column are refused
+        :return:
+        """
+
+        class Serializer(JobAdvertSerializer):  # pylint: disable=W0223
+            """
+            Serializer with a computed field
+            """
+            headline = serializers.SerializerMethodField()
+
+            class Meta(JobAdvertSerializer.Meta):
+                fields = [*JobAdvertSerializer.Meta.fields, 'headline']
+
+        class ValuesSerializer(JobAdvertValuesSerializer):
+            """
+            ValuesSerializer of the computed field
+            """
+            serializer_class = Serializer
+
+        with pytest.raises(ImproperlyConfigured):
+            ValuesSerializer.fields()
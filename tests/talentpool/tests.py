@@ -1,4 +1,15 @@
 """ Talentpool tests """
+import gzip
+import json
+from unittest import mock
+
+import brotli
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
@@ -9,10 +20,13 @@ from rest_framework.exceptions import ValidationError
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from talentpool.application.publishing import JobAdvertPublishingService
 from talentpool.models import JobAdvert, JobApplication
-from talentpool.application.services import (
-    JobAdvertService, JobApplicationService)
-from tests.talentpool.factories import UserFactory, JobAdvertFactory, JobApplicationFactory
+from talentpool.application.services import JobAdvertService, JobApplicationService
+from talentpool.interface.authentication import CachedTokenAuthentication, token_cache_key
+from talentpool.interface.serializers import JobAdvertSerializer, JobApplicationSerializer
+from tests.talentpool.factories import (UserFactory, JobAdvertFactory, JobApplicationFactory,
+                                        job_advert_data, job_application_data)
 
 
 @pytest.mark.django_db
@@ -35,16 +49,7 @@ class TestJobAdvertService:
         Create Job advert from service directly
         :return:
         """
-        data = {
-            'title': 'New Job',
-            'company_name': 'New Company',
-            'employment_type': 'full_time',
-            'experience_level': 'entry',
-            'description': 'Job description',
-            'location': 'Location',
-            'job_description': 'Detailed job description',
-            'is_published': True
-        }
+        data = job_advert_data(is_published=True)
         job_advert = JobAdvertService.create_job_advert(data)
         assert job_advert.title == 'New Job'
         assert job_advert.is_published
@@ -99,6 +104,42 @@ class TestJobAdvertService:
         job_advert = JobAdvert.objects.get(uuid=self.job_advert.uuid)
         assert not job_advert.is_published
 
+    def test_state_changes_write_only_changed_columns(self):
+        """
+        Publishing, unpublishing and updating never rewrite the TEXT columns
+        :return:
+        """
+        table = JobAdvert._meta.db_table
+        job_advert = JobAdvertFactory.create(is_published=False)
+        where = f'WHERE "{table}"."uuid" = \'{job_advert.uuid}\'::uuid'
+
+        def updates():
+            return [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+
+        def update_sql(assignment):
+            job_advert.refresh_from_db()
+            modified = job_advert.modified.isoformat()
+            return [f'UPDATE "{table}" SET "modified" = \'{modified}\'::timestamptz, '
+                    f'{assignment} {where}']
+
+        with CaptureQueriesContext(connection) as queries:
+            JobAdvertService.publish_job_advert(job_advert.uuid)
+        assert updates() == update_sql('"is_published" = true')
+
+        with CaptureQueriesContext(connection) as queries:
+            JobAdvertService.unpublish_job_advert(job_advert.uuid)
+        assert updates() == update_sql('"is_published" = false')
+
+        with CaptureQueriesContext(connection) as queries:
+            JobAdvertService.update_job_advert(
+                job_advert.uuid, {'title': 'Renamed', 'location': job_advert.location})
+        assert updates() == update_sql('"title" = \'Renamed\'')
+
+        with CaptureQueriesContext(connection) as queries:
+            JobAdvertService.unpublish_job_advert(job_advert.uuid)
+            JobAdvertService.update_job_advert(job_advert.uuid, {'title': 'Renamed'})
+        assert not updates()
+
     def test_list_job_adverts(self):
         """
         You should be able to see the list of job advert even while a guest user
@@ -132,6 +173,51 @@ class TestJobAdvertService:
         assert response.status_code == status.HTTP_200_OK
         assert response.data['title'] == self.job_advert.title
 
+    def test_get_job_advert_details_not_modified(self):
+        """
+        A client holding the current ETag gets a 304, an update changes the ETag
+        :return:
+        """
+        self.client.force_authenticate(user=self.user)
+        url = reverse('job-advert-detail', args=[self.job_advert.uuid])
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        JobAdvertService.update_job_advert(self.job_advert.uuid, {'title': 'Updated'})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_get_job_advert_sparse_fieldset(self):
+        """
+        fields and exclude prune the detail and the columns read, and each
+        fieldset has its own ETag
+        :return:
+        """
+        self.client.force_authenticate(user=self.user)
+        url = reverse('job-advert-detail', args=[self.job_advert.uuid])
+        etag = self.client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'title,uuid'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'uuid': str(self.job_advert.uuid), 'title': self.job_advert.title}
+        assert '"description"' not in queries.captured_queries[-1]['sql']
+        assert response['ETag'] != etag
+
+        response = self.client.get(url, {'exclude': ['description', 'job_description']})
+        assert set(response.data) == set(JobAdvertSerializer.Meta.fields) - {
+            'description', 'job_description'}
+
+        response = self.client.get(url, {'fields': 'title,salary'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {'fields': ['Unknown field: salary.']}
+
+        response = self.client.get(url, {'fields': 'title', 'exclude': 'title'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
     def test_schedule_job_advert(self):
         """
         Test that you can schedule a job advert
@@ -139,22 +225,50 @@ class TestJobAdvertService:
         :return:
         """
         future_publish_time = timezone.now() + timezone.timedelta(days=1)
-        data = {
-            'title': 'Schedule Job',
-            'company_name': 'New Company',
-            'employment_type': 'full_time',
-            'experience_level': 'entry',
-            'description': 'Job description',
-            'location': 'Location',
-            'job_description': 'Detailed job description',
-            'publish_at': future_publish_time,
-            'is_scheduled': True
-        }
+        data = job_advert_data(
+            title='Schedule Job', publish_at=future_publish_time, is_scheduled=True)
         job_advert = JobAdvertService.create_job_advert(data)
         assert job_advert.publish_at == future_publish_time
         assert job_advert.is_scheduled
         assert job_advert.is_published is False
 
+    def test_bulk_create_job_adverts(self, django_capture_on_commit_callbacks):
+        """
+        Valid adverts are created in one INSERT and scheduled in one pass,
+        invalid ones are reported by index
+        :return:
+        """
+        publish_at = timezone.now() + timezone.timedelta(hours=1)
+        item = job_advert_data(title='Bulk Job')
+        data = [
+            {**item, 'is_published': True},
+            {**item, 'title': ''},
+            {**item, 'publish_at': publish_at.isoformat(), 'is_scheduled': True},
+            {**item, 'publish_at': publish_at.isoformat(), 'is_scheduled': True},
+        ]
+        self.client.force_authenticate(user=self.user)
+        with mock.patch.object(
+                JobAdvertPublishingService.publish_job_advert_at, 'apply_async') as apply_async:
+            with django_capture_on_commit_callbacks(execute=True) as callbacks:
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.post(
+                        reverse('job-advert-bulk-create'), data, format='json')
+            assert apply_async.call_count == 2
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data['created']) == 3
+        assert [error['index'] for error in response.data['errors']] == [1]
+        assert 'title' in response.data['errors'][0]['errors']
+        assert len([query for query in queries if query['sql'].startswith('INSERT')]) == 1
+        assert len(callbacks) == 2
+        assert JobAdvert.objects.filter(title='Bulk Job').count() == 3
+
+        response = self.client.post(
+            reverse('job-advert-bulk-create'), [{**item, 'title': ''}], format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.post(reverse('job-advert-bulk-create'), item, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 
 @pytest.mark.django_db
 class TestJobApplicationService:
@@ -191,6 +305,92 @@ class TestJobApplicationService:
         job_application = JobApplicationService.create_job_application(data)
         assert job_application.first_name == 'John'
 
+    def test_job_application_updates_applicant_count(self):
+        """
+        Creating and deleting applications keeps the stored applicant count in step
+        :return:
+        """
+        data = job_application_data(self.job_advert)
+        job_application = JobApplicationService.create_job_application(data)
+        self.job_advert.refresh_from_db()
+        assert self.job_advert.applicant_count == 1
+
+        JobApplicationService.delete_job_application(job_application['uuid'])
+        self.job_advert.refresh_from_db()
+        assert self.job_advert.applicant_count == 0
+
+    def test_create_job_application_duplicate(self):
+        """
+        Applying twice for an advert is a 400, also when the second request
+        gets past the serializer check before the first one is stored
+        :return:
+        """
+        data = job_application_data(self.job_advert)
+        JobApplicationService.create_job_application(data)
+        with pytest.raises(ValidationError) as serializer_error:
+            JobApplicationService.create_job_application(data)
+        # The race: the serializer saw no application yet
+        with mock.patch.object(JobApplicationSerializer, 'get_validators', return_value=[]):
+            with pytest.raises(ValidationError) as constraint_error:
+                JobApplicationService.create_job_application(data)
+        assert constraint_error.value.detail == serializer_error.value.detail
+        self.job_advert.refresh_from_db()
+        assert self.job_advert.applicant_count == 1
+
+    def test_bulk_create_job_applications(self, django_capture_on_commit_callbacks):
+        """
+        A batch is ingested in a fixed number of queries, duplicates and
+        invalid applications are reported per row
+        :return:
+        """
+        existing = JobApplicationFactory.create(job_advert=self.job_advert)
+        applicant_count = self.job_advert.applicant_count
+        other_advert = JobAdvertFactory.create(is_published=True)
+        unpublished = JobAdvertFactory.create(is_published=False)
+        item = job_application_data(self.job_advert)
+        data = [
+            item,
+            item,
+            {**item, 'email': existing.email},
+            {**item, 'job_advert': str(unpublished.uuid)},
+            {**item, 'job_advert': '00000000-0000-0000-0000-000000000000'},
+            {**item, 'email': 'not an email'},
+            {**item, 'job_advert': str(other_advert.uuid)},
+        ]
+        self.client.force_authenticate(user=self.user)
+        with django_capture_on_commit_callbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse('job-application-bulk-create'), data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created'] == 2
+        assert [result['status'] for result in response.data['results']] == [
+            'created', 'duplicate', 'duplicate', 'invalid', 'invalid', 'invalid', 'created']
+        assert 'email' in response.data['results'][5]['errors']
+        assert len([query for query in queries if query['sql'].startswith('INSERT')]) == 1
+        assert len([query for query in queries if query['sql'].startswith('UPDATE')]) == 1
+        self.job_advert.refresh_from_db()
+        other_advert.refresh_from_db()
+        assert self.job_advert.applicant_count == applicant_count + 1
+        assert other_advert.applicant_count == 1
+
+        response = self.client.post(
+            reverse('job-application-bulk-create'), data[:3], format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 0
+
+    def test_reconcile_applicant_counts(self):
+        """
+        Applications written behind the service's back are picked up by the reconciler
+        :return:
+        """
+        JobApplicationFactory.create_batch(3, job_advert=self.job_advert)
+        assert JobAdvertService.reconcile_applicant_counts() == 1
+        self.job_advert.refresh_from_db()
+        assert self.job_advert.applicant_count == 3
+        assert JobAdvertService.reconcile_applicant_counts() == 0
+
     def test_get_job_applications_unauthenticated(self):
         """
         Tes that i can not get all job application associated with a
@@ -219,6 +419,126 @@ class TestJobApplicationService:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) > 0
 
+    def test_get_job_applications_is_paginated(self):
+        """
+        The applications list comes a page at a time
+        :return:
+        """
+        self.client.force_authenticate(user=self.user)
+        JobApplicationFactory.create_batch(5, job_advert=self.job_advert)
+        response = self.client.get(reverse(
+            'job-application', args=[self.job_advert.uuid]), {'page_size': 2, 'page': 3})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 5
+        assert len(response.data['results']) == 1
+        assert response.data['next'] is None
+
+    def test_export_job_applications(self, settings):
+        """
+        The export streams every application, as JSON or as NDJSON
+        :param settings:
+        :return:
+        """
+        settings.JOB_APPLICATION_EXPORT_CHUNK_SIZE = 2
+        self.client.force_authenticate(user=self.user)
+        JobApplicationFactory.create_batch(5, job_advert=self.job_advert)
+        url = reverse('job-application-export', args=[self.job_advert.uuid])
+        expected = [str(uuid) for uuid in JobApplicationService.job_applications_queryset(
+            self.job_advert.uuid).values_list('uuid', flat=True)]
+
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        body = b''.join(response.streaming_content)
+        assert [item['uuid'] for item in json.loads(body)] == expected
+
+        response = self.client.get(url, {'output': 'ndjson'})
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line)['uuid'] for line in lines] == expected
+
+        empty = JobAdvertFactory.create(is_published=True)
+        response = self.client.get(reverse('job-application-export', args=[empty.uuid]))
+        assert json.loads(b''.join(response.streaming_content)) == []
+
+    def test_export_job_applications_compressed(self, settings):
+        """
+        The streamed export is compressed chunk by chunk
+        :param settings:
+        :return:
+        """
+        settings.JOB_APPLICATION_EXPORT_CHUNK_SIZE = 2
+        self.client.force_authenticate(user=self.user)
+        JobApplicationFactory.create_batch(5, job_advert=self.job_advert)
+        url = reverse('job-application-export', args=[self.job_advert.uuid])
+        body = b''.join(self.client.get(url).streaming_content)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(b''.join(response.streaming_content)) == body
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='br')
+        assert response['Content-Encoding'] == 'br'
+        assert brotli.decompress(b''.join(response.streaming_content)) == body
+
+    def test_export_job_applications_under_asgi(self, settings):
+        """
+        Under ASGI the export is streamed from an async iterator, compressed
+        chunk by chunk, instead of being read whole first
+        :param settings:
+        :return:
+        """
+        settings.SERVER_MODE = 'asgi'
+        settings.JOB_APPLICATION_EXPORT_CHUNK_SIZE = 2
+        JobApplicationFactory.create_batch(5, job_advert=self.job_advert)
+        url = reverse('job-application-export', args=[self.job_advert.uuid])
+        token = Token.objects.get(user=self.user)
+        expected = [str(uuid) for uuid in JobApplicationService.job_applications_queryset(
+            self.job_advert.uuid).values_list('uuid', flat=True)]
+
+        async def export(**headers):
+            response = await AsyncClient().get(
+                url, headers={'Authorization': f'Token {token.key}', **headers})
+            return response, [chunk async for chunk in response.streaming_content]
+
+        response, body = async_to_sync(export)()
+        assert response.is_async
+        assert len(body) == 4
+        assert [item['uuid'] for item in json.loads(b''.join(body))] == expected
+        response, chunks = async_to_sync(export)(**{'Accept-Encoding': 'gzip'})
+        assert response['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(b''.join(chunks))) == json.loads(b''.join(body))
+        response, chunks = async_to_sync(export)(**{'Accept-Encoding': 'br'})
+        assert response['Content-Encoding'] == 'br'
+        assert json.loads(brotli.decompress(b''.join(chunks))) == json.loads(b''.join(body))
+
+    def test_job_applications_sparse_fieldset(self):
+        """
+        The applications list, export and detail prune their fields
+        :return:
+        """
+        self.client.force_authenticate(user=self.user)
+        job_application = JobApplicationFactory.create(job_advert=self.job_advert)
+        expected = {'uuid': str(job_application.uuid), 'email': job_application.email}
+
+        response = self.client.get(
+            reverse('job-application', args=[self.job_advert.uuid]), {'fields': 'email,uuid'})
+        assert response.data['results'] == [expected]
+
+        response = self.client.get(
+            reverse('job-application-export', args=[self.job_advert.uuid]),
+            {'fields': ['uuid', 'email']})
+        assert json.loads(b''.join(response.streaming_content)) == [expected]
+
+        response = self.client.get(
+            reverse('job-application-detail', args=[job_application.uuid]),
+            {'exclude': 'cover_letter'})
+        assert 'cover_letter' not in response.data
+        assert response.data['email'] == job_application.email
+
+        response = self.client.get(
+            reverse('job-application-export', args=[self.job_advert.uuid]), {'fields': 'ssn'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
     def test_get_job_application_unauthenticated(self):
         """
         Test that i am not able to get Job application detail when a guest user
@@ -243,6 +563,42 @@ class TestJobApplicationService:
         assert response.status_code == status.HTTP_200_OK
         assert response.data['first_name'] == job_application.first_name
 
+    def test_delete_job_advert_cascades_in_the_database(self, django_assert_num_queries):
+        """
+        Deleting an advert is one DELETE, the database removes its applications
+        :return:
+        """
+        job_application = JobApplicationFactory.create(job_advert=self.job_advert)
+        JobAdvertService.unpublish_job_advert(self.job_advert.uuid)
+        with django_assert_num_queries(1):
+            JobAdvertService.delete_job_advert(self.job_advert.uuid)
+        assert not JobApplication.objects.filter(uuid=job_application.uuid).exists()
+
+    def test_job_advert_foreign_key_cascades(self):
+        """
+        The job_advert foreign key of applications is ON DELETE CASCADE in
+        the database: Django drops it whenever the field is altered, the
+        model only says DO_NOTHING
+        :return:
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT confdeltype FROM pg_constraint "
+                "JOIN pg_attribute ON attrelid = conrelid AND attnum = ANY(conkey) "
+                "WHERE conrelid = 'talentpool_jobapplication'::regclass "
+                "AND contype = 'f' AND attname = 'job_advert_id'")
+            assert cursor.fetchall() == [('c',)]
+
+    def test_job_application_str_does_not_query(self, django_assert_num_queries):
+        """
+        Printing an application never fetches its advert
+        :return:
+        """
+        job_application = JobApplication.objects.get(
+            uuid=JobApplicationFactory.create(job_advert=self.job_advert).uuid)
+        with django_assert_num_queries(0):
+            assert str(self.job_advert.uuid) in str(job_application)
+
     def test_delete_job_application(self):
         """
         Test that application is deleted and
@@ -307,3 +663,59 @@ class TestUserAPI:
         response = client.delete(url)
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert not Token.objects.filter(user=user).exists()
+
+    def test_token_authentication_is_cached(self, client, user):
+        """
+        Repeat requests resolve the token without the database,
+        and logging out invalidates the cached token
+        :param client:
+        :param user:
+        :return:
+        """
+        token = Token.objects.get(user=user)
+        client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        url = reverse('job-advert-detail', args=[JobAdvertFactory.create().uuid])
+        assert client.get(url).status_code == status.HTTP_200_OK
+
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get(url).status_code == status.HTTP_200_OK
+        assert not [query for query in queries if 'authtoken_token' in query['sql']]
+
+        assert client.delete(reverse('user-login')).status_code == status.HTTP_204_NO_CONTENT
+        assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_token_cache_holds_no_credentials(self, user):
+        """
+        The token caches hold the user id and active flag only, and every
+        request gets its own User and Token
+        :param user:
+        :return:
+        """
+        token = Token.objects.get(user=user)
+        authentication = CachedTokenAuthentication()
+        first_user, first_token = authentication.authenticate_credentials(token.key)
+        second_user, second_token = authentication.authenticate_credentials(token.key)
+        assert first_user.pk == second_user.pk == user.pk
+        assert first_token.key == second_token.key == token.key
+        assert first_user is not second_user and first_token is not second_token
+        assert cache.get(token_cache_key(token.key)) == {'user_id': user.pk, 'is_active': True}
+        with CaptureQueriesContext(connection) as queries:
+            assert first_user.username == user.username
+        assert len(queries) == 1
+
+    def test_deactivated_user_token_is_invalidated(self, client, user):
+        """
+        Saving the user drops its cached token, a deactivation is seen at once
+        :param client:
+        :param user:
+        :return:
+        """
+        token = Token.objects.get(user=user)
+        client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        url = reverse('job-advert-detail', args=[JobAdvertFactory.create().uuid])
+        assert client.get(url).status_code == status.HTTP_200_OK
+
+        user.is_active = False
+        user.save()
+        assert cache.get(token_cache_key(token.key)) is None
+        assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED